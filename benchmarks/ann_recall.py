@@ -0,0 +1,61 @@
+# benchmarks/ann_recall.py
+# Recall@k vs. single-query latency of the approximate content indexes against the exact flat index.
+# Usage: python benchmarks/ann_recall.py [n_videos] [dim]
+import os
+import sys
+import time
+
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.content_index import build_index, set_search_params
+
+K = 10
+N_QUERIES = 500
+
+
+def synthetic_embeddings(n: int, d: int, clusters: int = 200, seed: int = 0):
+    # clustered vectors look more like real catalog embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, d)).astype("float32")
+    x = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, d)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def evaluate(index, queries, truth):
+    t0 = time.perf_counter()
+    found = [index.search(q[None, :], K)[1][0] for q in queries]
+    ms = (time.perf_counter() - t0) * 1000 / len(queries)
+    recall = np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+    return recall, ms
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    d = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    faiss.omp_set_num_threads(1)
+    x = synthetic_embeddings(n, d)
+    queries = x[np.random.default_rng(1).choice(n, N_QUERIES, replace=False)]
+
+    flat = build_index(x, "flat")
+    _, truth = flat.search(queries, K)
+    recall, ms = evaluate(flat, queries, truth)
+    print(f"n={n:,} d={d} k={K}  (single-thread, single-query latency)")
+    print(f"{'index':<10}{'knob':<16}{'build s':>9}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'flat':<10}{'-':<16}{'-':>9}{recall:>10.3f}{ms:>10.3f}")
+
+    sweeps = {
+        "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+        "ivf_pq": ("nprobe", [1, 4, 16, 64]),
+        "hnsw": ("ef_search", [16, 32, 64, 128]),
+    }
+    for index_type, (knob, values) in sweeps.items():
+        t0 = time.perf_counter()
+        index = build_index(x, index_type, train_size=min(n, 50000))
+        build_s = time.perf_counter() - t0
+        for v in values:
+            set_search_params(index, **{knob: v})
+            recall, ms = evaluate(index, queries, truth)
+            print(f"{index_type:<10}{f'{knob}={v}':<16}{build_s:>9.1f}{recall:>10.3f}{ms:>10.3f}")
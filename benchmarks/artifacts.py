@@ -0,0 +1,91 @@
+# benchmarks/artifacts.py
+# Model startup: joblib pickles (content.pkl + collab_als.pkl) vs. the memory-mapped artifact bundle.
+# Each load runs in a fresh process; RssAnon is private memory, RssFile is page cache shareable between workers.
+# Usage: python benchmarks/artifacts.py [n_videos] [n_users]
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+import faiss
+from scipy.sparse import csr_matrix
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.artifacts import write_bundle, ArtifactBundle
+from src.collab_model import CollabModel
+from src.content_index import ContentModel, fit_projection
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+DIM = 256
+FACTORS = 64
+
+
+def make_models(n_videos: int, n_users: int, ids=None):
+    rng = np.random.default_rng(0)
+    ids = np.array([f"v{i:08d}" for i in range(n_videos)]) if ids is None else np.asarray(ids).astype(str)
+    words = np.array([f"w{i}" for i in range(20000)])
+    sample = [" ".join(words[rng.integers(0, 20000, 12)]) for _ in range(5000)]
+    tfidf = TfidfVectorizer(max_features=10000)
+    projector = fit_projection(tfidf.fit_transform(sample), dim=DIM)
+    vectors = rng.standard_normal((n_videos, DIM), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    content = ContentModel(index, ids, tfidf, projector)
+    rows, cols = rng.integers(0, n_users, 20 * n_users), rng.integers(0, n_videos, 20 * n_users)
+    user_items = csr_matrix((np.ones(len(rows), dtype="float32"), (rows, cols)), shape=(n_users, n_videos))
+    collab = CollabModel(rng.standard_normal((n_users, FACTORS), dtype=np.float32),
+                         rng.standard_normal((n_videos, FACTORS), dtype=np.float32),
+                         [f"user_{i}" for i in range(n_users)], ids, user_items)
+    return content, collab
+
+
+def memory():
+    fields = dict(line.split(":", 1) for line in open("/proc/self/status"))
+    return {k: int(fields[k].split()[0]) / 1024 for k in ("RssAnon", "RssFile")}
+
+
+def child(mode: str, root: str):
+    before = memory()
+    t0 = time.perf_counter()
+    if mode == "pickle":
+        content = ContentModel.load(os.path.join(root, "content.pkl"))
+        collab = CollabModel.load(os.path.join(root, "collab_als.pkl"))
+    else:
+        bundle = ArtifactBundle.open(os.path.join(root, "artifacts"))
+        content, collab = bundle.load_content(), bundle.load_collab()
+    load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ids = collab.item_ids[:20].tolist()
+    query = content.query_vector(ids)
+    content.search(query[None], 10)
+    collab.recommend(ids, 10)
+    first = time.perf_counter() - t0
+    after = memory()
+    print(f"{mode:>7}: load {load * 1000:9.1f} ms  first query {first * 1000:7.1f} ms  "
+          f"RssAnon +{after['RssAnon'] - before['RssAnon']:7.1f} MB  RssFile +{after['RssFile'] - before['RssFile']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+        sys.exit()
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    with tempfile.TemporaryDirectory() as root:
+        content, collab = make_models(n_videos, n_users)
+        t0 = time.perf_counter()
+        joblib.dump(content.to_dict(), os.path.join(root, "content.pkl"))
+        joblib.dump(collab.to_dict(), os.path.join(root, "collab_als.pkl"))
+        t_pickle = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        write_bundle(os.path.join(root, "artifacts"), content, collab)
+        t_bundle = time.perf_counter() - t0
+        del content, collab
+        print(f"{n_videos:,} videos x {DIM} dims, {n_users:,} users x {FACTORS} factors")
+        print(f"save: pickles {t_pickle:.2f}s, bundle {t_bundle:.2f}s (incl. sha256 of every file)")
+        for mode in ("pickle", "bundle"):
+            subprocess.run([sys.executable, __file__, "--child", mode, root], check=True)
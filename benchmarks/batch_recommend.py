@@ -0,0 +1,102 @@
+# benchmarks/batch_recommend.py
+# Offline top-N for every user: per-user online ranking vs. the chunked batch job, and peak memory vs. user count.
+# serve: private memory the app spends on the output (CSV parsed vs. the memory-mapped index).
+# Usage: python benchmarks/batch_recommend.py [n_videos]
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.batch_recommend import build_ranker, iter_users, run, PrecomputedRecommendations
+from src.catalog_store import CatalogStore
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.interaction_store import InteractionStore
+
+HISTORY = 20
+
+
+def peak_rss_mb() -> float:
+    """This process's RSS high-water mark (ru_maxrss would carry over the parent's across fork + exec)."""
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+
+def make_artifacts(root, n_videos, n_users, rng):
+    ids = [f"v{i}" for i in range(n_videos)]
+    words = np.array([f"w{i}" for i in range(3000)])
+    text = [" ".join(words[rng.integers(0, 3000, 10)]) for _ in range(n_videos)]
+    CatalogStore(os.path.join(root, "catalog")).write(pd.DataFrame({"video_id": ids, "text": text,
+                                                                     "viewCount_norm": rng.random(n_videos)}))
+    joblib.dump(ContentModel.from_catalog(ids, text, dim=64).to_dict(), os.path.join(root, "content.pkl"))
+    users = [f"user_{i}" for i in range(n_users)]
+    joblib.dump(CollabModel(rng.normal(size=(n_users, 64)), rng.normal(size=(n_videos, 64)), users, ids).to_dict(),
+                os.path.join(root, "als.pkl"))
+    InteractionStore(os.path.join(root, "interactions")).write(pd.DataFrame({
+        "user_id": np.repeat(users, HISTORY), "video_id": np.array(ids)[rng.integers(0, n_videos, n_users * HISTORY)],
+        "rating": 1}))
+    return dict(catalog=os.path.join(root, "catalog"), interactions=os.path.join(root, "interactions"),
+                history_db=os.path.join(root, "history.db"), history_dir=None, artifacts=None,
+                content_model=os.path.join(root, "content.pkl"), collab_model=os.path.join(root, "als.pkl"))
+
+
+def anon_rss_mb() -> float:
+    """Private (anonymous) resident memory; mapped file pages are shared and reclaimable."""
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("RssAnon")) / 1024
+
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--serve":
+    # child process: open the output the way the app does (mapped index, or the CSV parsed), 1000 lookups
+    before = anon_rss_mb()
+    recs = (PrecomputedRecommendations.load if sys.argv[2] == "index" else PrecomputedRecommendations.from_csv)(sys.argv[3])
+    for i in range(1000):
+        recs.get(f"user_{i * 7919 % len(recs)}")
+    print(anon_rss_mb() - before)
+elif __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--child":
+    # child process: one batch run, report its own peak RSS
+    paths = dict(zip(["catalog", "interactions", "history_db", "content_model", "collab_model"], sys.argv[3:8]))
+    stats = run(sys.argv[2], history_dir=None, artifacts=None, chunk_size=2000, **paths)
+    print(stats["users"], stats["seconds"], peak_rss_mb())
+elif __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp()
+    try:
+        print(f"{n_videos:,} videos, {HISTORY}-video histories, hybrid top-10")
+        paths = make_artifacts(root, n_videos, 2000, rng)
+        ranker = build_ranker(paths["catalog"], paths["content_model"], paths["collab_model"])
+        users = list(iter_users(paths["interactions"]))
+        t0 = time.perf_counter()
+        for _, h in users[:500]:
+            ranker.rank(h, 10, exclude=ranker.catalog_index.positions(h))
+        online = (time.perf_counter() - t0) / 500 * 1000
+        t0 = time.perf_counter()
+        ranker.rank_batch([h for _, h in users], 10)
+        batched = (time.perf_counter() - t0) / len(users) * 1000
+        print(f"{'online rank() per user':<32}{online:>8.2f} ms/user")
+        print(f"{'rank_batch (2000-user chunk)':<32}{batched:>8.2f} ms/user  ({online / batched:.1f}x)")
+
+        print(f"{'users':>8}{'seconds':>9}{'users/s':>9}{'peak RSS MB':>13}{'CSV MB':>8}{'serve CSV MB':>14}{'serve index MB':>16}")
+        for n_users in (5_000, 20_000, 80_000):
+            case = os.path.join(root, str(n_users))
+            os.makedirs(case)
+            p = make_artifacts(case, n_videos, n_users, rng)
+            out = os.path.join(case, "recs.csv")
+            res = subprocess.run([sys.executable, __file__, "--child", out, p["catalog"], p["interactions"],
+                                  p["history_db"], p["content_model"], p["collab_model"]],
+                                 capture_output=True, text=True, check=True)
+            n, secs, rss = res.stdout.split()[-3:]
+            serve = [float(subprocess.run([sys.executable, __file__, "--serve", kind, out], capture_output=True,
+                                          text=True, check=True).stdout.split()[-1]) for kind in ("csv", "index")]
+            print(f"{int(n):>8,}{float(secs):>9.1f}{int(n) / float(secs):>9,.0f}{float(rss):>13.0f}"
+                  f"{os.path.getsize(out) / 2**20:>8.1f}{serve[0]:>14.1f}{serve[1]:>16.1f}")
+    finally:
+        shutil.rmtree(root)
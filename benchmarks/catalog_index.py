@@ -0,0 +1,45 @@
+# benchmarks/catalog_index.py
+# History panel / membership lookups: per-item DataFrame filters vs. a CatalogIndex built once per catalog version.
+# Usage: python benchmarks/catalog_index.py
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.catalog_store import CatalogIndex
+
+
+def best_ms(fn, number=3, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) * 1000 / number
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'n':>9}  {'case':<36}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+    for n in (20_000, 200_000):
+        df = pd.DataFrame({"video_id": [f"v{i:07d}" for i in range(n)],
+                           "title": [f"title {i}" for i in range(n)], "channel": "c"})
+        index = CatalogIndex(df["video_id"])
+        history = [f"v{i:07d}" for i in rng.choice(n, 10, replace=False)]
+
+        def panel_before():
+            out = []
+            for vid in history:
+                m = df[df["video_id"].astype(str) == str(vid)]
+                out.append(m.iloc[0].to_dict() if not m.empty else None)
+            return out
+
+        cases = [
+            ("history panel, last 10", panel_before, lambda: index.rows(df, history, ["title", "channel"])),
+            ("ensure_in_catalog membership", lambda: history[0] in df["video_id"].astype(str).tolist(),
+             lambda: history[0] in index),
+            ("id_to_idx per recommend call", lambda: {v: i for i, v in enumerate(df["video_id"].astype(str).tolist())},
+             lambda: index.positions(history)),
+        ]
+        for name, before, after in cases:
+            b, a = best_ms(before), best_ms(after)
+            print(f"{n:>9,}  {name:<36}{b:>11.3f}{a:>10.3f}{b / a:>8.0f}x")
+        print(f"{n:>9,}  {'(one-off CatalogIndex per version)':<36}{best_ms(lambda: CatalogIndex(df['video_id']), 1):>11.3f}")
@@ -0,0 +1,66 @@
+# benchmarks/catalog_store.py
+# Cold load, column projection and single-video append: CSV catalog vs. columnar CatalogStore.
+# Usage: python benchmarks/catalog_store.py [n_videos]
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.catalog_store import CatalogStore, DISPLAY_COLUMNS, with_text_column
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word{i}" for i in range(5000)])
+    return pd.DataFrame({
+        "video_id": [f"vid{i:011d}" for i in range(n)],
+        "title": [" ".join(t) for t in words[rng.integers(0, 5000, (n, 6))]],
+        "channel": [f"channel {i % 2000}" for i in range(n)],
+        "artist": [f"artist {i % 500}" for i in range(n)],
+        "description": [" ".join(t) for t in words[rng.integers(0, 5000, (n, 25))]],
+        "tags": [",".join(t) for t in words[rng.integers(0, 5000, (n, 5))]],
+        "viewCount": rng.integers(0, 10**9, n),
+        "viewCount_norm": rng.random(n),
+    })
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    tmp = tempfile.mkdtemp()
+    try:
+        df = synthetic_catalog(n)
+        csv_path = os.path.join(tmp, "youtube_features.csv")
+        df.to_csv(csv_path, index=False)
+        store = CatalogStore(os.path.join(tmp, "catalog"))
+        store.write(df)
+        new_row = {"video_id": "new", "title": "new song", "channel": "c", "text": "new song c"}
+
+        def csv_append():
+            full = with_text_column(pd.read_csv(csv_path))
+            pd.concat([full, pd.DataFrame([new_row])], ignore_index=True).to_csv(csv_path, index=False)
+
+        rows = [
+            ("cold load (all columns + text)", lambda: with_text_column(pd.read_csv(csv_path)), lambda: store.load()),
+            ("load ids/titles for rendering", lambda: pd.read_csv(csv_path, usecols=DISPLAY_COLUMNS),
+             lambda: store.load(DISPLAY_COLUMNS)),
+            ("append one video", csv_append, lambda: store.append([new_row])),
+        ]
+        print(f"n={n:,} videos  csv={os.path.getsize(csv_path) / 2**20:.1f} MB  "
+              f"store={sum(os.path.getsize(os.path.join(store.root, p)) for p in store.parts()) / 2**20:.1f} MB")
+        print(f"{'case':<34}{'csv ms':>10}{'store ms':>10}{'speedup':>9}")
+        for name, before, after in rows:
+            b, a = timed(before), timed(after)
+            print(f"{name:<34}{b:>10.1f}{a:>10.1f}{b / a:>8.0f}x")
+    finally:
+        shutil.rmtree(tmp)
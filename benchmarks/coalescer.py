@@ -0,0 +1,69 @@
+# benchmarks/coalescer.py
+# Recommendation throughput and latency under concurrent load: every request searching on its own
+# vs. concurrent FAISS searches / ALS products coalesced into one batch (BATCH_WINDOW_MS, BATCH_MAX).
+# Clients call the engine directly (no HTTP), each issuing requests back to back.
+# degraded: share of hybrid requests that lost a retrieval stage (timeout or error).
+# Usage: python benchmarks/coalescer.py [n_videos] [seconds_per_run]
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.service import make_engine
+
+WINDOWS_MS = (0, 2, 5)
+CLIENTS = (1, 8, 32)
+MODELS = ("Content-Based", "Hybrid")
+
+
+def load(engine, users, model: str, clients: int, seconds: float):
+    end = time.perf_counter() + seconds
+
+    def client(c):
+        latencies = []
+        i = c
+        while time.perf_counter() < end:
+            t0 = time.perf_counter()
+            engine.recommend_for_user(users[i % len(users)], 10, model)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            i += clients
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = np.concatenate([np.asarray(l) for l in pool.map(client, range(clients))])
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+if __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{n_videos:,} videos (flat index), 10 recommendations per request, {seconds:.0f}s per run")
+        print(f"{'model':>14} {'window':>7} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'degraded':>9}")
+        for window in WINDOWS_MS:
+            engine, users = make_engine(os.path.join(tmp, f"w{window}"), n_videos, n_users=500,
+                                        batch_window_ms=window, max_batch=32)
+            snap = engine.snapshot()
+            for model in MODELS:
+                for clients in CLIENTS:
+                    load(engine, users, model, clients, 0.5)  # warm up
+                    before = snap.content.batcher.stats() if snap.content.batcher else None
+                    hybrid = engine.hybrid_stats.stats()
+                    rate, lat = load(engine, users, model, clients, seconds)
+                    p50, p99 = np.percentile(lat, [50, 99])
+                    batch = "-"
+                    if before is not None:
+                        after = snap.content.batcher.stats()
+                        batch = f"{(after['calls'] - before['calls']) / max(1, after['batches'] - before['batches']):.1f}"
+                    label = f"{window} ms" if window else "off"
+                    done = engine.hybrid_stats.stats()
+                    ranked = done["requests"] - hybrid["requests"]
+                    degraded = f"{(done['degraded'] - hybrid['degraded']) / ranked:.0%}" if ranked else "-"
+                    print(f"{model:>14} {label:>7} {clients:8d} {rate:8.0f} {p50:8.2f} {p99:8.2f} {batch:>6} {degraded:>9}")
+            engine.close()
+            del engine, snap
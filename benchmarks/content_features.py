@@ -0,0 +1,57 @@
+# benchmarks/content_features.py
+# Build + save + load of the data_loader feature matrix (TF-IDF 5000 + 4 audio columns):
+# dense float32 pickle vs. CSR .npz. Each mode runs in its own process for a clean peak RSS.
+# Usage: python benchmarks/content_features.py [n_videos]
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.content_memory import synthetic_text
+
+
+def run(mode: str, n_videos: int):
+    import joblib
+    from scipy.sparse import hstack
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from src.data_loader import save_content_matrix, load_content_matrix
+
+    text = synthetic_text(n_videos)
+    tfidf_matrix = TfidfVectorizer(max_features=5000, dtype=np.float32).fit_transform(text)
+    audio = np.random.default_rng(42).uniform(0, 1, (n_videos, 4)).astype(np.float32)
+    del text
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        if mode == "dense":
+            matrix = hstack([tfidf_matrix, audio]).toarray().astype("float32")
+            path = os.path.join(tmp, "content_matrix.pkl")
+            joblib.dump(matrix, path)
+        else:
+            matrix = hstack([tfidf_matrix, audio], format="csr", dtype=np.float32)
+            path = os.path.join(tmp, "content_matrix.npz")
+            save_content_matrix(path, matrix)
+        build = time.perf_counter() - t0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        del matrix
+        t0 = time.perf_counter()
+        loaded = joblib.load(path) if mode == "dense" else load_content_matrix(path)
+        load = time.perf_counter() - t0
+        print(f"{mode:>6}: shape={loaded.shape} build+save={build:6.2f}s load={load:6.3f}s "
+              f"file={os.path.getsize(path) / 2**20:9.1f} MiB peak_rss=+{(peak - base) / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        run(sys.argv[1], int(sys.argv[2]))
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+        for mode in ("sparse", "dense"):
+            proc = subprocess.run([sys.executable, __file__, mode, str(n)])
+            if proc.returncode:
+                print(f"{mode:>6}: failed (exit {proc.returncode}; the dense matrix is {n * 5004 * 4 / 2**30:.1f} GiB as float32)")
@@ -0,0 +1,53 @@
+# benchmarks/content_memory.py
+# Peak RSS of the content model build: dense TF-IDF -> IndexFlatIP vs. compact SVD embeddings.
+# Usage: python benchmarks/content_memory.py [n_videos]
+import os
+import sys
+import time
+import resource
+import subprocess
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def synthetic_text(n_videos: int, vocab: int = 30000, words: int = 40, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Zipf-ish word frequencies, like real titles/descriptions
+    ids = np.minimum(rng.zipf(1.3, size=(n_videos, words)), vocab) - 1
+    return [" ".join(f"w{w}" for w in row) for row in ids]
+
+
+def run(mode: str, n_videos: int):
+    import faiss
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from src.content_index import fit_projection, embed, build_index
+
+    text = synthetic_text(n_videos)
+    tfidf_matrix = TfidfVectorizer(max_features=10000).fit_transform(text)
+    del text
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    if mode == "dense":
+        dense = tfidf_matrix.astype("float32").toarray()
+        faiss.normalize_L2(dense)
+        index = faiss.IndexFlatIP(dense.shape[1])
+        index.add(dense)
+    else:
+        projector = fit_projection(tfidf_matrix, dim=256)
+        index = build_index(embed(projector, tfidf_matrix))
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode:>6}: nnz={tfidf_matrix.nnz:,} d={index.d:<6} build={elapsed:6.2f}s "
+          f"peak_rss={peak / 1024:8.1f} MB (+{(peak - base) / 1024:.1f} MB over TF-IDF)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        run(sys.argv[1], int(sys.argv[2]))
+    else:
+        n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+        # separate processes so each mode gets its own peak RSS
+        for mode in ("dense", "svd"):
+            subprocess.run([sys.executable, __file__, mode, str(n)], check=True)
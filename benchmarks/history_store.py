@@ -0,0 +1,83 @@
+# benchmarks/history_store.py
+# Save and "last 10" read latency: per-user JSON files (old add_to_history) vs. HistoryStore (SQLite WAL).
+# Usage: python benchmarks/history_store.py [n_users] [history_len]
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.history_store import HistoryStore
+
+
+def json_add(path, video_id):
+    # the old load -> list scan -> rewrite-with-indent cycle
+    history = json.load(open(path)) if os.path.exists(path) else []
+    if video_id not in history:
+        history.append(video_id)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def json_recent(path, n=10):
+    return list(reversed(json.load(open(path))[-n:]))
+
+
+def per_op_ms(fn, ops):
+    t0 = time.perf_counter()
+    for op in ops:
+        fn(*op)
+    return (time.perf_counter() - t0) * 1000 / len(ops)
+
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    hist_len = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    tmp = tempfile.mkdtemp()
+    try:
+        # populate: n_users users with hist_len saves each
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        conn = store._conn()
+        t0 = time.perf_counter()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany("INSERT INTO history (user_id, video_id, added_at) VALUES (?, ?, 0)",
+                             ((f"u{u}", f"v{i}") for u in range(n_users) for i in range(hist_len)))
+        print(f"{n_users:,} users x {hist_len:,} saves = {n_users * hist_len:,} rows "
+              f"(bulk load {time.perf_counter() - t0:.1f}s)")
+        json_dir = os.path.join(tmp, "json")
+        os.makedirs(json_dir)
+        for u in range(200):  # JSON cost only depends on the user's own history length
+            with open(os.path.join(json_dir, f"u{u}.json"), "w") as f:
+                json.dump([f"v{i}" for i in range(hist_len)], f, indent=2)
+
+        users = [f"u{u}" for u in range(200)]
+        saves = [(u, f"new{i}") for i, u in enumerate(users * 2)]
+        dup = [(u, "v5") for u in users]
+        print(f"{'operation':<28}{'json ms':>10}{'sqlite ms':>11}")
+        rows = [
+            ("save new video", per_op_ms(lambda u, v: json_add(os.path.join(json_dir, f"{u}.json"), v), saves),
+             per_op_ms(store.add, saves)),
+            ("save duplicate", per_op_ms(lambda u, v: json_add(os.path.join(json_dir, f"{u}.json"), v), dup),
+             per_op_ms(store.add, dup)),
+            ("read last 10 (panel rerun)", per_op_ms(lambda u: json_recent(os.path.join(json_dir, f"{u}.json")), [(u,) for u in users]),
+             per_op_ms(lambda u: store.recent(u, 10), [(u,) for u in users])),
+        ]
+        for name, a, b in rows:
+            print(f"{name:<28}{a:>10.3f}{b:>11.3f}")
+
+        def writer(t):
+            for i in range(500):
+                store.add(f"u{(t * 500 + i) % n_users}", f"c{t}-{i}")
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=writer, args=(t,)) for t in range(8)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        el = time.perf_counter() - t0
+        print(f"8 concurrent writer threads: 4,000 saves in {el:.2f}s ({4000 / el:,.0f} saves/s, no lost writes: "
+              f"{sum(store.count(f'u{u}') for u in range(n_users)) == n_users * hist_len + 4000 + 400})")
+    finally:
+        shutil.rmtree(tmp)
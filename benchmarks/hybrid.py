@@ -0,0 +1,48 @@
+# benchmarks/hybrid.py
+# Hybrid ranker cost per stage vs. candidates retrieved per source, and agreement with a larger candidate pool.
+# Usage: python benchmarks/hybrid.py [n_videos]
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.catalog_store import CatalogIndex
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.hybrid import HybridRanker
+
+K = 10
+REQUESTS = 50
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = np.random.default_rng(0)
+    ids = [f"v{i}" for i in range(n)]
+    words = np.array([f"w{i}" for i in range(5000)])
+    text = [" ".join(words[rng.integers(0, 5000, 12)]) for _ in range(n)]
+    t0 = time.perf_counter()
+    content = ContentModel.from_catalog(ids, text, dim=128)
+    collab = CollabModel(rng.normal(size=(100, 64)), rng.normal(size=(n, 64)), [f"u{i}" for i in range(100)], ids)
+    popularity = rng.random(n)
+    index = CatalogIndex(ids)
+    print(f"{n:,} videos, models built in {time.perf_counter() - t0:.1f}s; {REQUESTS} requests, 20-video histories")
+
+    histories = [list(rng.choice(ids, 20, replace=False)) for _ in range(REQUESTS)]
+    reference = HybridRanker(index, popularity, np.argsort(-popularity), content, collab, candidates=2000,
+                             budgets={"content": 10, "als": 10})
+    ref = [set(reference.rank(h, K, exclude=index.positions(h))[0].tolist()) for h in histories]
+    stages = ["content", "als", "popularity", "score", "blend", "total"]
+    print(f"{'candidates':>10}  " + "".join(f"{s:>11}" for s in stages) + f"{'overlap@10':>12}")
+    for candidates in (50, 200, 500):
+        ranker = HybridRanker(index, popularity, np.argsort(-popularity), content, collab, candidates=candidates,
+                              budgets={"content": 10, "als": 10})
+        sums = dict.fromkeys(stages, 0.0)
+        overlap = 0
+        for h, r in zip(histories, ref):
+            pos, _, timings = ranker.rank(h, K, exclude=index.positions(h))
+            for s in stages:
+                sums[s] += timings.get(s) or 0.0
+            overlap += len(r & set(pos.tolist())) / K
+        print(f"{candidates:>10}  " + "".join(f"{sums[s] / REQUESTS:>8.2f} ms" for s in stages) + f"{overlap / REQUESTS:>12.2f}")
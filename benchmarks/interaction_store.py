@@ -0,0 +1,81 @@
+# benchmarks/interaction_store.py
+# ALS input prep: the legacy pickled string DataFrame (read_pickle, category codes, COO -> CSR)
+# vs. the categorical pickle vs. the int32-coded InteractionStore (streamed CSR build).
+# Each case runs in a child process so its peak RSS is its own.
+# Usage: python benchmarks/interaction_store.py [n_users] [n_videos]
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.collab_model import interaction_matrix
+from src.data_loader import iter_interactions, generate_interactions, _user_names
+from src.interaction_store import InteractionStore
+
+
+def legacy_matrix(path):
+    """What src/models.py did before: category codes per column, then one COO build of the whole frame."""
+    interactions = pd.read_pickle(path)
+    item_col = 'track_id' if 'track_id' in interactions.columns else 'video_id'
+    users = interactions['user_id'].astype('category')
+    tracks = interactions[item_col].astype('category')
+    return interaction_matrix(users.cat.codes, tracks.cat.codes, interactions['rating'],
+                              (len(users.cat.categories), len(tracks.cat.categories)))
+
+
+def peak_rss_mb() -> float:
+    """This process's RSS high-water mark (ru_maxrss would carry over the parent's across fork + exec)."""
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+
+def size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 2**20
+    return os.path.getsize(path) / 2**20
+
+
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] == "--child":
+    # child process: build the CSR (and the id dictionaries) once, report seconds, nnz and its own peak RSS
+    kind, path = sys.argv[2], sys.argv[3]
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    if kind == "store":
+        store = InteractionStore(path)
+        m, users, items = store.csr(), store.user_ids(), store.item_ids()
+    else:
+        m = legacy_matrix(path)
+    print(time.perf_counter() - start, m.nnz, peak_rss_mb() - before)
+elif __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    n_videos = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    videos = pd.Index([f"v{i:07d}" for i in range(n_videos)])
+    root = tempfile.mkdtemp()
+    try:
+        paths = {
+            "string pickle": os.path.join(root, "strings.pkl"),
+            "categorical pickle": os.path.join(root, "categorical.pkl"),
+            "InteractionStore": os.path.join(root, "store"),
+        }
+        df = generate_interactions(videos, n_users, skew=1.0)
+        df.to_pickle(paths["categorical pickle"])
+        df.astype({"user_id": str, "video_id": object}).astype({"user_id": object}).to_pickle(paths["string pickle"])
+        rows = len(df)
+        del df
+        InteractionStore(paths["InteractionStore"]).write_chunks(
+            iter_interactions(n_videos, n_users, skew=1.0), _user_names(0, n_users), videos)
+        print(f"{rows:,} interactions, {n_users:,} users x {n_videos:,} videos")
+        print(f"{'input':<20}{'disk MB':>9}{'CSR s':>8}{'peak MB':>9}  (peak RSS above the interpreter + imports)")
+        for name, path in paths.items():
+            kind = "store" if name == "InteractionStore" else "pickle"
+            res = subprocess.run([sys.executable, __file__, "--child", kind, path],
+                                 capture_output=True, text=True, check=True)
+            secs, nnz, rss = res.stdout.split()[-3:]
+            print(f"{name:<20}{size_mb(path):>9.0f}{float(secs):>8.2f}{float(rss):>9.0f}")
+    finally:
+        shutil.rmtree(root)
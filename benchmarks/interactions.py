@@ -0,0 +1,66 @@
+# benchmarks/interactions.py
+# Synthetic interaction generation: the old per-user np.random.choice loop vs. the vectorized generator.
+# Usage: python benchmarks/interactions.py [users] [videos]
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader import generate_interactions, iter_interactions, write_interactions
+
+
+def loop_interactions(video_ids, num_users):
+    """The dict-per-rating loop generate_features_and_interactions used to run."""
+    np.random.seed(42)
+    interactions = []
+    for u in range(num_users):
+        user_id = f"user_{u}"
+        chosen = np.random.choice(video_ids, size=np.random.randint(10, 30), replace=False)
+        for vid in chosen:
+            interactions.append({"user_id": user_id, "video_id": vid, "rating": np.random.randint(1, 6)})
+    return pd.DataFrame(interactions)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    n_videos = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    videos = pd.Index([f"v{i:07d}" for i in range(n_videos)])
+
+    small = 2000
+    old, t_old = timed(lambda: loop_interactions(videos, small))
+    new, t_new = timed(lambda: generate_interactions(videos, small))
+    print(f"{small:,} users x {n_videos:,} videos: loop {t_old:.2f}s ({len(old) / t_old:,.0f} rows/s), "
+          f"generator {t_new:.3f}s ({len(new) / t_new:,.0f} rows/s)")
+
+    print(f"\n{n_users:,} users x {n_videos:,} videos")
+    print(f"{'case':<42}{'rows':>12}{'seconds':>9}{'rows/s':>14}")
+    for skew in (0.0, 1.0):
+        rows, t = timed(lambda: sum(len(c["user"]) for c in iter_interactions(n_videos, n_users, skew=skew)))
+        print(f"{f'arrays, skew {skew}':<42}{rows:>12,}{t:>9.2f}{rows / t:>14,.0f}")
+    rows, t = timed(lambda: sum(len(c["user"]) for c in iter_interactions(
+        n_videos, n_users, items_per_user=(5, 200), distribution="lognormal", skew=1.0)))
+    print(f"{'arrays, lognormal 5..200, skew 1.0':<42}{rows:>12,}{t:>9.2f}{rows / t:>14,.0f}")
+    df, t = timed(lambda: generate_interactions(videos, n_users, skew=1.0))
+    print(f"{'DataFrame (categorical ids), skew 1.0':<42}{len(df):>12,}{t:>9.2f}{len(df) / t:>14,.0f}")
+    del df
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "interactions.parquet")
+        rows, t = timed(lambda: write_interactions(path, videos, n_users, skew=1.0))
+        print(f"{'Parquet, skew 1.0':<42}{rows:>12,}{t:>9.2f}{rows / t:>14,.0f}"
+              f"  ({os.path.getsize(path) / 2**20:.0f} MiB)")
+
+    # popularity skew: share of interactions on the top 1% of videos
+    for skew in (0.0, 0.8, 1.2):
+        items = np.concatenate([c["item"] for c in iter_interactions(n_videos, 20_000, skew=skew)])
+        counts = np.sort(np.bincount(items, minlength=n_videos))[::-1]
+        print(f"skew {skew}: top 1% of videos get {counts[:n_videos // 100].sum() / counts.sum():.1%} of interactions")
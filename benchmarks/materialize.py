@@ -0,0 +1,51 @@
+# benchmarks/materialize.py
+# Result construction: per-row iterrows/iloc payloads vs. column-wise snippet_items, for downstream-sized top-k.
+# Usage: python benchmarks/materialize.py
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.ranking import popularity_order, ranked_candidates, snippet_items
+
+
+def best_ms(fn, number=5, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) * 1000 / number
+
+
+def iterrows_items(df, positions):
+    items = []
+    for _, r in df.iloc[positions].iterrows():
+        items.append({"id": {"videoId": str(r.get("video_id"))},
+                      "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
+    return items
+
+
+def iloc_items(df, positions):
+    items = []
+    for i in positions:
+        r = df.iloc[i]
+        items.append({"id": {"videoId": str(r.get("video_id"))},
+                      "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
+    return items
+
+
+if __name__ == "__main__":
+    n = 200_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"video_id": [f"v{i:07d}" for i in range(n)], "title": [f"title {i}" for i in range(n)],
+                       "channel": "c", "text": "some text", "viewCount_norm": rng.random(n),
+                       "danceability": rng.random(n), "energy": rng.random(n)})
+    order = popularity_order(df)
+    history = rng.choice(n, 50, replace=False)
+    print(f"catalog {n:,} rows")
+    print(f"{'top_k':>6}  {'iterrows ms':>12}{'iloc ms':>10}{'pipeline ms':>13}{'speedup':>9}")
+    for k in (10, 100, 500):
+        primary = rng.choice(n, k // 2, replace=False)  # model returns half, popularity fills the rest
+        pos = ranked_candidates(n, k, primary=primary, order=order, exclude=history)
+        a, b = best_ms(lambda: iterrows_items(df, pos)), best_ms(lambda: iloc_items(df, pos))
+        c = best_ms(lambda: snippet_items(df, ranked_candidates(n, k, primary=primary, order=order, exclude=history)))
+        print(f"{k:>6}  {a:>12.2f}{b:>10.2f}{c:>13.3f}{min(a, b) / c:>8.0f}x")
@@ -0,0 +1,120 @@
+# benchmarks/model_registry.py
+# Request latency while the catalog and the published bundle change underneath the app:
+# rebuilding inline on the first request that sees a new version (the old cache-clearing path)
+# vs. ModelRegistry building the next snapshot in the background and swapping it in.
+# Usage: python benchmarks/model_registry.py [n_videos] [seconds]
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.artifacts import make_models
+from benchmarks.catalog_store import synthetic_catalog
+from src.artifacts import ArtifactBundle, write_bundle, publish_version, current_version
+from src.catalog_store import CatalogStore, CatalogIndex
+from src.hybrid import HybridRanker
+from src.model_registry import ModelRegistry, Snapshot
+from src.ranking import popularity_order, popularity_scores
+
+CHANGE_EVERY = 1.0  # seconds between source changes (alternately a catalog append and a bundle publish)
+
+
+def make_build(store: CatalogStore, root: str):
+    """Same shape as the app's build_snapshot: reload only what changed, then warm the index."""
+    def build(version, previous):
+        catalog_ver, bundle_ver = version
+        if previous is not None and previous.catalog_version == catalog_ver:
+            df, index, popularity, order = previous.df, previous.index, previous.popularity, previous.order
+        else:
+            df = store.load()
+            index, popularity, order = CatalogIndex(df["video_id"]), popularity_scores(df), popularity_order(df)
+        if previous is not None and previous.bundle_version == bundle_ver:
+            content, collab = previous.content, previous.collab
+        else:
+            bundle = ArtifactBundle.open(root, bundle_ver)
+            content, collab = bundle.load_content(), bundle.load_collab()
+            content.search(np.ones((1, content.dim), dtype="float32"), 1)
+        return dict(catalog_version=catalog_ver, bundle_version=bundle_ver, df=df, index=index, popularity=popularity,
+                    order=order, content=content, collab=collab,
+                    ranker=HybridRanker(index, popularity, order, content, collab, budgets={"content": 5, "als": 5}))
+    return build
+
+
+def drive(serve, store: CatalogStore, root: str, versions, seconds: float, histories):
+    """Issue requests back to back while a writer thread moves the catalog/bundle version."""
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.wait(CHANGE_EVERY):
+            if i % 2 == 0:
+                store.append([{"video_id": f"new{i:08d}", "title": "new video", "viewCount_norm": 0.5}])
+            else:
+                publish_version(root, versions[(i // 2) % len(versions)])
+            i += 1
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    latencies = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        history = histories[len(latencies) % len(histories)]
+        t0 = time.perf_counter()
+        serve(history)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    stop.set()
+    thread.join()
+    return np.array(latencies)
+
+
+if __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CatalogStore(os.path.join(tmp, "catalog"))
+        df = synthetic_catalog(n_videos)
+        content, collab = make_models(n_videos, n_videos // 2, df["video_id"])
+        root = os.path.join(tmp, "artifacts")
+        versions = [write_bundle(root, content, collab) for _ in range(2)]
+        del content, collab
+        ids = df["video_id"].to_numpy()
+        histories = [ids[np.random.default_rng(i).integers(0, n_videos, 10)].tolist() for i in range(50)]
+        build = make_build(store, root)
+        version_fn = lambda: (store.version(), current_version(root))
+        print(f"{n_videos:,} videos, a catalog append or bundle publish every {CHANGE_EVERY:.0f}s, {seconds:.0f}s per mode")
+        print(f"{'mode':>9} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  rebuilds")
+
+        for mode in ("inline", "registry"):
+            store.write(df)
+            publish_version(root, versions[0])
+            builds = []
+            if mode == "inline":
+                cache = {}
+
+                def serve(history):
+                    version = version_fn()
+                    if cache.get("snap") is None or cache["snap"].version != version:
+                        t0 = time.perf_counter()
+                        cache["snap"] = Snapshot(version, **build(version, cache.get("snap")))
+                        builds.append((time.perf_counter() - t0) * 1000)
+                    cache["snap"].ranker.rank(history, 10)
+                serve(histories[0])
+            else:
+                registry = ModelRegistry(version_fn, build, interval=0.1)
+                registry.current()
+                registry.start()
+
+                def serve(history):
+                    registry.current().ranker.rank(history, 10)
+            lat = drive(serve, store, root, versions, seconds, histories)
+            if mode == "registry":
+                registry.stop()
+                builds = [e["build_ms"] for e in registry.status()["log"]][1:]
+            p50, p99 = np.percentile(lat, [50, 99])
+            print(f"{mode:>9} {len(lat):9,d} {p50:8.1f} {p99:8.1f} {lat.max():8.1f}  "
+                  f"{len(builds)} x {np.mean(builds) if builds else 0:.0f} ms"
+                  f"{' on the request path' if mode == 'inline' else ' in the background'}")
@@ -0,0 +1,41 @@
+# benchmarks/pipeline.py
+# Training wall time for the model fits as a cached stage graph (src/models.py training_stages):
+# a cold run, a re-run with nothing changed, and a re-run after only the interactions changed.
+# Usage: python benchmarks/pipeline.py [n_videos] [n_users] [workers]
+import os
+import sys
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.catalog_store import synthetic_catalog
+from src.catalog_store import CatalogStore
+from src.data_loader import generate_interactions
+from src.models import training_stages
+from src.pipeline import Pipeline
+
+
+if __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_users = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    with tempfile.TemporaryDirectory() as tmp:
+        df = synthetic_catalog(n_videos)
+        df["text"] = df["title"] + " " + df["artist"] + " " + df["tags"]
+        catalog = os.path.join(tmp, "catalog")
+        CatalogStore(catalog).write(df)
+        interactions = os.path.join(tmp, "interactions.pkl")
+        generate_interactions(df["video_id"], n_users).to_pickle(interactions)
+        print(f"{n_videos:,} videos, {n_users:,} users, workers={workers or 'auto'} ({os.cpu_count()} CPUs)")
+        print(f"{'run':>21} {'seconds':>8} {'popularity':>11} {'content':>8} {'als':>8}")
+        for run in ("cold", "unchanged", "interactions changed"):
+            if run == "interactions changed":
+                generate_interactions(df["video_id"], n_users, seed=7).to_pickle(interactions)
+            pipeline = Pipeline(training_stages(catalog, interactions), os.path.join(tmp, "cache"), workers,
+                                log=lambda line: None)
+            start = time.perf_counter()
+            with contextlib.redirect_stderr(open(os.devnull, "w")):  # ALS progress bar
+                report = pipeline.run()
+            cells = ["cached" if r["cached"] else f"{r['seconds']:.2f}s" for r in report.values()]
+            print(f"{run:>21} {time.perf_counter() - start:8.2f} {cells[0]:>11} {cells[1]:>8} {cells[2]:>8}")
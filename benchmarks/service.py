@@ -0,0 +1,84 @@
+# benchmarks/service.py
+# Recommendation service throughput and latency: one keep-alive connection per client thread
+# vs. a new TCP connection per request, at several client concurrencies, against an in-process server.
+# Usage: python benchmarks/service.py [n_videos] [requests_per_client]
+import os
+import sys
+import time
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from benchmarks.artifacts import make_models
+from benchmarks.catalog_store import synthetic_catalog
+from src.api_client import RecommenderClient
+from src.artifacts import write_bundle
+from src.catalog_store import CatalogStore
+from src.engine import RecommendationEngine
+from src.service import RecommendationServer
+
+CLIENTS = (1, 4, 16)
+
+
+def make_engine(root: str, n_videos: int, n_users: int = 200, history: int = 5, **options):
+    """Engine over a synthetic catalog + published bundle in `root`, with `n_users` saved histories."""
+    df = synthetic_catalog(n_videos)
+    CatalogStore(os.path.join(root, "catalog")).write(df)
+    content, collab = make_models(n_videos, 1000, df["video_id"])
+    write_bundle(os.path.join(root, "artifacts"), content, collab)
+    del content, collab
+    engine = RecommendationEngine(catalog_dir=os.path.join(root, "catalog"), artifact_dir=os.path.join(root, "artifacts"),
+                                  history_db=os.path.join(root, "history.db"), history_dir=None,
+                                  youtube_cache_dir=os.path.join(root, "yt"), recommendations_csv=None,
+                                  content_model_path=None, collab_model_path=None, legacy_csv=None,
+                                  youtube_api_key="", **options).start()
+    rng = np.random.default_rng(0)
+    users = [f"user{u}" for u in range(n_users)]
+    for u in users:
+        for v in df["video_id"].to_numpy()[rng.integers(0, n_videos, history)]:
+            engine.history.add(u, v)
+    return engine, users
+
+
+def run_clients(port: int, users, clients: int, per_client: int, keep_alive: bool):
+    def client(c):
+        api = RecommenderClient(f"http://127.0.0.1:{port}")
+        latencies = []
+        for i in range(per_client):
+            if not keep_alive:
+                api._local.conn = http.client.HTTPConnection("127.0.0.1", port)
+            t0 = time.perf_counter()
+            api.recommend_user(users[(c * per_client + i) % len(users)], 10, "Content-Based")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if not keep_alive:
+                api._local.conn.close()
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = np.concatenate(list(pool.map(client, range(clients))))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+if __name__ == "__main__":
+    n_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    per_client = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, users = make_engine(tmp, n_videos)
+        server = RecommendationServer(("127.0.0.1", 0), engine)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        run_clients(port, users, 1, 20, True)  # warm up
+        print(f"{n_videos:,} videos, GET /recommend/user (content-based), {per_client} requests per client")
+        print(f"{'connection':>12} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for keep_alive in (False, True):
+            for clients in CLIENTS:
+                rate, lat = run_clients(port, users, clients, per_client, keep_alive)
+                p50, p99 = np.percentile(lat, [50, 99])
+                print(f"{'keep-alive' if keep_alive else 'per request':>12} {clients:8d} {rate:8.0f} {p50:8.2f} {p99:8.2f}")
+        server.shutdown()
+        engine.close()
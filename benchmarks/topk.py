@@ -0,0 +1,47 @@
+# benchmarks/topk.py
+# Per-request ranking cost: full sorts vs. argpartition top-k and a precomputed popularity order.
+# Usage: python benchmarks/topk.py
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.ranking import top_k_indices, popularity_order, take_ranked
+
+K = 10
+
+
+def best_ms(fn, number=5, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) * 1000 / number
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    print(f"{'n':>9}  {'case':<40}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+    for n in (100_000, 1_000_000):
+        sims = rng.random(n)
+        history = rng.choice(n, 50, replace=False)
+        df = pd.DataFrame({"video_id": np.arange(n).astype(str), "viewCount_norm": rng.random(n)})
+        order = popularity_order(df)
+
+        def argsort_path():
+            s = sims.copy()
+            s[history] = -1.0
+            return np.argsort(-s)[:K]
+
+        cases = [
+            ("similarity top-k, 50 excluded", argsort_path,
+             lambda: top_k_indices(sims, K, exclude=history)),
+            ("popularity top-k", lambda: df.sort_values("viewCount_norm", ascending=False).head(K),
+             lambda: df.iloc[take_ranked(order, K)]),
+            ("popularity top-k, 50 excluded",
+             lambda: df[~df.index.isin(history)].sort_values("viewCount_norm", ascending=False).head(K),
+             lambda: df.iloc[take_ranked(order, K, exclude=history)]),
+        ]
+        for name, before, after in cases:
+            b, a = best_ms(before), best_ms(after)
+            print(f"{n:>9,}  {name:<40}{b:>11.3f}{a:>10.3f}{b / a:>8.0f}x")
+        print(f"{n:>9,}  {'(one-off popularity_order per version)':<40}{best_ms(lambda: popularity_order(df), 1):>11.3f}")
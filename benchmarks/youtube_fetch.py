@@ -0,0 +1,67 @@
+# benchmarks/youtube_fetch.py
+# Wall clock and API request count of data_loader.fetch_youtube_videos against a fake
+# client with fixed per-request latency: old N+1 sequential loop vs. batched + concurrent.
+# Usage: python benchmarks/youtube_fetch.py [latency_ms]
+import io
+import os
+import sys
+import time
+import contextlib
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader import ARTISTS, fetch_youtube_videos
+
+
+class FakeRequest:
+    def __init__(self, client, response):
+        self.client, self.response = client, response
+
+    def execute(self):
+        time.sleep(self.client.latency)
+        with self.client.lock:
+            self.client.calls += 1
+        return self.response
+
+
+class FakeYouTube:
+    def __init__(self, latency: float):
+        self.latency, self.calls, self.lock = latency, 0, threading.Lock()
+
+    def search(self):
+        return self
+
+    def videos(self):
+        return self
+
+    def list(self, part, **params):
+        if part == "snippet":
+            a = params["q"].split()[0]
+            return FakeRequest(self, {"items": [{"id": {"videoId": f"{a}{i}"}, "snippet": {"title": f"{a} {i}"}} for i in range(50)]})
+        return FakeRequest(self, {"items": [{"id": v, "statistics": {"viewCount": "1"}} for v in params["id"].split(",")]})
+
+
+def old_fetch(youtube):
+    # the pre-batching loop: sequential artists, one videos.list per search result
+    videos = []
+    for artist in ARTISTS:
+        res = youtube.search().list(part="snippet", q=f"{artist} official music video", type="video",
+                                    maxResults=50, order="viewCount").execute()
+        for item in res.get("items", []):
+            stats = youtube.videos().list(part="statistics", id=item["id"]["videoId"]).execute()
+            videos.append((item["id"]["videoId"], int(stats["items"][0]["statistics"].get("viewCount", 0))))
+    return videos
+
+
+if __name__ == "__main__":
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 20) / 1000
+    os.chdir(tempfile.mkdtemp())
+    for name, fn in [("sequential N+1", old_fetch),
+                     ("batched, 4 workers", lambda yt: fetch_youtube_videos(youtube=yt, max_workers=4))]:
+        yt = FakeYouTube(latency)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(yt)
+        print(f"{name:<20} {len(ARTISTS)} artists  requests={yt.calls:<4} wall={time.perf_counter() - t0:6.2f}s "
+              f"(latency {latency * 1000:.0f} ms/request)")
@@ -0,0 +1,90 @@
+# src/api_client.py
+import json
+import threading
+import http.client
+from urllib.parse import urlsplit, urlencode
+
+# stdlib only: the app talking to a remote service must not load the engine (FAISS, scikit-learn)
+TIMEOUT = 30.0
+USER_MODELS = ["Hybrid", "Content-Based", "Collaborative"]  # `model` values the API accepts
+ARTISTS = [
+    "Arijit Singh", "Pritam", "Ed Sheeran", "Badshah", "Diljit Dosanjh",
+    "AP Dhillon", "Drake", "Taylor Swift", "The Weeknd", "Dua Lipa",
+    "Shreya Ghoshal", "Atif Aslam", "Neha Kakkar", "Jubin Nautiyal", "Armaan Malik",
+    "B Praak", "Darshan Raval", "Honey Singh", "Guru Randhawa", "Billie Eilish",
+    "KK", "A. R. Rahman", "Sonu Nigam", "Shankar Mahadevan", "Sunidhi Chauhan"
+]
+
+
+class RecommenderAPI:
+    """
+    Calls of the recommendation service API. Subclasses implement _call(method, path, params);
+    errors reported by the service are raised as RuntimeError.
+    """
+
+    def _call(self, method: str, path: str, params: dict) -> dict:
+        raise NotImplementedError
+
+    def recommend_user(self, user_id: str, k: int = 10, model: str = "Hybrid") -> dict:
+        return self._call("GET", "/recommend/user", {"user_id": user_id, "k": k, "model": model})
+
+    def recommend_artist(self, artist: str, model: str = "Hybrid", k: int = 10) -> dict:
+        return self._call("GET", "/recommend/artist", {"artist": artist, "model": model, "k": k})
+
+    def discover(self, artist: str = None) -> dict:
+        return self._call("GET", "/discover", {"artist": artist} if artist else {})
+
+    def history(self, user_id: str, n: int = 10) -> dict:
+        return self._call("GET", "/history", {"user_id": user_id, "n": n})
+
+    def save(self, user_id: str, video_id: str) -> dict:
+        return self._call("POST", "/library", {"user_id": user_id, "video_id": video_id})
+
+    def status(self) -> dict:
+        return self._call("GET", "/status", {})
+
+
+class RecommenderClient(RecommenderAPI):
+    """
+    HTTP client for src/service.py. Each thread keeps one persistent (keep-alive) connection;
+    a request on a connection the server has since closed is retried once on a fresh one.
+    """
+
+    def __init__(self, base_url: str, timeout: float = TIMEOUT):
+        url = urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self, fresh: bool = False) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _call(self, method: str, path: str, params: dict) -> dict:
+        path = self.prefix + path
+        body, headers = None, {}
+        if method == "GET":
+            path += "?" + urlencode(params) if params else ""
+        else:
+            body, headers = json.dumps(params).encode("utf-8"), {"Content-Type": "application/json"}
+        for attempt in range(2):
+            conn = self._conn(fresh=attempt > 0)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = json.loads(response.read() or b"{}")
+                break
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if attempt:
+                    raise
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} failed ({response.status}): {payload.get('error')}")
+        return payload
+
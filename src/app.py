@@ -1,38 +1,24 @@
 import os
-import json
+import sys
 import random
-from typing import List, Tuple
 
-import pandas as pd
-import numpy as np
 import streamlit as st
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api_client import RecommenderClient, ARTISTS, USER_MODELS
+from src.hybrid import format_timings
 
 load_dotenv()
 
 st.set_page_config(page_title="Music Recommender", layout="wide", initial_sidebar_state="expanded")
 
 # ============================================================================
-# PATHS & CONSTANTS
+# SERVICE
 # ============================================================================
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-DATA_DIR = os.path.join(BASE_DIR, "data")
-PROCESSED_CSV = os.path.join(DATA_DIR, "processed", "youtube_features.csv")
-HISTORY_DIR = os.path.join(DATA_DIR, "user_history")
-os.makedirs(os.path.dirname(PROCESSED_CSV), exist_ok=True)
-os.makedirs(HISTORY_DIR, exist_ok=True)
-
-ARTISTS = [
-    "Arijit Singh", "Pritam", "Ed Sheeran", "Badshah", "Diljit Dosanjh",
-    "AP Dhillon", "Drake", "Taylor Swift", "The Weeknd", "Dua Lipa",
-    "Shreya Ghoshal", "Atif Aslam", "Neha Kakkar", "Jubin Nautiyal", "Armaan Malik",
-    "B Praak", "Darshan Raval", "Honey Singh", "Guru Randhawa", "Billie Eilish",
-    "KK", "A. R. Rahman", "Sonu Nigam", "Shankar Mahadevan", "Sunidhi Chauhan"
-]
+# Recommendation service to call (python src/service.py); empty runs the engine inside this process
+RECOMMENDER_URL = os.getenv("RECOMMENDER_URL", "")
 
 # ============================================================================
 # DARK THEME CSS
@@ -189,82 +175,19 @@ def inject_youtube_api_and_player():
     st.markdown(js, unsafe_allow_html=True)
 
 
-# ============================================================================
-# YOUTUBE & CATALOG UTILITIES
-# ============================================================================
-def get_youtube_client():
-    api_key = os.getenv("YOUTUBE_API_KEY")
-    if not api_key:
-        raise RuntimeError("YOUTUBE_API_KEY not found in environment. Add it to .env")
-    return build("youtube", "v3", developerKey=api_key)
-
-
-@st.cache_resource
-def load_catalog():
-    if os.path.exists(PROCESSED_CSV):
-        df = pd.read_csv(PROCESSED_CSV)
-        def col_or_empty(col):
-            return df[col].fillna("").astype(str) if col in df.columns else pd.Series([""] * len(df), index=df.index)
-        if "text" not in df.columns:
-            df["text"] = (
-                col_or_empty("title") + " " +
-                col_or_empty("description") + " " +
-                col_or_empty("tags") + " " +
-                col_or_empty("channel") + " " +
-                col_or_empty("artist")
-            ).str[:10000]
-        return df
-    return pd.DataFrame(columns=["video_id", "title", "channel", "text", "viewCount_norm"])
-
-
-@st.cache_resource
-def build_tfidf_matrix(df: pd.DataFrame):
-    if df is None or df.empty:
-        return None, None
-    vec = TfidfVectorizer(max_features=10000, stop_words="english")
-    X = vec.fit_transform(df["text"].fillna(""))
-    return vec, X
 
 
 # ============================================================================
-# HISTORY UTILITIES
+# API CLIENT
 # ============================================================================
-def _history_path(user_id: str) -> str:
-    os.makedirs(HISTORY_DIR, exist_ok=True)
-    return os.path.join(HISTORY_DIR, f"{user_id}.json")
-
-
-def load_history(user_id: str) -> List[str]:
-    path = _history_path(user_id)
-    if os.path.exists(path):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            return data if isinstance(data, list) else []
-        except Exception:
-            return []
-    return []
-
-
-def save_history(user_id: str, history: List[str]) -> Tuple[bool, str, str]:
-    path = _history_path(user_id)
-    try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(history or [], f, ensure_ascii=False, indent=2)
-        return True, path, None
-    except Exception as e:
-        return False, path, str(e)
-
-
-def add_to_history(user_id: str, video_id: str):
-    if not video_id:
-        return False, None, "Empty video id"
-    history = load_history(user_id)
-    if video_id not in history:
-        history.append(video_id)
-        return save_history(user_id, history)
-    return True, _history_path(user_id), None
+@st.cache_resource
+def get_client():
+    """The recommendation API: the HTTP service if RECOMMENDER_URL is set, else one in-process engine."""
+    if RECOMMENDER_URL:
+        return RecommenderClient(RECOMMENDER_URL)
+    from src.service import LocalClient  # loads the engine and its models: only when serving in-process
+    from src.engine import RecommendationEngine
+    return LocalClient(RecommendationEngine().start())
 
 
 def get_active_user_id() -> str:
@@ -274,247 +197,38 @@ def get_active_user_id() -> str:
     return "me"
 
 
-# ============================================================================
-# RECOMMENDATION FUNCTIONS
-# ============================================================================
-def get_exactly_10(artist_name=None):
-    name = (artist_name or random.choice(ARTISTS)).strip()
-    try:
-        youtube = get_youtube_client()
-    except Exception:
-        youtube = None
-
-    candidates = []
-    tried = set()
-    queries = [
-        f"{name} official audio",
-        f"{name} official music video",
-        f"{name} music video",
-        f"{name} song",
-        f"{name} audio"
-    ]
-
-    if youtube:
-        for q in queries:
-            try:
-                res = youtube.search().list(
-                    part="snippet",
-                    q=q,
-                    maxResults=50,
-                    type="video",
-                    safeSearch="none"
-                ).execute()
-                for item in res.get("items", []):
-                    vid = (item.get("id") or {}).get("videoId")
-                    if vid and vid not in tried:
-                        candidates.append(item)
-                        tried.add(vid)
-                if len(candidates) >= 10:
-                    break
-            except Exception:
-                continue
+def recommend_for_user(user_id: str, top_k: int = 10, model: str = "Hybrid"):
+    res = get_client().recommend_user(user_id, top_k, model)
+    st.session_state["user_timings"] = res.get("timings")
+    return res["items"]
 
-    if len(candidates) < 10:
-        df = load_catalog()
-        if not df.empty:
-            name_l = name.lower()
-            mask = pd.Series(False, index=df.index)
-            for col in ["artist", "channel", "title", "description", "tags"]:
-                if col in df.columns:
-                    mask = mask | df[col].astype(str).str.lower().str.contains(name_l, na=False)
-            remaining = df[mask & ~df["video_id"].astype(str).isin(tried)]
-            if not remaining.empty:
-                if "viewCount_norm" in remaining.columns:
-                    remaining = remaining.sort_values("viewCount_norm", ascending=False)
-                needed = 10 - len(candidates)
-                for _, r in remaining.head(needed).iterrows():
-                    vid = str(r.get("video_id"))
-                    candidates.append({
-                        "id": {"videoId": vid},
-                        "snippet": {"title": r.get("title", "") or "", "channelTitle": r.get("channel", "") or ""}
-                    })
-                    tried.add(vid)
-
-    random.shuffle(candidates)
-    return candidates[:10]
 
+def recommend_for_artist(artist_name: str, model: str = "Hybrid", k: int = 10):
+    res = get_client().recommend_artist(artist_name, model, k)
+    st.session_state["artist_timings"] = res.get("timings")
+    return res["items"]
 
-def get_any_10():
-    results = []
-    seen = set()
-    artist_candidates = ARTISTS[:] if len(ARTISTS) <= 8 else random.sample(ARTISTS, 8)
-    for a in artist_candidates:
-        try:
-            for it in get_exactly_10(a):
-                vid = (it.get("id") or {}).get("videoId")
-                if vid and vid not in seen:
-                    results.append(it)
-                    seen.add(vid)
-                if len(results) >= 10:
-                    break
-        except Exception:
-            continue
-        if len(results) >= 10:
-            break
-
-    if not results:
-        df = load_catalog()
-        if not df.empty:
-            if "viewCount_norm" in df.columns:
-                samp = df.sort_values("viewCount_norm", ascending=False).head(10)
-            else:
-                samp = df.sample(min(10, len(df)), random_state=42)
-            for _, r in samp.iterrows():
-                vid = str(r.get("video_id"))
-                results.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-    return results[:10]
-
-
-def recommend_for_user(user_id: str, top_k: int = 10):
-    df = load_catalog()
-    if df is None or df.empty:
-        return get_any_10()
-
-    vec, X = build_tfidf_matrix(df)
-    if X is None:
-        return get_any_10()
-
-    history = load_history(user_id) or []
-    if not history:
-        if "viewCount_norm" in df.columns and df["viewCount_norm"].notna().any():
-            top = df.sort_values("viewCount_norm", ascending=False).head(top_k)
-        else:
-            top = df.sample(min(top_k, len(df)), random_state=42) if len(df) else df
-        items = []
-        for _, r in top.head(top_k).iterrows():
-            vid = str(r.get("video_id"))
-            items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-        if len(items) < top_k and len(df) > len(items):
-            remaining = df[~df["video_id"].astype(str).isin([it["id"]["videoId"] for it in items])]
-            if len(remaining) > 0:
-                extra = remaining.sample(min(top_k - len(items), len(remaining)), random_state=42)
-                for _, r in extra.iterrows():
-                    vid = str(r.get("video_id"))
-                    items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-        return items[:top_k]
-
-    id_to_idx = {vid: i for i, vid in enumerate(df["video_id"].astype(str).tolist())}
-    hist_idx = [id_to_idx[v] for v in history if v in id_to_idx]
-    if not hist_idx:
-        if "viewCount_norm" in df.columns:
-            fallback = df.sort_values("viewCount_norm", ascending=False).head(top_k)
-        else:
-            fallback = df.sample(min(top_k, len(df)), random_state=42)
-        items = []
-        for _, r in fallback.iterrows():
-            vid = str(r.get("video_id"))
-            items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-        if len(items) < top_k and len(df) > len(items):
-            remaining = df[~df["video_id"].astype(str).isin([it["id"]["videoId"] for it in items])]
-            if len(remaining) > 0:
-                extra = remaining.sample(min(top_k - len(items), len(remaining)), random_state=42)
-                for _, r in extra.iterrows():
-                    vid = str(r.get("video_id"))
-                    items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-        return items[:top_k]
-
-    sims = cosine_similarity(X[hist_idx], X).mean(axis=0)
-    sims = np.array(sims).ravel()
-    for i in hist_idx:
-        sims[i] = -1.0
-    top_idx = np.argsort(-sims)[:top_k]
-    items = []
-    for i in top_idx:
-        r = df.iloc[i]
-        vid = str(r.get("video_id"))
-        items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-
-    if len(items) < top_k and len(df) > len(items):
-        existing_ids = set(it["id"]["videoId"] for it in items)
-        remaining = df[~df["video_id"].astype(str).isin(existing_ids)]
-        if "viewCount_norm" in remaining.columns:
-            remaining = remaining.sort_values("viewCount_norm", ascending=False)
-        if len(remaining) > 0:
-            extra = remaining.head(top_k - len(items))
-            for _, r in extra.iterrows():
-                vid = str(r.get("video_id"))
-                items.append({"id": {"videoId": vid}, "snippet": {"title": r.get("title", ""), "channelTitle": r.get("channel", "")}})
-    return items[:top_k]
 
+def get_exactly_10(artist_name=None):
+    return get_client().discover(artist_name or random.choice(ARTISTS))["items"]
 
-# ============================================================================
-# CATALOG HELPERS
-# ============================================================================
-def ensure_in_catalog(video_id: str):
-    if not video_id:
-        return False, "empty video id"
-    try:
-        df = load_catalog()
-    except Exception:
-        df = pd.DataFrame()
-    if not df.empty and "video_id" in df.columns and str(video_id) in df["video_id"].astype(str).tolist():
-        return True, None
-    try:
-        yt = get_youtube_client()
-        res = yt.videos().list(part="snippet,statistics", id=video_id).execute()
-        items = res.get("items", [])
-    except Exception as e:
-        return False, f"YouTube API error: {e}"
-    if not items:
-        return False, "video not found via YouTube API"
-    v = items[0]
-    sn = v.get("snippet", {})
-    stt = v.get("statistics", {})
-    new_row = {
-        "video_id": video_id,
-        "title": sn.get("title", ""),
-        "channel": sn.get("channelTitle", ""),
-        "artist": "",
-        "tags": ",".join(sn.get("tags", [])) if sn.get("tags") else "",
-        "description": sn.get("description", ""),
-        "text": " ".join(filter(None, [
-            sn.get("title", ""),
-            sn.get("description", ""),
-            ",".join(sn.get("tags", [])) if sn.get("tags") else "",
-            sn.get("channelTitle", "")
-        ]))[:10000],
-        "viewCount": int(stt.get("viewCount", 0)) if stt.get("viewCount") else 0,
-        "likeCount": int(stt.get("likeCount", 0)) if stt.get("likeCount") else 0,
-        "commentCount": int(stt.get("commentCount", 0)) if stt.get("commentCount") else 0,
-        "viewCount_norm": 0.0,
-        "likeCount_norm": 0.0,
-        "commentCount_norm": 0.0,
-    }
-    try:
-        if df is None or df.empty:
-            df = pd.DataFrame([new_row])
-        else:
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        os.makedirs(os.path.dirname(PROCESSED_CSV), exist_ok=True)
-        df.to_csv(PROCESSED_CSV, index=False)
-    except Exception as e:
-        return False, f"Failed to write catalog CSV: {e}"
-    try:
-        load_catalog.clear()
-    except Exception:
-        pass
-    try:
-        build_tfidf_matrix.clear()
-    except Exception:
-        pass
-    return True, None
+
+def get_any_10():
+    return get_client().discover()["items"]
 
 
 def save_to_library(video_id: str, title: str, user_id: str = None):
     if user_id is None:
         user_id = get_active_user_id()
-    ok_cat, err_cat = ensure_in_catalog(video_id)
-    ok, path, err = add_to_history(user_id, video_id)
-    if ok:
+    try:
+        res = get_client().save(user_id, video_id)
+    except Exception as e:
+        res = {"ok": False, "error": str(e)}
+    if res["ok"]:
         st.success(f"✅ '{title}' added to your library!")
         return True
     else:
-        st.error(f"Failed to save '{title}': {err or err_cat}")
+        st.error(f"Failed to save '{title}': {res['error']}")
         return False
 
 
@@ -671,22 +385,40 @@ if "artist" not in st.session_state:
     st.session_state["artist"] = ARTISTS[0]
 if "artist_model" not in st.session_state:
     st.session_state["artist_model"] = "Hybrid"
+if "user_model" not in st.session_state:
+    st.session_state["user_model"] = USER_MODELS[0]
 
 # ============================================================================
 # SIDEBAR
 # ============================================================================
 with st.sidebar:
     mode = st.radio("Mode", ["User", "Artist"])
+    try:
+        service = get_client().status()
+    except Exception as e:
+        service = None
+        st.error(f"Recommendation service unavailable: {str(e)[:200]}")
     
     if mode == "User":
         user_id = st.text_input("User ID", get_active_user_id()).strip() or "me"
         st.session_state["user_id"] = user_id
+        user_model = st.selectbox("Model", USER_MODELS, index=USER_MODELS.index(st.session_state.get("user_model", USER_MODELS[0])))
+        if user_model == "Collaborative" and service is not None and not service["collab"]:
+            st.caption("No ALS model yet (run src/models.py); using content-based.")
+        st.session_state["user_model"] = user_model
     else:
         artist = st.selectbox("Artist", ARTISTS, index=ARTISTS.index(st.session_state.get("artist", ARTISTS[0])))
         model = st.selectbox("Model", ["Hybrid", "Popularity", "Content-Based"], index=["Hybrid", "Popularity", "Content-Based"].index(st.session_state.get("artist_model", "Hybrid")))
         st.session_state["artist"] = artist
         st.session_state["artist_model"] = model
 
+    if service is not None:
+        cache_stats = service["youtube_cache"]
+        st.caption(f"YouTube cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / "
+                   f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})")
+        st.caption(f"Models: {service['bundle_version'] or 'built from catalog'} · built in {service['build_ms'] or 0:.0f} ms · "
+                   f"{service['swaps']} swaps" + (" · rebuilding…" if service["building"] else ""))
+
     st.markdown("---")
     st.markdown(
         """
@@ -736,11 +468,9 @@ if mode == "User":
 
                 # fetch primary recommendations (catalog-aware)
                 try:
-                    df_check = load_catalog()
-                    if df_check is None or df_check.empty:
-                        fetched = get_any_10()
-                    else:
-                        fetched = recommend_for_user(st.session_state.get("user_id", "me"), top_k=10)
+                    # the service falls back to get_any_10 itself when the catalog is empty
+                    fetched = recommend_for_user(st.session_state.get("user_id", "me"), top_k=10,
+                                                 model=st.session_state.get("user_model", USER_MODELS[0]))
                 except Exception:
                     fetched = get_any_10()
 
@@ -799,7 +529,8 @@ if mode == "User":
     if st.button("🎵 Recommend for me"):
         with st.spinner("Computing 10 recommendations..."):
             try:
-                recs = recommend_for_user(st.session_state.get("user_id", "me"), top_k=10)
+                recs = recommend_for_user(st.session_state.get("user_id", "me"), top_k=10,
+                                          model=st.session_state.get("user_model", USER_MODELS[0]))
                 normalized = []
                 for r in recs:
                     if not isinstance(r, dict):
@@ -818,6 +549,8 @@ if mode == "User":
         st.info("Click '🎵 Recommend for me' to get started!")
     else:
         st.caption(f"Found {len(recs)} songs")
+        if st.session_state.get("user_timings"):
+            st.caption(format_timings(st.session_state["user_timings"]))
         for i, row in enumerate(recs, 1):
             snippet = row.get("snippet", {}) if isinstance(row, dict) else {}
             title = snippet.get("title") or row.get("title", row.get("video_id", "Unknown"))
@@ -831,22 +564,17 @@ if mode == "User":
 
     st.markdown("---")
     st.subheader("Your Listening History")
-    history = load_history(st.session_state.get("user_id", "me")) or []
-    if not history:
+    active_user = st.session_state.get("user_id", "me")
+    try:
+        history = get_client().history(active_user, 10)
+    except Exception:
+        history = {"items": [], "total": 0}
+    if not history["items"]:
         st.info("No history yet. Save songs to build your history!")
     else:
-        st.caption(f"Total: {len(history)} songs | Showing last 10")
-        df = load_catalog()
-        for j, video_id in enumerate(reversed(history[-10:]), 1):
-            row_info = None
-            if not df.empty and "video_id" in df.columns:
-                matches = df[df["video_id"].astype(str) == str(video_id)]
-                if not matches.empty:
-                    row_info = matches.iloc[0].to_dict()
-            title = (row_info.get("title") if row_info else video_id) or video_id
-            channel = (row_info.get("channel") if row_info else "") or ""
-            
-            render_song_card(j, video_id, title, channel)
+        st.caption(f"Total: {history['total']} songs | Showing last 10")
+        for j, row_info in enumerate(history["items"], 1):
+            render_song_card(j, row_info["video_id"], row_info["title"], row_info["channel"])
 
 # ============================================================================
 # ARTIST MODE
@@ -859,7 +587,12 @@ else:
         with st.spinner("Fetching 10 songs..."):
             try:
                 artist = st.session_state.get("artist", ARTISTS[0])
-                videos = get_exactly_10(artist)
+                artist_model = st.session_state.get("artist_model", "Hybrid")
+                st.session_state.pop("artist_timings", None)
+                if artist_model == "Popularity":
+                    videos = get_exactly_10(artist)
+                else:
+                    videos = recommend_for_artist(artist, artist_model)
 
                 while len(videos) < 10:
                     extras = get_exactly_10(random.choice(ARTISTS))
@@ -882,6 +615,8 @@ else:
         st.info("Click '🎵 Recommend 10 Songs' to discover music!")
     else:
         st.caption(f"Showing {len(artist_results)} songs")
+        if st.session_state.get("artist_timings"):
+            st.caption(format_timings(st.session_state["artist_timings"]))
         for i, v in enumerate(artist_results, 1):
             snippet = v.get("snippet", {})
             title = snippet.get("title", "Unknown Title")
@@ -0,0 +1,224 @@
+# src/artifacts.py
+import os
+import copy
+import json
+import time
+import pickle
+import shutil
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+import faiss
+from scipy.sparse import csr_matrix
+
+from src.content_index import ContentModel
+from src.collab_model import CollabModel
+
+ARTIFACT_ROOT = "models/artifacts"
+FORMAT = 1
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"          # file in the root naming the published version
+KEEP_VERSIONS = 3
+# maps the index's vector/code storage instead of copying it (IO_FLAG_MMAP alone still copies flat indexes)
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _save_content(model: ContentModel, path: str) -> dict:
+    data = model.to_dict()
+    faiss.write_index(data["index"], os.path.join(path, "content.faiss"))
+    np.save(os.path.join(path, "content_ids.npy"), np.asarray(data["content_ids"]).astype(str))
+    tfidf = copy.copy(data["tfidf"])
+    if hasattr(tfidf, "stop_words_"):
+        del tfidf.stop_words_  # every term cut by max_features; only kept for introspection
+    # plain pickle: the C unpickler reads the vocabulary dict ~5x faster than joblib's mmap loader
+    with open(os.path.join(path, "content_transforms.pkl"), "wb") as f:
+        pickle.dump({"tfidf": tfidf, "projector": data["projector"]}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return {
+        "index": "content.faiss",
+        "ids": "content_ids.npy",
+        "transforms": "content_transforms.pkl",
+        "index_type": data["index_type"],
+        "index_params": data["index_params"],
+        "stats": data["stats"],
+        "rows": int(data["index"].ntotal),
+        "dim": int(data["index"].d),
+    }
+
+
+def _save_collab(model: CollabModel, path: str) -> dict:
+    data = model.to_dict()
+    arrays = {name: data[name] for name in ("user_factors", "item_factors", "gram")}
+    arrays.update(user_ids=np.asarray(data["user_ids"]).astype(str), item_ids=np.asarray(data["item_ids"]).astype(str))
+    user_items = data["user_items"]
+    if user_items is not None:
+        arrays.update(user_items_data=user_items.data, user_items_indices=user_items.indices,
+                      user_items_indptr=user_items.indptr)
+    files = {}
+    for name, array in arrays.items():
+        files[name] = f"collab_{name}.npy"
+        np.save(os.path.join(path, files[name]), np.ascontiguousarray(array))
+    return {
+        "files": files,
+        "user_items_shape": list(user_items.shape) if user_items is not None else None,
+        "regularization": data["regularization"],
+        "alpha": data["alpha"],
+        "users": int(len(data["user_ids"])),
+        "items": int(len(data["item_ids"])),
+        "factors": int(model.factors),
+    }
+
+
+def new_version() -> str:
+    """Sortable, collision-safe version name: UTC timestamp (microseconds) + random suffix."""
+    now = time.time()
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}.{int(now % 1 * 1e6):06d}Z-{os.urandom(3).hex()}"
+
+
+def write_bundle(root: str = ARTIFACT_ROOT, content: ContentModel = None, collab: CollabModel = None,
+                 meta: dict = None, publish: bool = True, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Write the models into a new version directory under `root`:
+      content.faiss               FAISS native index
+      content_ids.npy             index row -> video_id
+      content_transforms.pkl      TF-IDF + projection for embedding new text
+      collab_*.npy                ALS factors, ids and training interactions (CSR parts)
+      manifest.json               format, version, per-model settings, file sizes + sha256
+    The directory is built under a temporary name and renamed into place; with publish the
+    CURRENT pointer is then swapped to it and all but the newest `keep` versions are pruned.
+    Returns the version name.
+    """
+    version = new_version()
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, f".{version}.tmp")
+    os.makedirs(tmp)
+    try:
+        manifest = {"format": FORMAT, "version": version, "created_at": time.time(), "meta": meta or {}}
+        if content is not None:
+            manifest["content"] = _save_content(content, tmp)
+        if collab is not None:
+            manifest["collab"] = _save_collab(collab, tmp)
+        manifest["files"] = {
+            name: {"bytes": os.path.getsize(os.path.join(tmp, name)), "sha256": _sha256(os.path.join(tmp, name))}
+            for name in sorted(os.listdir(tmp))
+        }
+        with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.rename(tmp, os.path.join(root, version))
+    finally:
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+    if publish:
+        publish_version(root, version)
+        prune(root, keep)
+    return version
+
+
+def publish_version(root: str, version: str):
+    """Point CURRENT at `version` (atomic rename, so readers see the old or the new name)."""
+    if not os.path.exists(os.path.join(root, version, MANIFEST)):
+        raise FileNotFoundError(f"no artifact bundle {version} in {root}")
+    tmp = os.path.join(root, f"{CURRENT}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+
+def current_version(root: str = ARTIFACT_ROOT) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def list_versions(root: str = ARTIFACT_ROOT) -> List[str]:
+    """Complete bundles under root, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(v for v in os.listdir(root) if not v.startswith(".") and os.path.exists(os.path.join(root, v, MANIFEST)))
+
+
+def prune(root: str = ARTIFACT_ROOT, keep: int = KEEP_VERSIONS) -> List[str]:
+    """
+    Delete all but the newest `keep` bundles, never the current one. Processes that still
+    have an old bundle mapped keep reading it: unlinked files live until they are unmapped.
+    """
+    current = current_version(root)
+    old = [v for v in list_versions(root)[:-keep] if v != current] if keep > 0 else []
+    for version in old:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+    return old
+
+
+class ArtifactBundle:
+    """
+    Read side of one bundle version. Models are opened lazily and memory-mapped: the
+    FAISS index with MMAP_FLAGS, factors and ids with np.load(mmap_mode="r"), so
+    startup reads only the manifest and processes serving the same version share pages.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        self.path = path
+        self.mmap = mmap
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"unsupported artifact format {self.manifest.get('format')} in {path}")
+
+    @classmethod
+    def open(cls, root: str = ARTIFACT_ROOT, version: str = None, mmap: bool = True) -> Optional["ArtifactBundle"]:
+        """The given (default: current) version, or None if nothing has been published."""
+        version = version or current_version(root)
+        if not version or not os.path.exists(os.path.join(root, version, MANIFEST)):
+            return None
+        return cls(os.path.join(root, version), mmap)
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _array(self, name: str) -> np.ndarray:
+        return np.load(self._file(name), mmap_mode="r" if self.mmap else None)
+
+    def verify(self) -> bool:
+        """Recompute file checksums against the manifest (reads every file; not done on open)."""
+        return all(os.path.exists(self._file(n)) and _sha256(self._file(n)) == f["sha256"]
+                   for n, f in self.manifest["files"].items())
+
+    def load_content(self) -> Optional[ContentModel]:
+        spec = self.manifest.get("content")
+        if spec is None:
+            return None
+        index_path = self._file(spec["index"])
+        index = faiss.read_index(index_path, MMAP_FLAGS if self.mmap else 0)
+        with open(self._file(spec["transforms"]), "rb") as f:
+            transforms = pickle.load(f)
+        return ContentModel(index, self._array(spec["ids"]), transforms["tfidf"], transforms["projector"],
+                            spec.get("index_type", "flat"), spec.get("index_params"), spec.get("stats"),
+                            index_path=index_path if self.mmap else None)
+
+    def load_collab(self) -> Optional[CollabModel]:
+        spec = self.manifest.get("collab")
+        if spec is None:
+            return None
+        files = spec["files"]
+        user_items = None
+        if spec.get("user_items_shape"):
+            user_items = csr_matrix((self._array(files["user_items_data"]), self._array(files["user_items_indices"]),
+                                     self._array(files["user_items_indptr"])), shape=tuple(spec["user_items_shape"]))
+        return CollabModel(self._array(files["user_factors"]), self._array(files["item_factors"]),
+                           self._array(files["user_ids"]), self._array(files["item_ids"]), user_items,
+                           spec["regularization"], spec["alpha"],
+                           self._array(files["gram"]) if "gram" in files else None)
@@ -0,0 +1,346 @@
+# src/batch_recommend.py
+import os
+import sys
+import csv
+import time
+import bisect
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.artifacts import ArtifactBundle
+from src.catalog_store import CatalogStore, CatalogIndex
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.history_store import HistoryStore
+from src.interaction_store import InteractionStore
+from src.hybrid import HybridRanker, parse_weights
+from src.ranking import popularity_order, popularity_scores
+
+COLUMNS = ["user_id", "rank", "video_id", "score", "model"]
+MODEL_WEIGHTS = {
+    "hybrid": None,  # HYBRID_WEIGHTS / DEFAULT_WEIGHTS
+    "content": {"content": 1.0, "als": 0.0, "popularity": 0.0},
+    "als": {"content": 0.0, "als": 1.0, "popularity": 0.0},
+}
+APP_MODELS = {"Hybrid": "hybrid", "Content-Based": "content", "Collaborative": "als"}  # app label -> model column
+CHUNK_SIZE = 2000
+ROWS_SCHEMA = pa.schema([("video_id", pa.string()), ("model", pa.string())])  # the app's lookup columns
+DEFAULTS = {
+    "catalog": "data/processed/catalog",
+    "interactions": "data/processed/interactions",  # InteractionStore, or a legacy .pkl
+    "history_db": "data/user_history/history.db",
+    "history_dir": "data/user_history",
+    "artifacts": "models/artifacts",
+    "content_model": "models/content.pkl",  # legacy pickles, used when no bundle is published
+    "collab_model": "models/collab_als.pkl",
+    "out": "outputs/recommendations.csv",
+}
+
+_worker = {}  # per-process ranker, built once by _init_worker
+
+
+def _interaction_histories(interactions_path: str = None):
+    """
+    (user_id, video ids) per user of an InteractionStore directory (in user code order,
+    read block by block) or of a legacy interactions pickle (sorted by user_id). A pickle
+    can only be read whole, but it is grouped on integer codes, not string copies of its ids.
+    """
+    if not interactions_path or not os.path.exists(interactions_path):
+        return
+    if os.path.isdir(interactions_path):
+        inter = InteractionStore(interactions_path)
+        user_ids, item_ids = inter.user_ids(), inter.item_ids()
+        for user, items in inter.iter_user_items():
+            yield user_ids[user], item_ids[items].tolist()
+        return
+    inter = pd.read_pickle(interactions_path)
+    item_col = "track_id" if "track_id" in inter.columns else "video_id"
+    user_codes, user_ids = pd.factorize(inter["user_id"], use_na_sentinel=False)
+    item_codes, item_ids = pd.factorize(inter[item_col], use_na_sentinel=False)
+    del inter
+    user_ids, item_ids = np.asarray(user_ids).astype(str), np.asarray(item_ids).astype(str)
+    by_name = np.argsort(user_ids, kind="stable")
+    rank = np.empty_like(by_name)
+    rank[by_name] = np.arange(len(by_name))
+    order = np.argsort(rank[user_codes], kind="stable")
+    user_codes, item_codes = user_codes[order], item_codes[order]
+    starts = np.flatnonzero(np.r_[True, user_codes[1:] != user_codes[:-1]]) if len(order) else np.empty(0, np.int64)
+    for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+        yield user_ids[user_codes[start]], item_ids[item_codes[start:stop]].tolist()
+
+
+def iter_users(interactions_path: str = None, history_db: str = None, history_dir: str = None):
+    """
+    (user_id, history video ids) for every user in the interactions (store or pickle), then
+    every app user in the history store. A user present in both gets the combined history.
+    """
+    seen = set()
+    store = HistoryStore(history_db, legacy_dir=history_dir) if history_db else None
+    app_users = set(store.users()) if store else set()
+    for user, history in _interaction_histories(interactions_path):
+        if user in app_users:
+            known = set(history)
+            history += [v for v in store.all(user) if v not in known]
+        seen.add(user)
+        yield user, history
+    for user in sorted(app_users - seen):
+        yield user, store.all(user)
+
+
+def chunked(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_ranker(catalog: str, content_model: str = None, collab_model: str = None, weights: dict = None,
+                 artifacts: str = None) -> HybridRanker:
+    """
+    The app's hybrid ranker, built from the trained artifacts instead of Streamlit caches.
+    The published bundle under `artifacts` wins over the legacy pickles; it is memory-mapped,
+    so worker processes share one copy of the index and factors.
+    """
+    df = CatalogStore(catalog).load()
+    bundle = ArtifactBundle.open(artifacts) if artifacts else None
+    if bundle is not None and "content" in bundle.manifest:
+        content = bundle.load_content()
+    else:
+        content = ContentModel.load(content_model) if content_model and os.path.exists(content_model) else None
+    if bundle is not None and "collab" in bundle.manifest:
+        collab = bundle.load_collab()
+    else:
+        collab = CollabModel.load(collab_model) if collab_model and os.path.exists(collab_model) else None
+    return HybridRanker(CatalogIndex(df["video_id"]), popularity_scores(df), popularity_order(df),
+                        content, collab, weights)
+
+
+def _init_worker(paths: dict, model: str, weights: dict, top_n: int):
+    _worker["ranker"] = build_ranker(paths["catalog"], paths["content_model"], paths["collab_model"], weights,
+                                     paths["artifacts"])
+    _worker["model"] = model
+    _worker["top_n"] = top_n
+
+
+def _rank_chunk(chunk):
+    """CSV rows for one chunk of (user_id, history) pairs."""
+    ranker, model, top_n = _worker["ranker"], _worker["model"], _worker["top_n"]
+    user_ids = [u for u, _ in chunk]
+    als_vectors = None
+    if ranker.collab is not None:
+        # users the ALS model was trained on keep their trained factors; the rest are folded in
+        rows = ranker.collab.user_positions(user_ids)
+        als_vectors = np.full((len(chunk), ranker.collab.factors), np.nan, dtype="float32")
+        als_vectors[rows >= 0] = ranker.collab.user_factors[rows[rows >= 0]]
+    ranked = ranker.rank_batch([h for _, h in chunk], top_n, MODEL_WEIGHTS[model], als_vectors)
+    out = []
+    for user, (positions, scores) in zip(user_ids, ranked):
+        ids = ranker.catalog_index.ids_at(positions)
+        out.extend((user, r, vid, f"{score:.6f}", model) for r, (vid, score) in enumerate(zip(ids, scores), 1))
+    return out
+
+
+def _map_chunks(chunks, workers: int, initargs):
+    """Ranked chunks in input order, with at most 2 x workers chunks in flight."""
+    if workers <= 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            yield _rank_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_rank_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def indexed_path(out: str) -> str:
+    """Memory-mapped lookup file written next to the CSV output (recommendations.csv -> recommendations.arrow)."""
+    return os.path.splitext(out)[0] + ".arrow"
+
+
+def _write_ipc(table: pa.Table, path: str):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _prune_rows(index_path: str, keep: str):
+    """Drop rows files of older runs except the one `keep` replaced (readers may still be switching over)."""
+    folder, prefix = os.path.dirname(os.path.abspath(index_path)), os.path.basename(os.path.splitext(index_path)[0])
+    old = sorted((e for e in os.scandir(folder) if e.name.startswith(f"{prefix}.rows-") and e.name != keep
+                  and e.name.endswith(".arrow")), key=lambda e: e.stat().st_mtime)
+    for entry in old[:-1]:
+        os.remove(entry.path)
+
+
+def run(out: str = DEFAULTS["out"], model: str = "hybrid", top_n: int = 10, workers: int = 1,
+        chunk_size: int = CHUNK_SIZE, weights: dict = None, **paths) -> dict:
+    """
+    Rank top_n videos for every user and stream them to `out` chunk by chunk (rows for
+    a user are contiguous). The file is written next to `out` and renamed over it when
+    complete, so readers never see a partial file. The same rows also go to an Arrow
+    rows file, and indexed_path(out) maps each user (sorted) to its row range in it; that
+    index is replaced last, so the app switches to a run all at once. Returns run statistics.
+    """
+    paths = dict(DEFAULTS, **paths)
+    start = time.perf_counter()
+    users = iter_users(paths["interactions"], paths["history_db"], paths["history_dir"])
+    n_users = n_rows = 0
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    index_path = indexed_path(out)
+    rows_name = f"{os.path.basename(os.path.splitext(index_path)[0])}.rows-{time.time_ns()}.arrow"
+    rows_path = os.path.join(os.path.dirname(os.path.abspath(out)), rows_name)
+    user_ids, offsets = [], []  # user -> first row, in output order
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f, pa.OSFile(f"{rows_path}.tmp", "wb") as sink, \
+                pa.ipc.new_file(sink, ROWS_SCHEMA) as rows_writer:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for rows in _map_chunks(chunked(users, chunk_size), workers, (paths, model, weights, top_n)):
+                writer.writerows(rows)
+                f.flush()
+                for i, r in enumerate(rows):
+                    if not user_ids or r[0] != user_ids[-1]:
+                        user_ids.append(r[0])
+                        offsets.append(n_rows + i)
+                rows_writer.write_batch(pa.record_batch([pa.array([r[2] for r in rows], pa.string()),
+                                                         pa.array([r[4] for r in rows], pa.string())],
+                                                        schema=ROWS_SCHEMA))
+                n_rows += len(rows)
+                n_users += len({r[0] for r in rows})
+        os.replace(f"{rows_path}.tmp", rows_path)
+        order = np.argsort(np.asarray(user_ids, dtype=object).astype(str), kind="stable")
+        bounds = np.asarray(offsets + [n_rows], dtype=np.int64)
+        index = pa.table({"user_id": pa.array(np.asarray(user_ids, dtype=str)[order].tolist(), pa.string()),
+                          "start": bounds[:-1][order], "stop": bounds[1:][order]})
+        _write_ipc(index.replace_schema_metadata({"rows": rows_name}), index_path)
+        os.replace(tmp, out)
+        _prune_rows(index_path, rows_name)
+    finally:
+        for path in (tmp, f"{rows_path}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+    return {"users": n_users, "rows": n_rows, "seconds": time.perf_counter() - start}
+
+
+class _Column:
+    """bisect-able view of a memory-mapped Arrow string column."""
+
+    def __init__(self, array):
+        self.array = array
+
+    def __getitem__(self, i):
+        return self.array[i].as_py()
+
+    def __len__(self):
+        return len(self.array)
+
+
+class PrecomputedRecommendations:
+    """
+    Read side of the batch job's output for the app's hot path. The Arrow index (users
+    sorted, with their row range) and the rows file it names are memory-mapped, and a
+    lookup is a binary search over the mapped user column plus one slice, so serving
+    memory does not grow with the number of users. A CSV without that index (an older
+    run) is parsed into memory instead.
+    """
+
+    def __init__(self, user_ids, starts, stops, video_ids, models):
+        self._users = user_ids if isinstance(user_ids, np.ndarray) else _Column(user_ids)
+        self._starts, self._stops = starts, stops
+        self.video_ids = video_ids
+        self.models = models
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        From the batch output `path` (recommendations.csv or its .arrow index); None if it is
+        missing or has no recommendations (e.g. the old track_id-only header).
+        """
+        index_path = indexed_path(path)
+        if os.path.exists(index_path):
+            try:
+                return cls.open_index(index_path)
+            except FileNotFoundError:
+                pass  # its rows file was pruned after a newer run: fall back to the CSV
+        return cls.from_csv(path)
+
+    @classmethod
+    def open_index(cls, index_path: str):
+        with pa.memory_map(index_path, "r") as source:
+            index = pa.ipc.open_file(source).read_all()
+        rows_name = index.schema.metadata[b"rows"].decode("utf-8")
+        with pa.memory_map(os.path.join(os.path.dirname(os.path.abspath(index_path)), rows_name), "r") as source:
+            rows = pa.ipc.open_file(source).read_all()
+        if index.num_rows == 0:
+            return None
+        return cls(index.column("user_id").combine_chunks(), index.column("start").combine_chunks().to_numpy(),
+                   index.column("stop").combine_chunks().to_numpy(), rows.column("video_id"), rows.column("model"))
+
+    @classmethod
+    def from_csv(cls, path: str):
+        try:
+            table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+                include_columns=["user_id", "video_id", "model"],
+                column_types={"user_id": "string", "video_id": "string", "model": "string"}))
+        except Exception:
+            return None
+        if table.num_rows == 0:
+            return None
+        users = table["user_id"].to_numpy(zero_copy_only=False).astype(str)
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        stops = np.r_[starts[1:], len(users)]
+        order = np.argsort(users[starts], kind="stable")
+        return cls(users[starts][order], starts[order], stops[order], table["video_id"], table["model"])
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, user_id: str, model: str = "hybrid"):
+        """Precomputed video ids for a user (best first), or [] if the user/model wasn't in the run."""
+        user_id = str(user_id)
+        i = bisect.bisect_left(self._users, user_id, 0, len(self._users))
+        if i == len(self._users) or self._users[i] != user_id:
+            return []
+        start, stop = int(self._starts[i]), int(self._stops[i])
+        ids = self.video_ids.slice(start, stop - start).to_pylist()
+        models = self.models.slice(start, stop - start).to_pylist()
+        return [v for v, m in zip(ids, models) if m == model]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute top-N recommendations for every user.")
+    parser.add_argument("--model", choices=sorted(MODEL_WEIGHTS), default="hybrid")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--weights", default=os.getenv("HYBRID_WEIGHTS"), help="e.g. content=0.5,als=0.3,popularity=0.2")
+    parser.add_argument("--out", default=DEFAULTS["out"])
+    for name in ("catalog", "interactions", "history_db", "history_dir", "artifacts", "content_model", "collab_model"):
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, default=DEFAULTS[name])
+    args = vars(parser.parse_args())
+    args["weights"] = parse_weights(args["weights"]) if args["weights"] else None
+    stats = run(**args)
+    print(f"Wrote {stats['rows']:,} rows for {stats['users']:,} users to {args['out']} "
+          f"in {stats['seconds']:.1f}s ({stats['users'] / max(stats['seconds'], 1e-9):,.0f} users/s)")
@@ -0,0 +1,276 @@
+# src/catalog_store.py
+import os
+import re
+import json
+import atexit
+import argparse
+import threading
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+PART_RE = re.compile(r"^part-(\d{6})\.arrow$")
+MANIFEST = "manifest.json"  # the live segment list; swapped with os.replace
+TEXT_COLUMNS = ["title", "description", "tags", "channel", "artist"]
+DISPLAY_COLUMNS = ["video_id", "title", "channel"]
+
+
+def with_text_column(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the TF-IDF `text` column (title/description/tags/channel/artist) if it is missing."""
+    if "text" in df.columns:
+        return df
+    def col_or_empty(col):
+        return df[col].fillna("").astype(str) if col in df.columns else pd.Series([""] * len(df), index=df.index)
+    text = col_or_empty(TEXT_COLUMNS[0])
+    for col in TEXT_COLUMNS[1:]:
+        text = text + " " + col_or_empty(col)
+    df["text"] = text.str[:10000]
+    return df
+
+
+class CatalogIndex:
+    """
+    video_id -> row position lookup for one catalog snapshot: a hashed pd.Index built
+    once, so membership checks and row lookups don't scan or re-cast the id column.
+    Duplicate ids resolve to their first row.
+    """
+
+    def __init__(self, video_ids):
+        ids = pd.Index(np.asarray(video_ids).astype(str))
+        self._all = ids.to_numpy()
+        first = ~ids.duplicated()
+        self._ids = ids[first]
+        self._rows = np.flatnonzero(first)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, video_id) -> bool:
+        return str(video_id) in self._ids
+
+    def positions(self, video_ids) -> np.ndarray:
+        """Catalog row positions for video ids (-1 where the id is not in the catalog)."""
+        if len(video_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = self._ids.get_indexer(pd.Index(video_ids).astype(str))
+        return np.where(pos >= 0, self._rows[np.maximum(pos, 0)], -1) if len(self._rows) else pos
+
+    def ids_at(self, positions) -> np.ndarray:
+        """video_ids at catalog row positions."""
+        return self._all[np.asarray(positions, dtype=np.int64)]
+
+    def rows(self, df: pd.DataFrame, video_ids, columns: Optional[List[str]] = None) -> List[Optional[dict]]:
+        """Row dicts of `df` (the catalog this index was built from) for video ids; None where missing."""
+        pos = self.positions(video_ids)
+        found = pos >= 0
+        sub = df.iloc[pos[found]]
+        if columns is not None:
+            sub = sub[[c for c in columns if c in sub.columns]]
+        records = iter(sub.to_dict("records"))
+        return [next(records) if ok else None for ok in found]
+
+
+class CatalogStore:
+    """
+    Columnar video catalog: a directory of immutable Arrow IPC segments
+    (part-000000.arrow, part-000001.arrow, ...). Segments are memory-mapped on load,
+    so cold loads and column projections avoid parsing; new videos are appended as
+    new segments instead of rewriting the catalog. CSV is import/export only.
+    manifest.json names the live segments: writers add a segment file first and then
+    replace the manifest, so a reader sees the catalog before or after a write or
+    compaction, never both (older directories without one list their segments).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def parts(self) -> List[str]:
+        try:
+            with open(os.path.join(self.root, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)["parts"]
+        except FileNotFoundError:
+            return self._files()
+
+    def _files(self) -> List[str]:
+        """Every segment file on disk, live or not."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(f for f in os.listdir(self.root) if PART_RE.match(f))
+
+    def _publish(self, parts: List[str]):
+        path = os.path.join(self.root, MANIFEST)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"parts": parts}, f)
+        os.replace(tmp, path)
+
+    def _drop(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def exists(self) -> bool:
+        return bool(self.parts())
+
+    def version(self):
+        """Changes whenever a segment is added or the store is rewritten."""
+        parts = self.parts()
+        if not parts:
+            return None
+        return (os.stat(self.root).st_mtime_ns, len(parts), parts[-1])
+
+    def read_table(self, columns: Optional[List[str]] = None) -> pa.Table:
+        for attempt in range(3):
+            try:
+                tables = self._read_parts(columns)
+                break
+            except FileNotFoundError:
+                # a compaction dropped the segments between reading the manifest and opening them
+                if attempt == 2:
+                    raise
+        if not tables:
+            return pa.table({c: pa.array([], pa.string()) for c in (columns or DISPLAY_COLUMNS)})
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    def _read_parts(self, columns: Optional[List[str]], parts: List[str] = None) -> List[pa.Table]:
+        tables = []
+        for name in self.parts() if parts is None else parts:
+            with pa.memory_map(os.path.join(self.root, name), "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select([c for c in columns if c in table.column_names])
+            tables.append(table)
+        return tables
+
+    def load(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Whole catalog, or only `columns` (e.g. DISPLAY_COLUMNS for rendering)."""
+        return self.read_table(columns).to_pandas()
+
+    def append(self, rows) -> str:
+        """Write rows (DataFrame or list of dicts) as a new segment; O(rows) I/O."""
+        df = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        live, name = self.parts(), self._next_part()
+        path = self._write(with_text_column(df), name)
+        self._publish(live + [name])
+        return path
+
+    def write(self, df: pd.DataFrame) -> str:
+        """Replace the whole catalog with a single segment."""
+        name = self._next_part()
+        path = self._write(with_text_column(df.copy()), name)
+        self._publish([name])
+        self._drop(f for f in self._files() if f != name)
+        return path
+
+    def compact(self) -> Optional[str]:
+        """Merge all segments into one so loads don't fan out over many small files."""
+        old = self.parts()
+        if len(old) < 2:
+            return None
+        name = self._next_part()
+        path = self._write_table(pa.concat_tables(self._read_parts(None, old), promote_options="permissive"), name)
+        self._publish([name] + [p for p in self.parts() if p not in old])  # keep segments appended meanwhile
+        self._drop(old)
+        return path
+
+    def import_csv(self, csv_path: str):
+        return self.write(pd.read_csv(csv_path))
+
+    def export_csv(self, csv_path: str, columns: Optional[List[str]] = None):
+        os.makedirs(os.path.dirname(os.path.abspath(csv_path)), exist_ok=True)
+        self.load(columns).to_csv(csv_path, index=False)
+        return csv_path
+
+    def _next_part(self) -> str:
+        parts = self._files()
+        seq = int(PART_RE.match(parts[-1]).group(1)) + 1 if parts else 0
+        return f"part-{seq:06d}.arrow"
+
+    def _write(self, df: pd.DataFrame, name: str) -> str:
+        return self._write_table(pa.Table.from_pandas(df, preserve_index=False), name)
+
+    def _write_table(self, table: pa.Table, name: str) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, name)
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)  # readers never see a half-written segment
+        return path
+
+
+class CatalogIngestor:
+    """
+    Buffers newly saved videos and writes them to the store in batches as append-only
+    segments: a flush happens once `batch_size` rows are queued or the oldest queued row
+    is `max_delay` seconds old, and segments are merged once there are more than `merge_after`.
+    Queued rows are visible through contains()/get() before they reach disk.
+    """
+
+    def __init__(self, store: CatalogStore, batch_size: int = 32, max_delay: float = 30.0, merge_after: int = 16):
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.merge_after = merge_after
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def contains(self, video_id: str) -> bool:
+        return str(video_id) in self._pending
+
+    def get(self, video_id: str) -> Optional[dict]:
+        return self._pending.get(str(video_id))
+
+    def pending(self) -> List[dict]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def submit(self, row: dict) -> bool:
+        """Queue a row; returns False if the video is already queued."""
+        with self._lock:
+            vid = str(row.get("video_id"))
+            if vid in self._pending:
+                return False
+            self._pending[vid] = row
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None and self.max_delay is not None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+        return True
+
+    def flush(self) -> Optional[str]:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return None
+            path = self.store.append(list(self._pending.values()))
+            self._pending.clear()
+            if len(self.store.parts()) > self.merge_after:
+                path = self.store.compact()
+            return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export the columnar video catalog.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("csv_path")
+    parser.add_argument("--store", default="data/processed/catalog")
+    args = parser.parse_args()
+    store = CatalogStore(args.store)
+    if args.command == "import":
+        store.import_csv(args.csv_path)
+        print(f"Imported {args.csv_path} into {args.store} ({len(store.load(['video_id']))} videos)")
+    else:
+        store.export_csv(args.csv_path)
+        print(f"Exported {args.store} to {args.csv_path}")
@@ -0,0 +1,84 @@
+# src/coalescer.py
+import threading
+
+BATCH_WINDOW = 0.002  # seconds the first caller of a batch waits for others to join
+MAX_BATCH = 32
+
+
+class _Batch:
+    __slots__ = ("items", "results", "error", "full", "done")
+
+    def __init__(self):
+        self.items = []
+        self.results = None
+        self.error = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class Coalescer:
+    """
+    Micro-batches concurrent calls: call(item) joins the open batch and blocks until
+    run_batch(items) -> results (one per item, same order) has run for the whole batch.
+    The first caller of a batch leads it: it waits up to `window` seconds (or until
+    `max_batch` items have joined) and runs the batch on its own thread, so there is no
+    dispatcher thread to start or stop. Batches run one at a time and the next one keeps
+    accepting items until the runner is free, so calls arriving during a long run go out
+    together instead of as many small batches queued behind it.
+    A window of 0 runs every call alone. An exception from run_batch is raised in every
+    caller of that batch.
+    """
+
+    def __init__(self, run_batch, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._open = None
+        self.batches = 0
+        self.calls = 0
+        self.max_seen = 0
+
+    def __call__(self, item):
+        if self.window <= 0 or self.max_batch <= 1:
+            self._count(1)
+            return self.run_batch([item])[0]
+        with self._lock:
+            batch = self._open
+            leader = batch is None
+            if leader:
+                batch = self._open = _Batch()
+            slot = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_batch:
+                self._open = None
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._run_lock:
+                with self._lock:
+                    if self._open is batch:
+                        self._open = None
+                self._count(len(batch.items))
+                try:
+                    batch.results = self.run_batch(batch.items)
+                except Exception as e:
+                    batch.error = e
+                batch.done.set()
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[slot]
+
+    def _count(self, size: int):
+        with self._lock:
+            self.batches += 1
+            self.calls += size
+            self.max_seen = max(self.max_seen, size)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "batches": self.batches, "max_batch": self.max_seen,
+                    "mean_batch": self.calls / self.batches if self.batches else 0.0}
@@ -0,0 +1,212 @@
+# src/collab_model.py
+import numpy as np
+import pandas as pd
+import joblib
+from scipy.sparse import csr_matrix
+
+from src.coalescer import Coalescer, BATCH_WINDOW, MAX_BATCH
+
+SCORE_BATCH = 1024  # users scored per matrix product in recommend_all()
+
+
+def interaction_matrix(user_codes, item_codes, values, shape) -> csr_matrix:
+    """users x items CSR matrix (duplicates summed), the layout implicit's ALS.fit() expects."""
+    m = csr_matrix((np.asarray(values, dtype="float32"), (np.asarray(user_codes), np.asarray(item_codes))), shape=shape)
+    m.sum_duplicates()
+    return m
+
+
+def _top_k_rows(scores: np.ndarray, k: int):
+    """Best-first top-k column positions and scores for every row of a score block."""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else np.tile(np.arange(k), (len(scores), 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class CollabModel:
+    """
+    Serving side of the ALS model trained by src/models.py (artifact bundle or legacy collab_als.pkl):
+    user/item factors as float32 arrays and pd.Index code lookups, so scoring is a
+    matrix product. Users that were not in the training interactions (e.g. app users,
+    whose history lives in HistoryStore) are folded in from their saved videos with the
+    closed-form ALS user update instead of a refit.
+    """
+
+    def __init__(self, user_factors, item_factors, user_ids, item_ids, user_items=None,
+                 regularization: float = 0.1, alpha: float = 1.0, gram: np.ndarray = None):
+        self.user_factors = np.ascontiguousarray(user_factors, dtype="float32")
+        self.item_factors = np.ascontiguousarray(item_factors, dtype="float32")
+        self.user_ids = np.asarray(user_ids).astype(str)
+        self.item_ids = np.asarray(item_ids).astype(str)
+        self.user_items = user_items.tocsr() if user_items is not None else None
+        self.regularization = regularization
+        self.alpha = alpha
+        self._users = None  # user id lookup, built on first user_positions() (app requests never need it)
+        self.batcher = None  # see enable_batching()
+        self._items = pd.Index(self.item_ids)
+        # YtY + lambda*I is shared by every user's least-squares solve; saved models pass it in
+        if gram is None:
+            Y = self.item_factors.astype("float64")
+            gram = Y.T @ Y + regularization * np.eye(Y.shape[1])
+        self._gram = np.asarray(gram, dtype="float64")
+
+    @classmethod
+    def from_als(cls, als, user_ids, item_ids, user_items=None) -> "CollabModel":
+        """Wrap a fitted implicit AlternatingLeastSquares (fitted on users x items)."""
+        if hasattr(als, "to_cpu"):
+            als = als.to_cpu()
+        return cls(als.user_factors, als.item_factors, user_ids, item_ids, user_items,
+                   float(als.regularization), float(getattr(als, "alpha", 1.0)))
+
+    @classmethod
+    def load(cls, path: str) -> "CollabModel":
+        data = joblib.load(path)
+        if isinstance(data, tuple):  # legacy (als, track_codes, user_codes) pickle with code -> id dicts
+            als, track_codes, user_codes = data
+            if hasattr(als, "to_cpu"):
+                als = als.to_cpu()
+            user_ids = [user_codes[i] for i in range(len(user_codes))]
+            item_ids = [track_codes[i] for i in range(len(track_codes))]
+            users, items = np.asarray(als.user_factors), np.asarray(als.item_factors)
+            # the old trainer fit items x users (user_item.T), so its "user" factors are the item factors
+            if (len(users), len(items)) == (len(item_ids), len(user_ids)):
+                users, items = items, users
+            elif (len(users), len(items)) != (len(user_ids), len(item_ids)):
+                raise ValueError(f"{path}: factor shapes {users.shape} / {items.shape} do not match "
+                                 f"{len(user_ids)} users and {len(item_ids)} items")
+            return cls(users, items, user_ids, item_ids, None,
+                       float(als.regularization), float(getattr(als, "alpha", 1.0)))
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {
+            "user_factors": self.user_factors,
+            "item_factors": self.item_factors,
+            "user_ids": self.user_ids,
+            "item_ids": self.item_ids,
+            "user_items": self.user_items,
+            "regularization": self.regularization,
+            "alpha": self.alpha,
+            "gram": self._gram,
+        }
+
+    @property
+    def factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def item_positions(self, video_ids) -> np.ndarray:
+        """Item factor rows for video ids (-1 where the video had no training interactions)."""
+        return self._items.get_indexer(pd.Index(video_ids).astype(str)) if len(video_ids) else np.empty(0, np.int64)
+
+    def user_positions(self, user_ids) -> np.ndarray:
+        if self._users is None:
+            self._users = pd.Index(self.user_ids)
+        return self._users.get_indexer(pd.Index(user_ids).astype(str)) if len(user_ids) else np.empty(0, np.int64)
+
+    def fold_in(self, histories) -> np.ndarray:
+        """
+        User vectors for lists of item positions, all users in one batch: solves
+        (YtY + Yu'(Cu - I)Yu + lambda*I) x_u = Yu' Cu p_u, where every saved video has confidence alpha.
+        """
+        S = self._history_matrix(histories)
+        b = self.alpha * (S @ self.item_factors).astype("float64")
+        if self.alpha == 1.0:
+            # Cu - I vanishes, so every user shares the same system matrix
+            return np.linalg.solve(self._gram, b.T).T.astype("float32")
+        A = np.repeat(self._gram[None], S.shape[0], axis=0)
+        for u in range(S.shape[0]):
+            Yu = self.item_factors[S.indices[S.indptr[u]:S.indptr[u + 1]]].astype("float64")
+            A[u] += (self.alpha - 1.0) * Yu.T @ Yu
+        return np.linalg.solve(A, b[:, :, None])[:, :, 0].astype("float32")
+
+    def enable_batching(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        """
+        Coalesce concurrent single-user recommend_batch() calls (one per request) into one
+        matrix product over all their vectors; window=0 turns it off.
+        """
+        self.batcher = Coalescer(self._recommend_many, window, max_batch) if window > 0 else None
+
+    def recommend_batch(self, user_vectors: np.ndarray, k: int = 10, exclude=None):
+        """
+        Top-k item positions and scores for a block of user vectors with one matrix product.
+        exclude: users x items CSR matrix (or per-user position lists) of items not to return.
+        Rows with fewer than k candidates are padded with -1 / -inf.
+        """
+        if self.batcher is not None and len(user_vectors) == 1 and not isinstance(exclude, csr_matrix):
+            return self.batcher((user_vectors[0], k, exclude[0] if exclude is not None else ()))
+        return self._recommend_block(user_vectors, k, exclude)
+
+    def _recommend_many(self, items):
+        """One product for coalesced (vector, k, excluded positions) requests at the largest k."""
+        k = max(k for _, k, _ in items)
+        pos, top = self._recommend_block(np.stack([u for u, _, _ in items]), k, [e for _, _, e in items])
+        return [(pos[i:i + 1, :k], top[i:i + 1, :k]) for i, (_, k, _) in enumerate(items)]
+
+    def _recommend_block(self, user_vectors: np.ndarray, k: int, exclude=None):
+        scores = user_vectors @ self.item_factors.T
+        if exclude is not None:
+            E = exclude if isinstance(exclude, csr_matrix) else self._history_matrix(exclude)
+            scores[np.repeat(np.arange(E.shape[0]), np.diff(E.indptr)), E.indices] = -np.inf
+        pos, top = _top_k_rows(scores, k)
+        pos[~np.isfinite(top)] = -1
+        return pos, top
+
+    def user_vector(self, history_ids):
+        """(folded-in user vector, history item positions); the vector is None if no video was trained on."""
+        hist = self.item_positions(history_ids)
+        hist = hist[hist >= 0]
+        if len(hist) == 0:
+            return None, hist
+        return self.fold_in([hist])[0], hist
+
+    def score(self, user_vector: np.ndarray, video_ids) -> np.ndarray:
+        """Predicted preference of one user for each video (NaN where the video has no factors)."""
+        return self.score_positions(user_vector, self.item_positions(video_ids))
+
+    def score_positions(self, user_vector: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        """score() for item factor rows (-1 = no factors)."""
+        out = np.full(len(pos), np.nan, dtype="float32")
+        found = pos >= 0
+        out[found] = self.item_factors[pos[found]] @ user_vector
+        return out
+
+    def recommend(self, history_ids, k: int = 10):
+        """Top-k video ids for a listening history (folded in), excluding the history itself."""
+        user, hist = self.user_vector(history_ids)
+        if user is None:
+            return [], np.empty(0, dtype="float32")
+        pos, scores = self.recommend_batch(user[None], k, exclude=[hist])
+        keep = pos[0] >= 0
+        return self.item_ids[pos[0][keep]].tolist(), scores[0][keep]
+
+    def recommend_all(self, k: int = 10, user_ids=None, batch_size: int = SCORE_BATCH):
+        """
+        Precompute top-k for trained users (all of them by default), scoring `batch_size`
+        users per matrix product and excluding their training interactions.
+        Returns (user_ids, item positions [users x k], scores).
+        """
+        rows = np.arange(len(self.user_ids)) if user_ids is None else self.user_positions(user_ids)
+        rows = rows[rows >= 0]
+        k = min(k, len(self.item_ids))
+        positions = np.empty((len(rows), k), dtype=np.int64)
+        scores = np.empty((len(rows), k), dtype="float32")
+        for start in range(0, len(rows), batch_size):
+            block = rows[start:start + batch_size]
+            exclude = self.user_items[block] if self.user_items is not None else None
+            positions[start:start + len(block)], scores[start:start + len(block)] = \
+                self._recommend_block(self.user_factors[block], k, exclude=exclude)
+        return self.user_ids[rows], positions, scores
+
+    def _history_matrix(self, histories) -> csr_matrix:
+        lengths = [len(h) for h in histories]
+        cols = np.concatenate([np.asarray(h, dtype=np.int64) for h in histories]) if sum(lengths) else np.empty(0, np.int64)
+        rows = np.repeat(np.arange(len(histories)), lengths)
+        m = csr_matrix((np.ones(len(cols), dtype="float32"), (rows, cols)), shape=(len(histories), len(self.item_ids)))
+        m.sum_duplicates()
+        m.data[:] = 1.0
+        return m
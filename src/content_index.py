@@ -0,0 +1,541 @@
+# src/content_index.py
+import time
+import threading
+import contextlib
+
+import numpy as np
+import pandas as pd
+import joblib
+import faiss
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.random_projection import SparseRandomProjection
+
+from src.coalescer import Coalescer, BATCH_WINDOW, MAX_BATCH
+
+DEFAULT_DIM = 256
+FIT_SAMPLE = 100_000
+EMBED_CHUNK = 50_000
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DRIFT_SAMPLE = 1000
+# flat faiss search only scores a query batch with one BLAS GEMM above
+# distance_compute_blas_threshold queries (default 128000, i.e. never for request traffic);
+# below it every query is its own SIMD scan and a coalesced batch costs as much as its
+# queries run one by one. Lone queries are faster on the scan, hence the minimum batch.
+BLAS_MIN_BATCH = 4
+_blas_lock = threading.Lock()
+_blas_users = 0
+_blas_default = None
+
+
+def fit_projection(tfidf_matrix, dim: int = DEFAULT_DIM, method: str = "svd",
+                   fit_sample: int = FIT_SAMPLE, random_state: int = 42):
+    """
+    Fit a compact projection of a sparse TF-IDF matrix.
+    The projection is fitted on at most `fit_sample` rows and never densifies the
+    input, so memory grows with nnz and rows x dim instead of rows x vocabulary.
+    """
+    n_rows, n_features = tfidf_matrix.shape
+    if method == "svd":
+        # TruncatedSVD needs dim < n_features and gives nothing past the row count
+        dim = max(1, min(dim, n_features - 1, n_rows - 1))
+        projector = TruncatedSVD(n_components=dim, algorithm="randomized", random_state=random_state)
+    elif method == "random":
+        dim = max(1, min(dim, n_features))
+        projector = SparseRandomProjection(n_components=dim, dense_output=True, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown projection method: {method}")
+
+    sample = tfidf_matrix
+    if n_rows > fit_sample:
+        rng = np.random.default_rng(random_state)
+        sample = tfidf_matrix[np.sort(rng.choice(n_rows, size=fit_sample, replace=False))]
+    projector.fit(sample)
+    return projector
+
+
+def embed(projector, tfidf_matrix, chunk_size: int = EMBED_CHUNK) -> np.ndarray:
+    """Project sparse rows in chunks into L2-normalised float32 vectors (cosine via inner product)."""
+    n_rows = tfidf_matrix.shape[0]
+    out = np.empty((n_rows, _output_dim(projector)), dtype="float32")
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        out[start:stop] = projector.transform(tfidf_matrix[start:stop])
+    faiss.normalize_L2(out)
+    return out
+
+
+def build_index(embeddings: np.ndarray, index_type: str = "flat", nlist: int = None,
+                pq_m: int = None, hnsw_m: int = 32, train_size: int = None,
+                nprobe: int = 16, ef_search: int = 64, random_state: int = 42):
+    """
+    Build a FAISS inner-product index over L2-normalised embeddings.
+    index_type: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw".
+    train_size caps the rows used to train IVF centroids / PQ codebooks;
+    nprobe (IVF) and ef_search (HNSW) trade recall for query latency.
+    """
+    n, d = embeddings.shape
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(d)  # Inner Product = Cosine after L2 norm
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = max(1, min(nlist or int(4 * np.sqrt(n)), n))
+        if index_type == "ivf_flat":
+            spec = f"IVF{nlist},Flat"
+        else:
+            m = _pq_subquantizers(d, pq_m)
+            nbits = max(1, min(8, int(np.log2(max(n, 2)))))
+            spec = f"IVF{nlist},PQ{m}x{nbits}"
+        index = faiss.index_factory(d, spec, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "hnsw":
+        index = faiss.index_factory(d, f"HNSW{hnsw_m}", faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index type: {index_type} (expected one of {INDEX_TYPES})")
+
+    if not index.is_trained:
+        sample = embeddings
+        if train_size and n > train_size:
+            rng = np.random.default_rng(random_state)
+            sample = embeddings[np.sort(rng.choice(n, size=train_size, replace=False))]
+        index.train(np.ascontiguousarray(sample))
+    index.add(embeddings)
+    if index_type.startswith("ivf"):
+        # lets recommenders reconstruct catalog vectors by position
+        faiss.extract_index_ivf(index).make_direct_map()
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search)
+    return index
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None):
+    """Apply query-time knobs; knobs that don't apply to the index type are ignored."""
+    if nprobe is not None:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(nprobe, ivf.nlist)
+        except RuntimeError:
+            pass
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+@contextlib.contextmanager
+def _blas_search(enabled: bool = True):
+    """
+    Let faiss score query batches with BLAS while inside. The threshold is process-global and
+    only changes speed, never results, so overlapping users just keep it lowered until the last exits.
+    """
+    global _blas_users, _blas_default
+    if not enabled:
+        yield
+        return
+    with _blas_lock:
+        if _blas_users == 0:
+            _blas_default = faiss.cvar.distance_compute_blas_threshold
+            faiss.cvar.distance_compute_blas_threshold = 1
+        _blas_users += 1
+    try:
+        yield
+    finally:
+        with _blas_lock:
+            _blas_users -= 1
+            if _blas_users == 0:
+                faiss.cvar.distance_compute_blas_threshold = _blas_default
+
+
+def _pq_subquantizers(d: int, pq_m: int = None) -> int:
+    # PQ needs m to divide d; default to 8-dim sub-vectors
+    m = min(pq_m or max(1, d // 8), d)
+    while d % m:
+        m -= 1
+    return m
+
+
+def _output_dim(projector) -> int:
+    if hasattr(projector, "components_"):
+        return projector.components_.shape[0]
+    return projector.n_components
+
+
+def token_counts(tfidf, texts):
+    """(out-of-vocabulary tokens, total tokens) of texts under a fitted vectorizer."""
+    analyzer = tfidf.build_analyzer()
+    vocab = tfidf.vocabulary_
+    oov = total = 0
+    for text in texts:
+        tokens = analyzer(text if isinstance(text, str) else "")
+        total += len(tokens)
+        oov += sum(t not in vocab for t in tokens)
+    return oov, total
+
+
+def fit_stats(tfidf, texts, sample: int = DRIFT_SAMPLE, random_state: int = 42) -> dict:
+    """Baseline the drift checks compare against: corpus size, OOV rate and fit time."""
+    texts = pd.Series(texts).fillna("")
+    n_docs = len(texts)
+    if n_docs > sample:
+        texts = texts.sample(sample, random_state=random_state)
+    oov, total = token_counts(tfidf, texts)
+    return {"n_docs": n_docs, "oov_rate": oov / total if total else 0.0, "fitted_at": time.time()}
+
+class ContentState:
+    """
+    One consistent view of a ContentModel: the FAISS index, its row -> video_id mapping,
+    the TF-IDF + projection and the videos added since the fit. Never modified once
+    published: add() and refit() build a new state and swap the model's reference, so a
+    request that reads one state embeds, searches and maps rows back with matching parts.
+    add() appends to the shared index in place, so `ntotal` is the number of rows this
+    state knows about; rows past it belong to a newer state.
+    """
+
+    def __init__(self, index, content_ids, tfidf, projector, stats: dict = None, index_path: str = None,
+                 added: dict = None, added_ids=(), added_texts=(), added_oov: int = 0, added_tokens: int = 0,
+                 id_index: pd.Index = None):
+        self.index = index
+        self.index_path = index_path
+        self.content_ids = np.asarray(content_ids).astype(str, copy=False)
+        self.tfidf = tfidf
+        self.projector = projector
+        self.stats = stats or {"n_docs": len(self.content_ids), "oov_rate": 0.0, "fitted_at": time.time()}
+        self.id_index = id_index if id_index is not None else pd.Index(self.content_ids)
+        self.added = added or {}  # video_id -> row for videos added after the model was built
+        self.added_ids = tuple(added_ids)
+        self.added_texts = tuple(added_texts)
+        self.added_oov = added_oov
+        self.added_tokens = added_tokens
+        self.ntotal = len(self.content_ids) + len(self.added_ids)
+
+    def positions(self, video_ids) -> np.ndarray:
+        ids = pd.Index(video_ids).astype(str)
+        pos = self.id_index.get_indexer(ids)
+        if self.added:
+            missing = np.flatnonzero(pos < 0)
+            pos[missing] = [self.added.get(ids[i], -1) for i in missing]
+        return pos
+
+    def ids_at(self, positions) -> np.ndarray:
+        positions = np.asarray(positions)
+        base = len(self.content_ids)
+        if not self.added_ids or (positions < base).all():
+            return self.content_ids[positions]
+        return np.array([self.content_ids[p] if p < base else self.added_ids[p - base] for p in positions],
+                        dtype=object).astype(str)
+
+    def embed_text(self, texts) -> np.ndarray:
+        return embed(self.projector, self.tfidf.transform(pd.Series(texts).fillna("")))
+
+    def extended(self, video_ids, texts, vecs: np.ndarray, index=None, index_path: str = None) -> "ContentState":
+        """
+        This state plus new videos: appends `vecs` to `index` (default: this state's) and
+        returns the state that maps them. The caller holds the model lock if the index is live.
+        """
+        index = self.index if index is None else index
+        start = index.ntotal
+        index.add(vecs)
+        added = dict(self.added)
+        added.update((v, start + j) for j, v in enumerate(video_ids))
+        oov, total = token_counts(self.tfidf, texts)
+        return ContentState(index, self.content_ids, self.tfidf, self.projector, self.stats, index_path, added,
+                            self.added_ids + tuple(video_ids), self.added_texts + tuple(texts),
+                            self.added_oov + oov, self.added_tokens + total, self.id_index)
+
+
+class ContentModel:
+    """
+    Query side of the content model persisted by src/models.py (artifact bundle or legacy content.pkl):
+    the FAISS index, its row -> video_id mapping and the TF-IDF + projection used
+    to embed text that is not in the index yet, held as one ContentState.
+    index_path: file a memory-mapped (read-only) index was opened from; add() copies the
+    index into memory before the first write (the file itself may be pruned by then).
+    Query methods take an optional `state` (see snapshot()) so that a caller making several
+    calls for one request, like the hybrid ranker, sees a single version of the model.
+    """
+
+    def __init__(self, index, content_ids, tfidf, projector, index_type: str = "flat",
+                 index_params: dict = None, stats: dict = None, index_path: str = None):
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self._lock = threading.RLock()  # FAISS indexes are not safe to add to while searching
+        self._refit_thread = None
+        self.batcher = None  # see enable_batching()
+        self._state = ContentState(index, content_ids, tfidf, projector, stats, index_path)
+
+    @classmethod
+    def load(cls, path: str) -> "ContentModel":
+        data = joblib.load(path)
+        return cls(data["index"], data["content_ids"], data["tfidf"], data["projector"],
+                   data.get("index_type", "flat"), data.get("index_params"), data.get("stats"))
+
+    @classmethod
+    def from_catalog(cls, video_ids, text, dim: int = DEFAULT_DIM, index_type: str = "flat",
+                     projection: str = "svd", **index_params):
+        """Build an in-process model when no trained artifact exists."""
+        text = pd.Series(text).fillna("")
+        tfidf = TfidfVectorizer(max_features=10000, stop_words="english")
+        X = tfidf.fit_transform(text)
+        projector = fit_projection(X, dim=dim, method=projection)
+        index = build_index(embed(projector, X), index_type=index_type, **index_params)
+        return cls(index, video_ids, tfidf, projector, index_type, index_params, fit_stats(tfidf, text))
+
+    def to_dict(self) -> dict:
+        with self._lock:  # the index and the ids of one state
+            state = self._state
+            return {
+                "index": state.index,
+                "content_ids": np.concatenate([state.content_ids, np.asarray(state.added_ids, dtype=str)]),
+                "index_type": self.index_type,
+                "index_params": self.index_params,
+                "tfidf": state.tfidf,
+                "projector": state.projector,
+                "stats": state.stats,
+            }
+
+    def snapshot(self) -> ContentState:
+        """The current state; pass it to several calls to have them agree with each other."""
+        return self._state
+
+    @property
+    def index(self):
+        return self._state.index
+
+    @property
+    def content_ids(self) -> np.ndarray:
+        return self._state.content_ids
+
+    @property
+    def tfidf(self):
+        return self._state.tfidf
+
+    @property
+    def projector(self):
+        return self._state.projector
+
+    @property
+    def stats(self) -> dict:
+        return self._state.stats
+
+    @property
+    def dim(self) -> int:
+        return self._state.index.d
+
+    @property
+    def projection(self) -> str:
+        """fit_projection() method of the fitted projector ("svd" or "random")."""
+        return "random" if isinstance(self._state.projector, SparseRandomProjection) else "svd"
+
+    def __len__(self):
+        return self._state.ntotal
+
+    def positions(self, video_ids, state: ContentState = None) -> np.ndarray:
+        """Index rows for video ids (-1 where the id is not indexed)."""
+        return (state or self._state).positions(video_ids)
+
+    def add(self, video_ids, texts) -> int:
+        """
+        Embed new videos with the frozen vectorizer/projection and append them to the
+        index in place, so a catalog addition never triggers a refit. Returns rows added.
+        """
+        video_ids = [str(v) for v in video_ids]
+        first = {}
+        for i, v in enumerate(video_ids):
+            first.setdefault(v, i)
+        keep = [i for v, i in first.items() if self.positions([v])[0] < 0]
+        if not keep:
+            return 0
+        vecs = self._state.embed_text([texts[i] for i in keep])
+        with self._lock:
+            state = self._state
+            # a concurrent add() may have indexed some of them while these were embedded
+            fresh = [j for j, i in enumerate(keep) if state.positions([video_ids[i]])[0] < 0]
+            if not fresh:
+                return 0
+            index, index_path = state.index, state.index_path
+            if index_path is not None:
+                # adding to a mapped index aborts inside FAISS: switch to an owned copy first.
+                # clone_index keeps the mapped storage as a view, so round-trip through a buffer.
+                index = set_search_params(faiss.deserialize_index(faiss.serialize_index(index)),
+                                          self.index_params.get("nprobe"), self.index_params.get("ef_search"))
+            self._state = state.extended([video_ids[keep[j]] for j in fresh], [texts[keep[j]] for j in fresh],
+                                         vecs[fresh], index)
+        return len(fresh)
+
+    def added(self):
+        """(video ids, texts) added since the model was built, e.g. to carry them over to a newer model."""
+        state = self._state
+        return list(state.added_ids), list(state.added_texts)
+
+    def drift(self) -> dict:
+        """How far incremental additions have moved away from the fitted vocabulary/IDF."""
+        state = self._state
+        added_oov = state.added_oov / state.added_tokens if state.added_tokens else 0.0
+        return {
+            "added": len(state.added_ids),
+            "growth": len(state.added_ids) / max(1, state.stats["n_docs"]),
+            "oov_drift": max(0.0, added_oov - state.stats["oov_rate"]),
+            "age_seconds": time.time() - state.stats["fitted_at"],
+        }
+
+    def needs_refit(self, max_oov_drift: float = 0.2, max_growth: float = 0.25, max_age: float = None) -> bool:
+        """
+        True once added videos use noticeably more out-of-vocabulary words than the fitted
+        corpus, the catalog has grown by more than max_growth, or the fit is older than max_age seconds.
+        """
+        d = self.drift()
+        if max_age is not None and d["age_seconds"] > max_age:
+            return True
+        if not d["added"]:
+            return False
+        return d["oov_drift"] > max_oov_drift or d["growth"] > max_growth
+
+    def refit(self, video_ids, texts):
+        """
+        Full refit on the given corpus (same dim / projection / index settings), swapped in
+        atomically. Videos added while it ran are embedded into the new state before the
+        swap, so they are never missing from the live model.
+        """
+        new = ContentModel.from_catalog(video_ids, texts, dim=self.dim, index_type=self.index_type,
+                                        projection=self.projection, **self.index_params)._state
+
+        def carry_over(new, state):
+            extra = [(v, t) for v, t in zip(state.added_ids, state.added_texts) if new.positions([v])[0] < 0]
+            if not extra:
+                return new
+            ids, extra_texts = [v for v, _ in extra], [t for _, t in extra]
+            return new.extended(ids, extra_texts, new.embed_text(extra_texts))
+
+        new = carry_over(new, self._state)  # the new index is private until the swap: no lock needed
+        with self._lock:
+            self._state = carry_over(new, self._state)  # anything added during the first carry-over
+
+    def refit_in_background(self, corpus_fn) -> bool:
+        """Run refit(*corpus_fn()) on a daemon thread; searches keep using the old state meanwhile."""
+        with self._lock:
+            if self._refit_thread is not None and self._refit_thread.is_alive():
+                return False
+            self._refit_thread = threading.Thread(target=lambda: self.refit(*corpus_fn()), daemon=True)
+            self._refit_thread.start()
+        return True
+
+    def ids_at(self, positions, state: ContentState = None) -> np.ndarray:
+        return (state or self._state).ids_at(positions)
+
+    def embed_text(self, texts, state: ContentState = None) -> np.ndarray:
+        return (state or self._state).embed_text(texts)
+
+    def vectors(self, video_ids, texts=None, state: ContentState = None) -> np.ndarray:
+        """Stored vectors for indexed ids; ids missing from the index are embedded from `texts`."""
+        state = state or self._state
+        pos = state.positions(video_ids)
+        out = np.zeros((len(pos), state.index.d), dtype="float32")
+        found = pos >= 0
+        if found.any():
+            with self._lock:
+                out[found] = state.index.reconstruct_batch(pos[found].astype("int64"))
+        if texts is not None and (~found).any():
+            out[~found] = state.embed_text(np.asarray(texts, dtype=object)[~found])
+        return out
+
+    def enable_batching(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        """
+        Coalesce concurrent single-query search() calls (one per request) into one FAISS
+        search over all their queries; window=0 turns it off. Multi-query calls are never delayed.
+        """
+        self.batcher = Coalescer(self._search_many, window, max_batch) if window > 0 else None
+
+    def search(self, queries: np.ndarray, k: int, state: ContentState = None):
+        """Batched top-k search; returns (scores, positions) with -1 padding."""
+        state = state or self._state
+        queries = np.array(queries, dtype="float32", order="C")
+        faiss.normalize_L2(queries)
+        if self.batcher is not None and len(queries) == 1:
+            return self.batcher((state, queries[0], k))
+        with self._lock:
+            return self._visible(state, *state.index.search(queries, min(k, state.ntotal)))
+
+    def _search_many(self, items):
+        """
+        One search per state for coalesced (state, query, k) items (a refit can swap the state
+        between two requests of one batch), at the largest k; each caller gets its own top-k.
+        """
+        out = [None] * len(items)
+        groups = {}
+        for i, (state, _, _) in enumerate(items):
+            groups.setdefault(id(state), []).append(i)
+        for rows in groups.values():
+            state = items[rows[0]][0]
+            k = max(items[i][2] for i in rows)
+            with self._lock, _blas_search(len(rows) >= BLAS_MIN_BATCH):
+                scores, pos = self._visible(state, *state.index.search(np.stack([items[i][1] for i in rows]),
+                                                                         min(k, state.ntotal)))
+            for j, i in enumerate(rows):
+                k = items[i][2]
+                out[i] = (scores[j:j + 1, :k], pos[j:j + 1, :k])
+        return out
+
+    @staticmethod
+    def _visible(state: ContentState, scores, pos):
+        """Hide rows added to the shared index after `state` was taken (it cannot map them)."""
+        newer = pos >= state.ntotal
+        if newer.any():
+            pos[newer], scores[newer] = -1, -np.inf
+        return scores, pos
+
+    def query_vector(self, history_ids, history_texts=None, state: ContentState = None):
+        """L2-normalised mean of the history vectors, or None if none of them could be embedded."""
+        vecs = self.vectors(history_ids, history_texts, state)
+        vecs = vecs[np.abs(vecs).sum(axis=1) > 0]
+        if len(vecs) == 0:
+            return None
+        query = vecs.mean(axis=0, keepdims=True).astype("float32")
+        faiss.normalize_L2(query)
+        return query[0]
+
+    def query_vectors(self, histories, state: ContentState = None):
+        """
+        Batched query_vector() for lists of indexed video ids, with one reconstruct call:
+        returns (queries for users with at least one indexed video, boolean mask of those users).
+        """
+        state = state or self._state
+        lengths = np.array([len(h) for h in histories], dtype=np.int64)
+        flat = [str(v) for h in histories for v in h]
+        pos = state.positions(flat) if flat else np.empty(0, dtype=np.int64)
+        owner = np.repeat(np.arange(len(histories)), lengths)[pos >= 0]
+        sums = np.zeros((len(histories), state.index.d), dtype="float32")
+        if len(owner):
+            with self._lock:
+                vecs = state.index.reconstruct_batch(pos[pos >= 0].astype("int64"))
+            np.add.at(sums, owner, vecs)
+        valid = np.bincount(owner, minlength=len(histories)) > 0
+        queries = np.ascontiguousarray(sums[valid])
+        faiss.normalize_L2(queries)
+        return queries, valid
+
+    def score(self, query: np.ndarray, video_ids, state: ContentState = None) -> np.ndarray:
+        """Cosine similarity of `query` to each video's stored vector (NaN where the id is not indexed)."""
+        state = state or self._state
+        return self.score_positions(query, state.positions(video_ids), state)
+
+    def score_positions(self, query: np.ndarray, pos: np.ndarray, state: ContentState = None) -> np.ndarray:
+        """score() for index rows (-1 = not indexed)."""
+        state = state or self._state
+        out = np.full(len(pos), np.nan, dtype="float32")
+        found = pos >= 0
+        if found.any():
+            with self._lock:
+                vecs = state.index.reconstruct_batch(pos[found].astype("int64"))
+            out[found] = vecs @ query
+        return out
+
+    def recommend(self, history_ids, k: int = 10, history_texts=None):
+        """Top-k video ids closest to the mean history vector, excluding the history itself."""
+        state = self._state
+        query = self.query_vector(history_ids, history_texts, state)
+        if query is None:
+            return [], np.empty(0, dtype="float32")
+        exclude = set(str(v) for v in history_ids)
+        scores, pos = self.search(query[None], k + len(exclude), state)
+        scores, pos = scores[0], pos[0]
+        keep = pos >= 0
+        ids = state.ids_at(pos[keep])
+        scores = scores[keep]
+        mask = np.array([i not in exclude for i in ids], dtype=bool)
+        return [str(v) for v in ids[mask][:k]], scores[mask][:k]
@@ -1,91 +1,329 @@
 # src/data_loader.py
 import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
+import pyarrow as pa
+import pyarrow.parquet as pq
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.sparse import hstack
+from scipy.sparse import hstack, csr_matrix, save_npz, load_npz
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.catalog_store import CatalogStore
+from src.interaction_store import InteractionStore
+
+CATALOG_DIR = "data/processed/catalog"
+CONTENT_MATRIX = "data/processed/content_matrix.npz"
+INTERACTIONS_DIR = "data/processed/interactions"
 
 load_dotenv()
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
-youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
 
 ARTISTS = [
     "Arijit Singh", "Ed Sheeran", "Taylor Swift", "The Weeknd", "Dua Lipa",
     "Pritam", "Badshah", "Diljit Dosanjh", "AP Dhillon", "Shreya Ghoshal"
 ]
 
-def fetch_youtube_videos():
+MAX_WORKERS = 4          # artists fetched concurrently
+STATS_BATCH = 50         # videos.list accepts up to 50 comma-separated ids
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+
+SYNTH_USERS = 1000
+SYNTH_ITEMS = (10, 30)         # items per user drawn from [low, high)
+SYNTH_CHUNK_USERS = 200_000    # users generated per chunk
+SYNTH_ROUNDS = 8               # resampling rounds to replace duplicate draws
+
+_local = threading.local()
+
+
+def _thread_client():
+    # googleapiclient/httplib2 clients are not thread-safe: one per worker thread
+    if not hasattr(_local, "youtube"):
+        _local.youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
+    return _local.youtube
+
+
+def _is_retryable(e: HttpError) -> bool:
+    status = getattr(e.resp, "status", None)
+    if status in RETRY_STATUSES:
+        return True
+    # 403 is also used for per-second rate limits (retry) and daily quota (don't)
+    return status == 403 and any(r in (e.content or b"") for r in RATE_LIMIT_REASONS)
+
+
+def execute_with_backoff(request, retries: int = MAX_RETRIES, backoff: float = BACKOFF_SECONDS, sleep=time.sleep):
+    """request.execute() with exponential backoff + jitter on rate-limit and 5xx responses."""
+    for attempt in range(retries + 1):
+        try:
+            return request.execute()
+        except HttpError as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+def fetch_view_counts(youtube, video_ids, **backoff) -> dict:
+    """viewCount for each id, batched STATS_BATCH ids per videos.list call."""
+    views = {}
+    for start in range(0, len(video_ids), STATS_BATCH):
+        chunk = video_ids[start:start + STATS_BATCH]
+        res = execute_with_backoff(youtube.videos().list(
+            part="statistics",
+            id=",".join(chunk),
+            maxResults=len(chunk)
+        ), **backoff)
+        for item in res.get("items", []):
+            views[item["id"]] = int(item.get("statistics", {}).get("viewCount", 0))
+    return views
+
+
+def fetch_artist_videos(youtube, artist: str, **backoff):
+    res = execute_with_backoff(youtube.search().list(
+        part="snippet",
+        q=f"{artist} official music video",
+        type="video",
+        maxResults=50,
+        order="viewCount"
+    ), **backoff)
+    items = [it for it in res.get("items", []) if (it.get("id") or {}).get("videoId")]
+    views = fetch_view_counts(youtube, [it["id"]["videoId"] for it in items], **backoff)
+    return [{
+        "video_id": item["id"]["videoId"],
+        "title": item["snippet"]["title"],
+        "artist": artist,
+        "views": views.get(item["id"]["videoId"], 0),
+        "text": f"{item['snippet']['title']} {artist}"
+    } for item in items]
+
+
+def fetch_youtube_videos(artists=ARTISTS, youtube=None, max_workers: int = MAX_WORKERS, **backoff):
+    """
+    Fetch the top videos for each artist: one search call plus one batched statistics
+    call per 50 results, with artists fetched concurrently on a bounded thread pool.
+    Pass `youtube` to use a specific (thread-safe) client, e.g. a fake in tests.
+    """
     os.makedirs("data/processed", exist_ok=True)
-    videos = []
 
-    for artist in ARTISTS:
+    def fetch(artist):
         print(f"Fetching videos for {artist}...")
         try:
-            res = youtube.search().list(
-                part="snippet",
-                q=f"{artist} official music video",
-                type="video",
-                maxResults=50,
-                order="viewCount"
-            ).execute()
-            for item in res.get("items", []):
-                stats = youtube.videos().list(
-                    part="statistics",
-                    id=item["id"]["videoId"]
-                ).execute()
-                views = int(stats["items"][0]["statistics"].get("viewCount", 0)) if stats["items"] else 0
-                videos.append({
-                    "video_id": item["id"]["videoId"],
-                    "title": item["snippet"]["title"],
-                    "artist": artist,
-                    "views": views,
-                    "text": f"{item['snippet']['title']} {artist}"
-                })
+            return fetch_artist_videos(youtube or _thread_client(), artist, **backoff)
         except Exception as e:
             print(f"Error fetching {artist}: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        per_artist = list(pool.map(fetch, artists))  # keeps artist order
+    videos = [v for batch in per_artist for v in batch]
 
-    df = pd.DataFrame(videos).drop_duplicates(subset="video_id")
+    df = pd.DataFrame(videos, columns=["video_id", "title", "artist", "views", "text"]).drop_duplicates(subset="video_id")
     df.to_csv("data/processed/youtube_videos.csv", index=False)
     print(f"Saved {len(df)} videos.")
     return df
 
-def generate_features_and_interactions(df):
+
+def popularity_cdf(n_items: int, skew: float = 0.0, popularity=None, rng=None) -> np.ndarray:
+    """
+    Cumulative sampling weights with p(rank r) ~ 1 / r**skew (Zipf; 0 = uniform).
+    Ranks follow `popularity` (e.g. view counts) when given, otherwise a random permutation.
+    """
+    if skew == 0:
+        return np.arange(1, n_items + 1, dtype="float64")
+    if popularity is not None:
+        ranks = np.empty(n_items, dtype=np.int64)
+        ranks[np.argsort(-np.nan_to_num(np.asarray(popularity, dtype="float64")), kind="stable")] = np.arange(n_items)
+    else:
+        ranks = (rng or np.random.default_rng()).permutation(n_items)
+    return np.cumsum((ranks + 1.0) ** -skew)
+
+
+def _items_per_user(rng, n: int, low: int, high: int, distribution: str, sigma: float) -> np.ndarray:
+    if distribution == "uniform":
+        return rng.integers(low, high, n)
+    if distribution == "lognormal":
+        # most users near `low`, a long tail of heavy users up to high - 1
+        return np.clip(np.round(low * rng.lognormal(0.0, sigma, n)), low, high - 1).astype(np.int64)
+    raise ValueError(f"unknown items-per-user distribution: {distribution}")
+
+
+def _draw(rng, n: int, cdf: np.ndarray) -> np.ndarray:
+    if cdf[-1] == len(cdf):  # uniform (see popularity_cdf)
+        return rng.integers(0, len(cdf), n)
+    # sorted queries walk the CDF in order (about 2x faster); the permutation restores random order
+    return np.searchsorted(cdf, np.sort(rng.random(n)) * cdf[-1], side="right")[rng.permutation(n)]
+
+
+def _sample_distinct(rng, counts: np.ndarray, cdf: np.ndarray):
+    """
+    counts[u] distinct item codes per user, drawn by inverse CDF. Duplicate draws are
+    dropped and only the shortfall redrawn, so popular items are sampled without
+    replacement; users may end up short after SYNTH_ROUNDS rounds on a tiny, skewed catalog.
+    Returns (user codes, item codes) sorted by user, then item.
+    """
+    n_items = len(cdf)
+    need = np.minimum(counts, n_items).astype(np.int64)
+    keys = np.empty(0, np.int64)  # sorted user * n_items + item
+    for _ in range(SYNTH_ROUNDS):
+        todo = np.flatnonzero(need > 0)
+        if len(todo) == 0:
+            break
+        u = np.repeat(todo, need[todo])
+        new = np.sort(u * n_items + _draw(rng, len(u), cdf))
+        new = new[np.r_[True, new[1:] != new[:-1]]]  # np.unique, without its hash pass
+        if len(keys):
+            at = np.searchsorted(keys, new)
+            new = new[keys[np.minimum(at, len(keys) - 1)] != new]
+            keys = np.insert(keys, np.searchsorted(keys, new), new)
+        else:
+            keys = new
+        need -= np.bincount(new // n_items, minlength=len(need))
+    return keys // n_items, keys % n_items
+
+
+def iter_interactions(n_items: int, n_users: int = SYNTH_USERS, items_per_user=SYNTH_ITEMS,
+                      distribution: str = "uniform", sigma: float = 1.0, skew: float = 0.0,
+                      popularity=None, seed: int = 42, chunk_users: int = SYNTH_CHUNK_USERS):
+    """
+    Synthetic ratings as columnar chunks of at most `chunk_users` users:
+    {"user": int32 user codes, "item": int32 catalog positions, "rating": int8 1-5}.
+    items_per_user: (low, high) bounds; `distribution` "uniform" or "lognormal" (sigma).
+    skew: Zipf exponent of item popularity (see popularity_cdf). Each user's items are distinct.
+    The same seed and chunk_users always produce the same rows.
+    """
+    low, high = items_per_user
+    cdf = popularity_cdf(n_items, skew, popularity, np.random.default_rng(seed))
+    for chunk, start in enumerate(range(0, n_users, chunk_users)):
+        rng = np.random.default_rng([seed, chunk])
+        n = min(chunk_users, n_users - start)
+        u, it = _sample_distinct(rng, _items_per_user(rng, n, low, high, distribution, sigma), cdf)
+        yield {"user": (u + start).astype(np.int32), "item": it.astype(np.int32),
+               "rating": rng.integers(1, 6, len(u), dtype=np.int8)}
+
+
+def _user_names(start: int, stop: int) -> list:
+    return [f"user_{u}" for u in range(start, stop)]
+
+
+def interactions_frame(chunks, video_ids, n_users: int) -> pd.DataFrame:
+    """user_id / video_id / rating frame; ids are categoricals of the users and videos that occur."""
+    chunks = list(chunks)
+    cols = {k: np.concatenate([c[k] for c in chunks]) if chunks else np.empty(0, np.int32) for k in ("user", "item", "rating")}
+    return pd.DataFrame({
+        "user_id": pd.Categorical.from_codes(cols["user"], categories=_user_names(0, n_users)).remove_unused_categories(),
+        "video_id": pd.Categorical.from_codes(cols["item"], categories=pd.Index(video_ids).astype(str)).remove_unused_categories(),
+        "rating": cols["rating"].astype(np.int8),
+    })
+
+
+def generate_interactions(video_ids, n_users: int = SYNTH_USERS, popularity=None, **options) -> pd.DataFrame:
+    """All synthetic interactions for a catalog in memory (see iter_interactions for options)."""
+    return interactions_frame(iter_interactions(len(video_ids), n_users, popularity=popularity, **options),
+                              video_ids, n_users)
+
+
+def write_interactions(path: str, video_ids, n_users: int = SYNTH_USERS, popularity=None, **options) -> int:
+    """
+    Stream synthetic interactions to Parquet one row group per chunk, so the user count is
+    bounded by disk rather than memory. Ids are dictionary-encoded. Returns rows written.
+    """
+    videos = pa.array(pd.Index(video_ids).astype(str).tolist(), pa.string())
+    schema = pa.schema([("user_id", pa.dictionary(pa.int32(), pa.string())),
+                        ("video_id", pa.dictionary(pa.int32(), pa.string())),
+                        ("rating", pa.int8())])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in iter_interactions(len(videos), n_users, popularity=popularity, **options):
+            # per-chunk user dictionary: only this chunk's users are spelled out
+            first = int(chunk["user"][0]) if len(chunk["user"]) else 0
+            names = pa.array(_user_names(first, int(chunk["user"].max(initial=first)) + 1), pa.string())
+            writer.write_table(pa.table({
+                "user_id": pa.DictionaryArray.from_arrays(pa.array(chunk["user"] - first, pa.int32()), names),
+                "video_id": pa.DictionaryArray.from_arrays(pa.array(chunk["item"], pa.int32()), videos),
+                "rating": pa.array(chunk["rating"], pa.int8()),
+            }, schema=schema))
+            rows += len(chunk["user"])
+    return rows
+
+
+def save_content_matrix(path: str, matrix) -> None:
+    """Feature matrix as CSR float32 in scipy's .npz format (only the non-zeros are stored)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    save_npz(path, csr_matrix(matrix, dtype=np.float32), compressed=False)
+
+
+def load_content_matrix(path: str = CONTENT_MATRIX) -> csr_matrix:
+    """
+    The CSR feature matrix written by generate_features_and_interactions. Falls back to
+    a legacy dense content_matrix.pkl next to it, converted to CSR.
+    """
+    if not os.path.exists(path):
+        legacy = os.path.splitext(path)[0] + ".pkl"
+        if os.path.exists(legacy):
+            return csr_matrix(joblib.load(legacy), dtype=np.float32)
+    return load_npz(path).tocsr()
+
+
+def generate_features_and_interactions(df, n_users: int = SYNTH_USERS, **interaction_options):
     # TF-IDF
-    tfidf = TfidfVectorizer(max_features=5000, stop_words='english')
+    tfidf = TfidfVectorizer(max_features=5000, stop_words='english', dtype=np.float32)
     tfidf_matrix = tfidf.fit_transform(df['text'])
 
     # Synthetic audio features
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     audio_features = pd.DataFrame({
-        col: np.random.uniform(0, 1, len(df))
+        col: rng.uniform(0, 1, len(df))
         for col in ['danceability', 'energy', 'valence', 'acousticness']
-    })
+    }, index=df.index)
     df = pd.concat([df, audio_features], axis=1)
 
-    # Combine
-    content_matrix = hstack([tfidf_matrix, audio_features.values]).toarray().astype('float32')
-
-    # Synthetic user-item
-    num_users = 1000
-    interactions = []
-    for u in range(num_users):
-        user_id = f"user_{u}"
-        chosen = np.random.choice(df['video_id'], size=np.random.randint(10, 30), replace=False)
-        for vid in chosen:
-            interactions.append({"user_id": user_id, "video_id": vid, "rating": np.random.randint(1, 6)})
-    interaction_df = pd.DataFrame(interactions)
-    pickle.dump(interaction_df, open("data/processed/user_item_matrix.pkl", "wb"))
-
-    df.to_csv("data/processed/youtube_features.csv", index=False)
-    joblib.dump(content_matrix, "data/processed/content_matrix.pkl")
+    # Combine, sparse: rows x (vocabulary + 4 audio columns), never densified
+    content_matrix = hstack([tfidf_matrix, audio_features.to_numpy(dtype=np.float32)], format="csr", dtype=np.float32)
+
+    # Synthetic user-item, streamed chunk by chunk as int32 codes (never a string frame)
+    popularity = df['views'] if 'views' in df.columns else None
+    interactions = InteractionStore(INTERACTIONS_DIR)
+    interactions.write_chunks(iter_interactions(len(df), n_users, popularity=popularity, **interaction_options),
+                              _user_names(0, n_users), pd.Index(df['video_id']).astype(str))
+
+    store = CatalogStore(CATALOG_DIR)
+    store.write(df)
+    store.export_csv("data/processed/youtube_features.csv")  # human-readable export
+    save_content_matrix(CONTENT_MATRIX, content_matrix)
     print("Features + interactions ready.")
-    return df, content_matrix, interaction_df
+    return df, content_matrix, interactions
 
 if __name__ == "__main__":
-    import joblib
-    df = fetch_youtube_videos()
-    df, matrix, interactions = generate_features_and_interactions(df)
-    print("All data ready!")
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch the catalog and generate features + synthetic interactions.")
+    parser.add_argument("--users", type=int, default=SYNTH_USERS)
+    parser.add_argument("--items-per-user", type=int, nargs=2, default=SYNTH_ITEMS, metavar=("LOW", "HIGH"))
+    parser.add_argument("--distribution", choices=["uniform", "lognormal"], default="uniform")
+    parser.add_argument("--skew", type=float, default=0.0, help="Zipf exponent of item popularity (0 = uniform)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--interactions-only", metavar="PARQUET",
+                        help="only write synthetic interactions for the existing catalog to this Parquet file")
+    args = parser.parse_args()
+    options = dict(items_per_user=tuple(args.items_per_user), distribution=args.distribution,
+                   skew=args.skew, seed=args.seed)
+    if args.interactions_only:
+        catalog = CatalogStore(CATALOG_DIR).load()
+        start = time.perf_counter()
+        rows = write_interactions(args.interactions_only, catalog["video_id"], args.users,
+                                  popularity=catalog["views"] if "views" in catalog.columns else None, **options)
+        print(f"Wrote {rows:,} interactions for {args.users:,} users in {time.perf_counter() - start:.1f}s.")
+    else:
+        df = fetch_youtube_videos()
+        df, matrix, interactions = generate_features_and_interactions(df, args.users, **options)
+        print("All data ready!")
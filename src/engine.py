@@ -0,0 +1,536 @@
+# src/engine.py
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import pandas as pd
+from googleapiclient.discovery import build
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api_client import ARTISTS, USER_MODELS
+from src.artifacts import ArtifactBundle, current_version
+from src.batch_recommend import PrecomputedRecommendations, APP_MODELS, indexed_path
+from src.catalog_store import CatalogStore, CatalogIngestor, CatalogIndex
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.history_store import HistoryStore
+from src.hybrid import HybridRanker, StageStats, parse_weights
+from src.model_registry import ModelRegistry
+from src.ranking import top_k_indices, popularity_order, popularity_scores, ranked_candidates, snippet_items
+from src.response_cache import ResponseCache
+from src.search_executor import SearchExecutor, execute, video_id as item_video_id
+
+# ============================================================================
+# PATHS & CONSTANTS
+# ============================================================================
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+PROCESSED_CSV = os.path.join(DATA_DIR, "processed", "youtube_features.csv")  # legacy import / export only
+CATALOG_DIR = os.path.join(DATA_DIR, "processed", "catalog")
+HISTORY_DIR = os.path.join(DATA_DIR, "user_history")  # legacy per-user JSON files, imported on first read
+HISTORY_DB = os.path.join(HISTORY_DIR, "history.db")
+ARTIFACT_DIR = os.path.join(BASE_DIR, "models", "artifacts")  # versioned bundles written by src/models.py
+CONTENT_MODEL_PATH = os.path.join(BASE_DIR, "models", "content.pkl")  # legacy pickles, used when no bundle exists
+COLLAB_MODEL_PATH = os.path.join(BASE_DIR, "models", "collab_als.pkl")
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", 2))  # registry polls catalog/bundle versions
+RECOMMENDATIONS_CSV = os.path.join(BASE_DIR, "outputs", "recommendations.csv")  # written by src/batch_recommend.py
+YOUTUBE_CACHE_DIR = os.path.join(DATA_DIR, "cache", "youtube")
+# Hybrid ranker: blend weights ("content=0.5,als=0.3,popularity=0.2") and per-stage retrieval budgets
+HYBRID_WEIGHTS = parse_weights(os.getenv("HYBRID_WEIGHTS"))
+HYBRID_BUDGETS = {
+    "content": float(os.getenv("HYBRID_CONTENT_BUDGET_MS", 150)) / 1000,
+    "als": float(os.getenv("HYBRID_ALS_BUDGET_MS", 150)) / 1000,
+}
+ARTIST_SEEDS = 20  # an artist's most popular catalog videos used as the hybrid seed
+# Full content refit only when incremental additions drift too far (or on a schedule)
+CONTENT_REFIT_OOV_DRIFT = float(os.getenv("CONTENT_REFIT_OOV_DRIFT", 0.2))
+CONTENT_REFIT_GROWTH = float(os.getenv("CONTENT_REFIT_GROWTH", 0.25))
+CONTENT_REFIT_INTERVAL = float(os.getenv("CONTENT_REFIT_INTERVAL", 0)) or None  # seconds, 0 = off
+# Per-request wall-clock budget for YouTube search fan-out before falling back to the catalog
+SEARCH_BUDGET_SECONDS = float(os.getenv("SEARCH_BUDGET_SECONDS", 2.5))
+# Concurrent requests' FAISS searches / ALS products are coalesced for up to this long (0 = off)
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", 2))
+BATCH_MAX = int(os.getenv("BATCH_MAX", 32))
+EMPTY_CATALOG_COLUMNS = ["video_id", "title", "channel", "text", "viewCount_norm"]
+
+
+def _artist_queries(name: str) -> List[str]:
+    return [
+        f"{name} official audio",
+        f"{name} official music video",
+        f"{name} music video",
+        f"{name} song",
+        f"{name} audio"
+    ]
+
+
+def _artist_mask(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Catalog rows whose artist/channel/title/description/tags mention `name`."""
+    name_l = name.lower()
+    mask = np.zeros(len(df), dtype=bool)
+    for col in ["artist", "channel", "title", "description", "tags"]:
+        if col in df.columns:
+            mask |= df[col].astype(str).str.lower().str.contains(name_l, na=False, regex=False).to_numpy()
+    return mask
+
+
+def catalog_row(video_id: str, video: dict) -> dict:
+    """Catalog row for a videos.list item (snippet + statistics)."""
+    sn = video.get("snippet", {})
+    stt = video.get("statistics", {})
+    tags = ",".join(sn.get("tags", [])) if sn.get("tags") else ""
+    return {
+        "video_id": video_id,
+        "title": sn.get("title", ""),
+        "channel": sn.get("channelTitle", ""),
+        "artist": "",
+        "tags": tags,
+        "description": sn.get("description", ""),
+        "text": " ".join(filter(None, [sn.get("title", ""), sn.get("description", ""), tags, sn.get("channelTitle", "")]))[:10000],
+        "viewCount": int(stt.get("viewCount", 0)) if stt.get("viewCount") else 0,
+        "likeCount": int(stt.get("likeCount", 0)) if stt.get("likeCount") else 0,
+        "commentCount": int(stt.get("commentCount", 0)) if stt.get("commentCount") else 0,
+        "viewCount_norm": 0.0,
+        "likeCount_norm": 0.0,
+        "commentCount_norm": 0.0,
+    }
+
+
+class RecommendationEngine:
+    """
+    Everything behind a recommendation request, independent of any UI: the catalog store
+    and ingestor, listening history, YouTube search (with the response cache), the
+    precomputed batch output and the ModelRegistry snapshot of catalog + models.
+    One engine per process; every method is safe to call from concurrent request threads.
+    Rankings are returned as YouTube search-result style items plus per-stage timings (ms)
+    where the hybrid ranker ran.
+    """
+
+    def __init__(self, catalog_dir: str = CATALOG_DIR, artifact_dir: str = ARTIFACT_DIR,
+                 history_db: str = HISTORY_DB, history_dir: str = HISTORY_DIR,
+                 youtube_cache_dir: str = YOUTUBE_CACHE_DIR, recommendations_csv: str = RECOMMENDATIONS_CSV,
+                 content_model_path: str = CONTENT_MODEL_PATH, collab_model_path: str = COLLAB_MODEL_PATH,
+                 legacy_csv: str = PROCESSED_CSV, youtube_api_key: str = None,
+                 refresh_seconds: float = MODEL_REFRESH_SECONDS, search_budget: float = SEARCH_BUDGET_SECONDS,
+                 batch_window_ms: float = BATCH_WINDOW_MS, max_batch: int = BATCH_MAX):
+        self.artifact_dir = artifact_dir
+        self.recommendations_csv = recommendations_csv
+        self.content_model_path = content_model_path
+        self.collab_model_path = collab_model_path
+        self.youtube_api_key = youtube_api_key if youtube_api_key is not None else os.getenv("YOUTUBE_API_KEY")
+        self.search_budget = search_budget
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.store = CatalogStore(catalog_dir)
+        if not self.store.exists() and legacy_csv and os.path.exists(legacy_csv):
+            self.store.import_csv(legacy_csv)  # one-off migration from the old CSV catalog
+        self.ingestor = CatalogIngestor(self.store)  # batches saved videos into append-only segments
+        self.history = HistoryStore(history_db, legacy_dir=history_dir)
+        # search.list / videos.list responses: in-process LRU + on-disk tier with per-endpoint TTLs
+        self.response_cache = ResponseCache(youtube_cache_dir)
+        self.search_executor = SearchExecutor()
+        self.registry = ModelRegistry(self.version, self.build_snapshot, interval=refresh_seconds,
+                                      on_swap=self._carry_over_added)
+        # shared by every snapshot's ranker, so a swap doesn't leave idle pools behind; two stages per
+        # request, sized so a full batch of concurrent requests can wait on the coalesced search together.
+        # Stages past the pool size run inline (see HybridRanker) instead of queueing out of their budget.
+        workers = 2 * max_batch if self.batch_window > 0 else 2
+        self._hybrid_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hybrid")
+        self._hybrid_slots = threading.BoundedSemaphore(workers)
+        self.hybrid_stats = StageStats()  # timeouts / errors / degraded requests across snapshots
+        self._youtube = None
+        # batch job output, memory-mapped and reopened off the request path when a run replaces it
+        self.precomputed = ModelRegistry(self._precomputed_version, self._load_precomputed, interval=refresh_seconds)
+        self._lock = threading.Lock()
+
+    def start(self) -> "RecommendationEngine":
+        """Build the first snapshot and start watching for catalog/bundle changes."""
+        self.registry.current()
+        self.registry.start()
+        if self.recommendations_csv:
+            self.precomputed.check(wait=True)
+            self.precomputed.start()
+        return self
+
+    def close(self):
+        self.registry.stop()
+        self.precomputed.stop()
+        self.ingestor.flush()
+
+    # ------------------------------------------------------------------
+    # model snapshot
+    # ------------------------------------------------------------------
+    def version(self):
+        """(catalog version, published bundle); the registry rebuilds its snapshot when either moves."""
+        return self.store.version(), current_version(self.artifact_dir)
+
+    def snapshot(self):
+        return self.registry.current()
+
+    def _read_catalog(self) -> pd.DataFrame:
+        if self.store.exists():
+            return self.store.load()
+        return pd.DataFrame(columns=EMPTY_CATALOG_COLUMNS)
+
+    def _load_models(self, bundle_version, df):
+        """(content, collab) from the bundle, else the legacy pickles; content is built from the catalog as a last resort."""
+        content = collab = None
+        bundle = ArtifactBundle.open(self.artifact_dir, bundle_version) if bundle_version else None
+        if bundle is not None:
+            try:
+                content = bundle.load_content()
+            except Exception:
+                pass
+            try:
+                collab = bundle.load_collab()
+            except Exception:
+                pass
+        if content is None and self.content_model_path and os.path.exists(self.content_model_path):
+            try:
+                content = ContentModel.load(self.content_model_path)
+            except Exception:
+                pass
+        if content is None and not df.empty:
+            content = ContentModel.from_catalog(df["video_id"].astype(str), df["text"])
+        if collab is None and self.collab_model_path and os.path.exists(self.collab_model_path):
+            try:
+                collab = CollabModel.load(self.collab_model_path)
+            except Exception:
+                pass
+        return content, collab
+
+    def build_snapshot(self, version, previous) -> dict:
+        """
+        Serving state for a (catalog, bundle) version, built on the registry's thread. Parts whose
+        source did not change are carried over from the previous snapshot; stage timings are kept
+        in `timings` (ms).
+        """
+        catalog_ver, bundle_ver = version
+        timings = {}
+        t = time.perf_counter()
+        if previous is not None and previous.catalog_version == catalog_ver:
+            df, index, popularity, order = previous.df, previous.index, previous.popularity, previous.order
+        else:
+            df = self._read_catalog()
+            index = CatalogIndex(df["video_id"] if "video_id" in df.columns else [])
+            popularity, order = popularity_scores(df), popularity_order(df)
+            timings["catalog"] = (time.perf_counter() - t) * 1000
+
+        t = time.perf_counter()
+        if previous is not None and previous.bundle_version == bundle_ver:
+            content, collab = previous.content, previous.collab
+        else:
+            content, collab = self._load_models(bundle_ver, df)
+            for model in (content, collab):
+                if model is not None:
+                    model.enable_batching(self.batch_window, self.max_batch)
+            if content is not None and len(content):
+                # touch the mapped index once here rather than on the first user request
+                content.search(np.ones((1, content.dim), dtype="float32"), 1)
+            if content is not None and previous is not None and previous.content is not None:
+                # videos saved since the previous model was built stay searchable (add() skips indexed ids);
+                # ones saved from here until the swap are added by _carry_over_added()
+                content.add(*previous.content.added())
+            timings["models"] = (time.perf_counter() - t) * 1000
+
+        ranker = HybridRanker(index, popularity, order, content, collab, HYBRID_WEIGHTS, HYBRID_BUDGETS,
+                              executor=self._hybrid_pool, slots=self._hybrid_slots, stats=self.hybrid_stats)
+        return dict(catalog_version=catalog_ver, bundle_version=bundle_ver, df=df, index=index,
+                    popularity=popularity, order=order, content=content, collab=collab, ranker=ranker, timings=timings)
+
+    @staticmethod
+    def _carry_over_added(previous, snapshot):
+        """After a swap: add videos the previous content model indexed while this snapshot was built."""
+        if previous is None or previous.content is None or snapshot.content is None:
+            return
+        if snapshot.content is not previous.content:
+            snapshot.content.add(*previous.content.added())
+
+    def _precomputed_version(self):
+        """mtime of the batch output's index (or of a CSV-only older run); None if there is none."""
+        for path in (indexed_path(self.recommendations_csv), self.recommendations_csv):
+            try:
+                return os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+        return None
+
+    def _load_precomputed(self, version, previous):
+        return {"recommendations": PrecomputedRecommendations.load(self.recommendations_csv) if version else None}
+
+    def precomputed_recommendations(self):
+        """Output of the offline batch job (None if there is none); never waits for a reload."""
+        if not self.recommendations_csv:
+            return None
+        snap = self.precomputed.active
+        if snap is None:
+            self.precomputed.check()  # engine used without start(): load in the background
+            return None
+        return snap.recommendations
+
+    def _catalog_corpus(self):
+        df = self.snapshot().df
+        pending = pd.DataFrame(self.ingestor.pending(), columns=["video_id", "text"])
+        corpus = pd.concat([df[["video_id", "text"]], pending], ignore_index=True).drop_duplicates("video_id", keep="last")
+        return corpus["video_id"].astype(str).values, corpus["text"].fillna("").values
+
+    def maybe_refit_content_model(self, content: ContentModel) -> bool:
+        """Start a background refit when drift crosses the configured thresholds or the schedule is due."""
+        if content is None or not content.needs_refit(CONTENT_REFIT_OOV_DRIFT, CONTENT_REFIT_GROWTH, CONTENT_REFIT_INTERVAL):
+            return False
+        return content.refit_in_background(self._catalog_corpus)
+
+    def status(self) -> dict:
+        """Registry state (active versions, build time, swaps) and YouTube cache counters."""
+        models = self.registry.status()
+        snap = self.registry.active
+        batching = {}  # coalesced searches: calls, batches, mean/max batch size
+        for name, model in (("content", snap.content if snap else None), ("als", snap.collab if snap else None)):
+            if model is not None and model.batcher is not None:
+                batching[name] = model.batcher.stats()
+        return {
+            "catalog_version": models["version"][0] if models["version"] else None,
+            "bundle_version": models["version"][1] if models["version"] else None,
+            "build_ms": models["build_ms"],
+            "built_at": models["built_at"],
+            "swaps": models["swaps"],
+            "building": models["building"] is not None,
+            "failed": models["failed"],
+            "videos": len(snap.index) if snap is not None else 0,
+            "content": snap is not None and snap.content is not None,
+            "collab": snap is not None and snap.collab is not None,
+            "youtube_cache": self.response_cache.stats(),
+            "batching": batching,
+            "hybrid": self.hybrid_stats.stats(),
+        }
+
+    # ------------------------------------------------------------------
+    # YouTube
+    # ------------------------------------------------------------------
+    def youtube(self):
+        """Shared googleapiclient resource; requests run on per-thread HTTP connections (search_executor.execute)."""
+        if not self.youtube_api_key:
+            raise RuntimeError("YOUTUBE_API_KEY not found in environment. Add it to .env")
+        with self._lock:
+            if self._youtube is None:
+                self._youtube = build("youtube", "v3", developerKey=self.youtube_api_key)
+            return self._youtube
+
+    def _search_videos(self, youtube, q: str):
+        params = dict(part="snippet", q=q, maxResults=50, type="video", safeSearch="none")
+        res = self.response_cache.fetch("search.list", params, lambda: execute(youtube.search().list(**params)))
+        return res.get("items", [])
+
+    def _fan_out_search(self, youtube, queries: List[str], want: int = 10):
+        """Run the search queries concurrently; stop at `want` unique videos or when the budget runs out."""
+        calls = [lambda q=q: self._search_videos(youtube, q) for q in queries]
+        items, _ = self.search_executor.gather(calls, want=want, budget=self.search_budget)
+        return items
+
+    # ------------------------------------------------------------------
+    # recommendations
+    # ------------------------------------------------------------------
+    def get_exactly_10(self, artist_name=None):
+        name = (artist_name or random.choice(ARTISTS)).strip()
+        try:
+            youtube = self.youtube()
+        except Exception:
+            youtube = None
+
+        candidates = []
+        tried = set()
+        if youtube:
+            candidates = self._fan_out_search(youtube, _artist_queries(name))
+            tried = set(item_video_id(it) for it in candidates)
+
+        if len(candidates) < 10:
+            snap = self.snapshot()
+            df = snap.df
+            if not df.empty:
+                remaining = _artist_mask(df, name)
+                tried_pos = snap.index.positions(list(tried))
+                remaining[tried_pos[tried_pos >= 0]] = False
+                if remaining.any():
+                    needed = 10 - len(candidates)
+                    if "viewCount_norm" in df.columns:
+                        views = pd.to_numeric(df["viewCount_norm"], errors="coerce").to_numpy(dtype="float64")
+                        pos = top_k_indices(views, needed, exclude=~remaining)
+                    else:
+                        pos = np.flatnonzero(remaining)[:needed]
+                    candidates.extend(snippet_items(df, pos))
+
+        random.shuffle(candidates)
+        return candidates[:10]
+
+    def get_any_10(self):
+        results = []
+        artist_candidates = ARTISTS[:] if len(ARTISTS) <= 8 else random.sample(ARTISTS, 8)
+        try:
+            youtube = self.youtube()
+        except Exception:
+            youtube = None
+        if youtube:
+            # one flat fan-out across artists, round-robin so each artist's best query goes first
+            per_artist = [_artist_queries(a) for a in artist_candidates]
+            queries = [q for group in zip(*per_artist) for q in group]
+            results = self._fan_out_search(youtube, queries)
+            random.shuffle(results)
+            results = results[:10]
+
+        if len(results) < 10:
+            snap = self.snapshot()
+            df = snap.df
+            if not df.empty:
+                seen = snap.index.positions([item_video_id(it) for it in results])
+                pos = ranked_candidates(len(df), 10 - len(results), order=snap.order, exclude=seen)
+                results.extend(snippet_items(df, pos))
+        return results[:10]
+
+    def recommend_for_user(self, user_id: str, top_k: int = 10, model: str = "Hybrid"):
+        """(items, hybrid stage timings or None) for a user's saved history."""
+        snap = self.snapshot()  # one consistent frame, id index, popularity order and models for the whole request
+        df = snap.df
+        if df is None or df.empty:
+            return self.get_any_10(), None
+
+        index = snap.index
+        history = self.load_history(user_id) or []
+        hist_pos = index.positions(history)
+        order = snap.order
+
+        precomputed = self.precomputed_recommendations()
+        cached = precomputed.get(user_id, APP_MODELS.get(model, model)) if precomputed is not None else []
+        if cached:
+            # zero-compute hot path: the batch job's ranking (videos saved since that run are excluded)
+            pos = ranked_candidates(len(df), top_k, primary=index.positions(cached), order=order, exclude=hist_pos)
+            return snippet_items(df, pos), None
+
+        collab = snap.collab if model == "Collaborative" else None
+        content = snap.content
+        if content is None and collab is None:
+            return self.get_any_10(), None
+        if content is not None:
+            self.maybe_refit_content_model(content)
+
+        recommended, timings = None, None
+        if history and model == "Hybrid":
+            hist_texts = [(r or {}).get("text") or "" for r in index.rows(df, history, ["text"])]
+            recommended, _, timings = snap.ranker.rank(history, top_k, hist_texts, exclude=hist_pos)
+        elif history and collab is not None:
+            # fold the saved history into the ALS factors and score every video in one product
+            rec_ids, _ = collab.recommend(history, k=top_k)
+            recommended = index.positions(rec_ids)
+        elif history and content is not None:
+            indexed = content.positions(history) >= 0  # includes videos saved since the catalog was loaded
+            hist_ids = [v for v, ok, p in zip(history, indexed, hist_pos) if ok or p >= 0]
+            if hist_ids:
+                # top-k search over the mean history vector in the prebuilt index
+                hist_texts = [(r or {}).get("text") or "" for r in index.rows(df, hist_ids, ["text"])]
+                rec_ids, _ = content.recommend(hist_ids, k=top_k, history_texts=hist_texts)
+                recommended = index.positions(rec_ids)
+
+        # model picks first, then popularity (or a seeded random fill), never the user's own history
+        pos = ranked_candidates(len(df), top_k, primary=recommended, order=order, exclude=hist_pos)
+        return snippet_items(df, pos), timings
+
+    def recommend_for_artist(self, artist_name: str, model: str = "Hybrid", k: int = 10):
+        """
+        Songs for fans of an artist: the artist's most popular catalog videos seed the hybrid
+        ranker, and are scored alongside what it retrieves. "Content-Based" uses only content similarity,
+        "Popularity" the artist's most viewed videos. Falls back to YouTube search when the artist
+        has no catalog videos. Returns (items, hybrid stage timings or None).
+        """
+        if model == "Popularity":
+            return self.get_exactly_10(artist_name), None
+        snap = self.snapshot()
+        df = snap.df
+        seeds = np.flatnonzero(_artist_mask(df, artist_name)) if not df.empty else np.empty(0, dtype=np.int64)
+        if len(seeds) == 0:
+            return self.get_exactly_10(artist_name), None
+        seeds = seeds[top_k_indices(snap.popularity[seeds], ARTIST_SEEDS)]
+        weights = {"content": 1.0, "als": 0.0, "popularity": 0.0} if model == "Content-Based" else None
+        ranked, _, timings = snap.ranker.rank(snap.index.ids_at(seeds), k, candidates=seeds, weights=weights)
+        return snippet_items(df, ranked_candidates(len(df), k, primary=ranked, order=snap.order)), timings
+
+    # ------------------------------------------------------------------
+    # catalog + history
+    # ------------------------------------------------------------------
+    def ensure_in_catalog(self, video_id: str):
+        """(ok, error): queue a video unknown to the catalog for ingestion and add it to the content index."""
+        if not video_id:
+            return False, "empty video id"
+        try:
+            if video_id in self.snapshot().index:
+                return True, None
+        except Exception:
+            pass
+        if self.ingestor.contains(video_id):
+            return True, None
+        try:
+            yt = self.youtube()
+            params = dict(part="snippet,statistics", id=video_id)
+            res = self.response_cache.fetch("videos.list", params, lambda: execute(yt.videos().list(**params)))
+            items = res.get("items", [])
+        except Exception as e:
+            return False, f"YouTube API error: {e}"
+        if not items:
+            return False, "video not found via YouTube API"
+        new_row = catalog_row(video_id, items[0])
+        try:
+            self.ingestor.submit(new_row)
+        except Exception as e:
+            return False, f"Failed to append to catalog: {e}"
+        # update the search index in place instead of rebuilding it
+        try:
+            content = self.snapshot().content
+            while content is not None:
+                content.add([new_row["video_id"]], [new_row["text"]])
+                self.maybe_refit_content_model(content)
+                # a swap after the snapshot was read may have carried over the old model's additions
+                # before this one: add it to the new model as well (add() skips indexed ids)
+                current = self.snapshot().content
+                content = current if current is not content else None
+        except Exception:
+            pass
+        return True, None
+
+    def load_history(self, user_id: str) -> List[str]:
+        try:
+            return self.history.all(user_id)
+        except Exception:
+            return []
+
+    def recent_history(self, user_id: str, n: int = 10) -> List[dict]:
+        """The user's newest n saved videos as {video_id, title, channel} (newest first)."""
+        try:
+            history = self.history.recent(user_id, n)
+        except Exception:
+            return []
+        snap = self.snapshot()
+        out = []
+        for video_id, row in zip(history, snap.index.rows(snap.df, history, ["title", "channel"])):
+            if row is None:
+                row = self.ingestor.get(video_id)  # saved but not flushed to the catalog yet
+            out.append({"video_id": video_id,
+                        "title": (row.get("title") if row else video_id) or video_id,
+                        "channel": (row.get("channel") if row else "") or ""})
+        return out
+
+    def history_count(self, user_id: str) -> int:
+        return self.history.count(user_id)
+
+    def save(self, user_id: str, video_id: str):
+        """(ok, error): add a video to the user's library, making sure the catalog knows it."""
+        if not video_id:
+            return False, "Empty video id"
+        _, err_cat = self.ensure_in_catalog(video_id)
+        try:
+            self.history.add(user_id, video_id)
+            return True, None
+        except Exception as e:
+            return False, str(e) or err_cat
@@ -0,0 +1,114 @@
+# src/history_store.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id  TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    UNIQUE (user_id, video_id)
+);
+CREATE INDEX IF NOT EXISTS history_user_seq ON history (user_id, seq);
+CREATE TABLE IF NOT EXISTS migrated_users (user_id TEXT PRIMARY KEY);
+"""
+
+
+class HistoryStore:
+    """
+    Listening history in SQLite (WAL mode): appends are single-row inserts, duplicate saves
+    are rejected by the (user_id, video_id) unique index, recent() reads only the newest rows
+    and concurrent writers (threads or processes) are serialised by SQLite.
+    Legacy data/user_history/<user>.json files are imported the first time a user is read.
+    """
+
+    def __init__(self, db_path: str, legacy_dir: str = None):
+        self.db_path = db_path
+        self.legacy_dir = legacy_dir
+        self._local = threading.local()
+        self._checked = set()  # users whose legacy JSON is known to be imported (or absent) in this process
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, user_id: str, video_id: str) -> bool:
+        """Append a video to the user's history; False if it was already there."""
+        self._migrate(user_id)
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO history (user_id, video_id, added_at) VALUES (?, ?, ?)",
+            (user_id, str(video_id), time.time()),
+        )
+        return cur.rowcount == 1
+
+    def contains(self, user_id: str, video_id: str) -> bool:
+        self._migrate(user_id)
+        row = self._conn().execute(
+            "SELECT 1 FROM history WHERE user_id = ? AND video_id = ?", (user_id, str(video_id))
+        ).fetchone()
+        return row is not None
+
+    def recent(self, user_id: str, n: int = 10) -> List[str]:
+        """The n most recently saved video ids, newest first."""
+        self._migrate(user_id)
+        rows = self._conn().execute(
+            "SELECT video_id FROM history WHERE user_id = ? ORDER BY seq DESC LIMIT ?", (user_id, n)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def all(self, user_id: str) -> List[str]:
+        """Full history, oldest first."""
+        self._migrate(user_id)
+        rows = self._conn().execute(
+            "SELECT video_id FROM history WHERE user_id = ? ORDER BY seq", (user_id,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def count(self, user_id: str) -> int:
+        self._migrate(user_id)
+        return self._conn().execute("SELECT COUNT(*) FROM history WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def users(self) -> List[str]:
+        """Every user with history, including legacy JSON files that have not been imported yet."""
+        users = {r[0] for r in self._conn().execute("SELECT DISTINCT user_id FROM history")}
+        if self.legacy_dir and os.path.isdir(self.legacy_dir):
+            users.update(f[:-5] for f in os.listdir(self.legacy_dir) if f.endswith(".json"))
+        return sorted(users)
+
+    def _migrate(self, user_id: str):
+        if not self.legacy_dir or user_id in self._checked:
+            return
+        path = os.path.join(self.legacy_dir, f"{user_id}.json")
+        conn = self._conn()
+        if not os.path.exists(path) or conn.execute("SELECT 1 FROM migrated_users WHERE user_id = ?",
+                                                    (user_id,)).fetchone():
+            self._checked.add(user_id)
+            return
+        with open(path, "r", encoding="utf-8") as f:  # an I/O error propagates: retried on the next call
+            try:
+                data = json.load(f)
+            except ValueError:
+                data = []  # corrupt file: nothing to import
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if not conn.execute("SELECT 1 FROM migrated_users WHERE user_id = ?", (user_id,)).fetchone():
+                conn.executemany(
+                    "INSERT OR IGNORE INTO history (user_id, video_id, added_at) VALUES (?, ?, ?)",
+                    [(user_id, str(v), now) for v in (data if isinstance(data, list) else [])],
+                )
+                conn.execute("INSERT INTO migrated_users (user_id) VALUES (?)", (user_id,))
+        # only once the import has committed: a failed one is retried on the user's next call
+        self._checked.add(user_id)
@@ -0,0 +1,300 @@
+# src/hybrid.py
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import numpy as np
+
+from src.ranking import top_k_indices, take_ranked
+
+SOURCES = ("content", "als", "popularity")
+DEFAULT_WEIGHTS = {"content": 0.5, "als": 0.3, "popularity": 0.2}
+DEFAULT_BUDGETS = {"content": 0.15, "als": 0.15}  # seconds each retrieval stage may take
+CANDIDATES = 200  # retrieved per source before the blend
+
+
+def parse_weights(spec: str, default: dict = None) -> dict:
+    """'content=0.6,als=0.2,popularity=0.2' -> dict (unknown names are ignored)."""
+    weights = dict(default or DEFAULT_WEIGHTS)
+    for part in (spec or "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() in SOURCES and value.strip():
+            weights[name.strip()] = float(value)
+    return weights
+
+
+def minmax(x: np.ndarray) -> np.ndarray:
+    """Scale finite scores to [0, 1]; NaN (source has no opinion) becomes 0."""
+    out = np.zeros(len(x), dtype="float64")
+    finite = np.isfinite(x)
+    if finite.any():
+        lo, hi = x[finite].min(), x[finite].max()
+        out[finite] = (x[finite] - lo) / (hi - lo) if hi > lo else 1.0
+    return out
+
+
+class StageStats:
+    """
+    Counters for HybridRanker.rank(), shared across rankers like the executor so they
+    survive snapshot swaps: requests, requests that lost a retrieval stage ("degraded"),
+    per-stage timeouts and errors, and stages run inline because every worker was busy.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "degraded": 0, "inline": 0, "timeouts": {}, "errors": {}}
+
+    def record(self, timeouts, errors, inline: int):
+        with self._lock:
+            c = self.counters
+            c["requests"] += 1
+            c["degraded"] += bool(timeouts or errors)
+            c["inline"] += inline
+            for kind, stages in (("timeouts", timeouts), ("errors", errors)):
+                for stage in stages:
+                    c[kind][stage] = c[kind].get(stage, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            c = self.counters
+            out = dict(c, timeouts=dict(c["timeouts"]), errors=dict(c["errors"]))
+        out["degraded_rate"] = out["degraded"] / out["requests"] if out["requests"] else 0.0
+        return out
+
+
+class HybridRanker:
+    """
+    Blends content similarity, ALS preference and popularity over one catalog version.
+    Stages:
+      content / als  retrieve candidates concurrently, each within its latency budget;
+                     a stage that misses its budget or fails is dropped from the blend.
+                     At most `max_inflight` stages (default: the pool size) are handed to
+                     the pool; past that they run inline on the request thread instead of
+                     queueing behind stages that already blew their budget
+      popularity     top of the precomputed popularity order
+      score          scores the union of candidates with every available source,
+                     as arrays aligned to catalog positions
+      blend          weighted sum of min-max normalised scores, then top-k
+    rank() returns per-stage timings in ms (None = over budget; failed stages are listed
+    under "errors") for tuning; `stats` counts timeouts, errors and degraded requests.
+    """
+
+    def __init__(self, catalog_index, popularity: np.ndarray, order: np.ndarray = None,
+                 content=None, collab=None, weights: dict = None, budgets: dict = None,
+                 candidates: int = CANDIDATES, executor: ThreadPoolExecutor = None,
+                 slots: threading.BoundedSemaphore = None, stats: StageStats = None):
+        self.catalog_index = catalog_index
+        self.popularity = np.asarray(popularity, dtype="float64")
+        self.order = order
+        self.content = content
+        self.collab = collab
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.candidates = candidates
+        # pass a shared executor (with its slots and stats) when rankers are rebuilt per catalog version
+        self._pool = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid")
+        self._slots = slots or threading.BoundedSemaphore(getattr(self._pool, "_max_workers", 2))
+        self.stats = stats or StageStats()
+        self._maps, self._maps_key = None, None
+
+    def _content_stage(self, history_ids, history_texts, state):
+        query = self.content.query_vector(history_ids, history_texts, state)
+        if query is None:
+            return None, []
+        _, pos = self.content.search(query[None], self.candidates + len(history_ids), state)
+        return query, self.content.ids_at(pos[0][pos[0] >= 0], state).tolist()
+
+    def _als_stage(self, history_ids):
+        user, _ = self.collab.user_vector(history_ids)
+        if user is None:
+            return None, []
+        pos, _ = self.collab.recommend_batch(user[None], self.candidates + len(history_ids))
+        return user, self.collab.item_ids[pos[0][pos[0] >= 0]].tolist()
+
+    def _timed(self, fn, *args):
+        start = time.perf_counter()
+        return fn(*args), (time.perf_counter() - start) * 1000
+
+    def _pooled(self, fn, *args):
+        try:
+            return self._timed(fn, *args)
+        finally:
+            self._slots.release()
+
+    def _submit(self, fn, *args):
+        """A future for fn(*args) on the pool, or None when every slot is taken (run it inline)."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            return self._pool.submit(self._pooled, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def rank(self, history_ids, k: int = 10, history_texts=None, exclude=None, candidates=None, weights: dict = None):
+        """
+        Top-k catalog positions for a seed history. `exclude` (catalog positions) are never
+        returned; `candidates` (catalog positions, e.g. an artist's own videos) are always scored.
+        Returns (positions, blended scores, timings).
+        """
+        weights = dict(self.weights, **(weights or {}))
+        timings = {}
+        start = time.perf_counter()
+        history_ids = [str(v) for v in history_ids]
+        # one content state for the whole request, so a refit swapping it can't mix index versions
+        state = self.content.snapshot() if self.content is not None else None
+
+        stages = {}
+        if self.content is not None and weights.get("content", 0) > 0 and history_ids:
+            stages["content"] = (self._content_stage, history_ids, history_texts, state)
+        if self.collab is not None and weights.get("als", 0) > 0 and history_ids:
+            stages["als"] = (self._als_stage, history_ids)
+        futures = {stage: self._submit(*call) for stage, call in stages.items()}
+        queries, retrieved, timeouts, errors = {}, [], [], {}
+        for stage, fut in futures.items():
+            try:
+                if fut is None:  # pool saturated: run here rather than queue behind a backlog
+                    (query, ids), ms = self._timed(*stages[stage])
+                else:
+                    # stages run concurrently, so each budget is measured from the start of rank()
+                    remaining = self.budgets.get(stage, 0) - (time.perf_counter() - start)
+                    (query, ids), ms = fut.result(timeout=max(remaining, 0))
+            except FuturesTimeout:
+                fut.cancel()
+                timings[stage] = None
+                timeouts.append(stage)
+                continue
+            except Exception as e:
+                timings[stage] = None
+                errors[stage] = f"{type(e).__name__}: {e}"
+                continue
+            timings[stage] = ms
+            if query is not None:
+                queries[stage] = query
+                retrieved.append(self.catalog_index.positions(ids))
+
+        if weights.get("popularity", 0) > 0 and self.order is not None:
+            t = time.perf_counter()
+            retrieved.append(take_ranked(self.order, self.candidates + (len(exclude) if exclude is not None else 0)))
+            timings["popularity"] = (time.perf_counter() - t) * 1000
+
+        positions, scores, timings["score"], timings["blend"] = self._blend(retrieved, queries, weights, exclude, k,
+                                                                           candidates, content_state=state)
+        timings["total"] = (time.perf_counter() - start) * 1000
+        if errors:
+            timings["errors"] = errors
+        self.stats.record(timeouts, errors, sum(f is None for f in futures.values()))
+        return positions, scores, timings
+
+    def rank_batch(self, histories, k: int = 10, weights: dict = None, als_vectors: np.ndarray = None):
+        """
+        Offline counterpart of rank() for many users at once: one batched FAISS search for
+        every content query and one blocked matrix product for every ALS user, then the same
+        per-user score + blend on integer row maps. Each user's history is excluded; no budgets apply.
+        als_vectors: optional [users x factors] ALS vectors (e.g. trained factors); NaN rows are folded in.
+        Returns a list of (positions, scores), one per history.
+        """
+        weights = dict(self.weights, **(weights or {}))
+        state = self.content.snapshot() if self.content is not None else None
+        maps = self._row_maps(state)
+        histories = [[str(v) for v in h] for h in histories]
+        n = len(histories)
+        lengths = np.array([len(h) for h in histories], dtype=np.int64)
+        splits = np.cumsum(lengths)[:-1]
+        flat = [v for h in histories for v in h]
+        excludes = np.split(self.catalog_index.positions(flat), splits)
+        depth = self.candidates + int(lengths.max(initial=0))
+        queries = [{} for _ in range(n)]
+        retrieved = [[] for _ in range(n)]
+
+        if self.content is not None and weights.get("content", 0) > 0 and n:
+            Q, valid = self.content.query_vectors(histories, state)
+            _, found = self.content.search(Q, depth, state) if len(Q) else (None, [])
+            for row, q, pos in zip(np.flatnonzero(valid), Q, found):
+                queries[row]["content"] = q
+                retrieved[row].append(maps["content_rows"][pos[(pos >= 0) & (pos < len(maps["content_rows"]))]])
+
+        if self.collab is not None and weights.get("als", 0) > 0 and n:
+            U = np.full((n, self.collab.factors), np.nan, dtype="float32")
+            if als_vectors is not None:
+                U[:] = als_vectors
+            items = np.split(self.collab.item_positions(flat), splits)
+            fold = [r for r in np.flatnonzero(np.isnan(U).any(axis=1)) if (items[r] >= 0).any()]
+            if fold:
+                U[fold] = self.collab.fold_in([items[r][items[r] >= 0] for r in fold])
+            valid = np.flatnonzero(~np.isnan(U).any(axis=1))
+            if len(valid):
+                found, _ = self.collab.recommend_batch(U[valid], depth)
+                for row, pos in zip(valid, found):
+                    queries[row]["als"] = U[row]
+                    retrieved[row].append(maps["als_rows"][pos[pos >= 0]])
+
+        head = None
+        if weights.get("popularity", 0) > 0 and self.order is not None:
+            head = take_ranked(self.order, depth)
+        out = []
+        for row in range(n):
+            parts = retrieved[row] + ([head] if head is not None else [])
+            positions, scores, _, _ = self._blend(parts, queries[row], weights, excludes[row], k, rows=maps,
+                                                  content_state=state)
+            out.append((positions, scores))
+        return out
+
+    def _row_maps(self, state=None) -> dict:
+        """
+        Integer maps between catalog positions and model rows (-1 = absent), built once so
+        batch scoring never goes back through string ids. Rebuilt for each new content state.
+        """
+        if self._maps is None or self._maps_key is not state:
+            catalog_ids = self.catalog_index.ids_at(np.arange(len(self.popularity)))
+            maps = {}
+            if self.content is not None:
+                maps["content"] = self.content.positions(catalog_ids, state)
+                maps["content_rows"] = self.catalog_index.positions(self.content.ids_at(np.arange(state.ntotal), state))
+            if self.collab is not None:
+                maps["als"] = self.collab.item_positions(catalog_ids)
+                maps["als_rows"] = self.catalog_index.positions(self.collab.item_ids)
+            self._maps, self._maps_key = maps, state
+        return self._maps
+
+    def _blend(self, retrieved, queries, weights, exclude, k, candidates=None, rows: dict = None, content_state=None):
+        """
+        Score the union of retrieved positions with every source and blend; returns
+        (positions, scores, score ms, blend ms). `rows` (see _row_maps) skips the id lookups.
+        """
+        t = time.perf_counter()
+        pool = np.concatenate(list(retrieved) + [np.asarray(candidates if candidates is not None else [], dtype=np.int64)])
+        pool = np.unique(pool[pool >= 0].astype(np.int64))
+        columns = {"popularity": self.popularity[pool]}
+        ids = self.catalog_index.ids_at(pool) if rows is None else None
+        if "content" in queries:
+            columns["content"] = (self.content.score(queries["content"], ids, content_state) if rows is None
+                                  else self.content.score_positions(queries["content"], rows["content"][pool], content_state))
+        if "als" in queries:
+            columns["als"] = (self.collab.score(queries["als"], ids) if rows is None
+                              else self.collab.score_positions(queries["als"], rows["als"][pool]))
+        score_ms = (time.perf_counter() - t) * 1000
+
+        t = time.perf_counter()
+        total = sum(weights.get(name, 0) for name in columns)
+        blended = np.zeros(len(pool), dtype="float64")
+        for name, values in columns.items():
+            if total > 0:
+                blended += weights.get(name, 0) / total * minmax(values)
+        excluded = np.isin(pool, np.asarray(exclude, dtype=np.int64)) if exclude is not None and len(exclude) else None
+        top = top_k_indices(blended, k, exclude=excluded)
+        return pool[top], blended[top], score_ms, (time.perf_counter() - t) * 1000
+
+
+def format_timings(timings: dict) -> str:
+    """'content 3.1 ms · als over budget · ...' for a UI caption or log line (failed stages: 'als failed (...)')."""
+    errors = timings.get("errors") or {}
+    parts = []
+    for stage, ms in timings.items():
+        if stage == "errors":
+            continue
+        if stage in errors:
+            parts.append(f"{stage} failed ({errors[stage]})")
+        else:
+            parts.append(f"{stage} {'over budget' if ms is None else f'{ms:.1f} ms'}")
+    return " · ".join(parts)
@@ -0,0 +1,315 @@
+# src/interaction_store.py
+import os
+import re
+import json
+import argparse
+import threading
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from scipy.sparse import csr_matrix
+
+PART_RE = re.compile(r"^part-(\d{6})\.arrow$")
+FILE_RE = re.compile(r"^(?:part|users|items)-(\d{6})\.arrow$")
+USERS = "users.arrow"  # dictionaries of directories written before the manifest
+ITEMS = "items.arrow"
+MANIFEST = "manifest.json"  # the live segments + dictionaries; swapped with os.replace
+CHUNK_ROWS = 5_000_000  # rows per segment when importing a frame
+
+
+def _ratings(values) -> pa.Array:
+    """int8 when every rating is a small integer (the usual 1-5 stars), else float32."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iub" and (len(values) == 0 or (values.min() >= -128 and values.max() <= 127)):
+        return pa.array(values.astype(np.int8), pa.int8())
+    return pa.array(values.astype(np.float32), pa.float32())
+
+
+class InteractionStore:
+    """
+    Integer-coded (user, item, rating) log: a directory of immutable Arrow IPC segments
+    (part-000000.arrow, ...) holding int32 user/item codes and int8 (or float32) ratings,
+    plus the code -> id dictionaries users.arrow / items.arrow. Segments are memory-mapped
+    and read one at a time, so csr() builds the ALS input without materialising the log,
+    its string ids or a COO copy. New interactions are appended as new segments.
+    manifest.json names the live segments and dictionaries: writers add new files first and
+    then replace the manifest, so each read works on one version of the store, before or
+    after a write. Files the previous version used are kept until the next write, for
+    readers still going through them (older directories without a manifest list their segments).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            parts = sorted(f for f in os.listdir(self.root) if PART_RE.match(f)) if os.path.isdir(self.root) else []
+            return {"parts": parts, "users": USERS, "items": ITEMS, "retired": []}
+
+    def parts(self) -> List[str]:
+        return self.manifest()["parts"]
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.root, self.manifest()["users"]))
+
+    def version(self):
+        """Changes whenever a segment is added or the store is rewritten."""
+        parts = self.parts()
+        if not parts:
+            return None
+        return (os.stat(self.root).st_mtime_ns, len(parts), parts[-1])
+
+    def user_ids(self, manifest: dict = None) -> np.ndarray:
+        """user code -> user_id."""
+        return self._read_ids((manifest or self.manifest())["users"])
+
+    def item_ids(self, manifest: dict = None) -> np.ndarray:
+        """item code -> video_id."""
+        return self._read_ids((manifest or self.manifest())["items"])
+
+    def __len__(self) -> int:
+        rows = 0
+        for name in self.parts():
+            with pa.memory_map(os.path.join(self.root, name), "r") as source:
+                reader = pa.ipc.open_file(source)
+                rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return rows
+
+    def iter_chunks(self, manifest: dict = None) -> Iterator[dict]:
+        """{"user", "item", "rating"} numpy arrays per record batch, memory-mapped (no copy)."""
+        for name in (manifest or self.manifest())["parts"]:
+            with pa.memory_map(os.path.join(self.root, name), "r") as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    yield {c: batch.column(c).to_numpy(zero_copy_only=True) for c in ("user", "item", "rating")}
+
+    def csr(self, dtype=np.float32) -> csr_matrix:
+        """
+        users x items matrix (duplicates summed), the layout implicit's ALS.fit() expects.
+        Two streaming passes: per-user counts give indptr, then every segment scatters its
+        rows into place, so peak memory is the CSR arrays plus one segment.
+        """
+        manifest = self.manifest()
+        shape = (self._count_ids(manifest["users"]), self._count_ids(manifest["items"]))
+        counts = np.zeros(shape[0], dtype=np.int64)
+        for chunk in self.iter_chunks(manifest):
+            counts += np.bincount(chunk["user"], minlength=shape[0])
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        index_dtype = np.int32 if indptr[-1] < np.iinfo(np.int32).max else np.int64
+        indices = np.empty(indptr[-1], dtype=index_dtype)
+        data = np.empty(indptr[-1], dtype=dtype)
+        cursor = indptr[:-1].copy()
+        for chunk in self.iter_chunks(manifest):
+            users, items, ratings = chunk["user"], chunk["item"], chunk["rating"]
+            if len(users) == 0:
+                continue
+            if np.any(users[1:] < users[:-1]):  # generated / imported segments are usually user-sorted already
+                order = np.argsort(users, kind="stable")
+                users, items, ratings = users[order], items[order], ratings[order]
+            lo, hi = users[0], users[-1] + 1
+            chunk_counts = np.bincount(users - lo, minlength=hi - lo)
+            if np.array_equal(chunk_counts, counts[lo:hi]):
+                # the chunk holds every row of its users: they fill one contiguous slice
+                start = indptr[lo]
+                indices[start:start + len(users)] = items
+                data[start:start + len(users)] = ratings
+            else:
+                # rank of each row among this chunk's rows of the same user: distance to its group start
+                rank = np.arange(len(users))
+                rank -= np.maximum.accumulate(np.where(np.r_[True, users[1:] != users[:-1]], rank, 0))
+                at = cursor[users] + rank
+                indices[at] = items
+                data[at] = ratings
+            cursor[lo:hi] += chunk_counts
+        m = csr_matrix((data, indices, indptr), shape=shape)
+        m.sum_duplicates()
+        return m
+
+    def iter_user_items(self, block_rows: int = CHUNK_ROWS) -> Iterator[tuple]:
+        """
+        (user code, sorted unique item codes) for every user with interactions, in user code
+        order. One counting pass splits the users into code ranges of ~block_rows rows; each
+        range then collects its rows from the segments that overlap it, so peak memory is the
+        per-user counts plus one block, not the log or its CSR matrix.
+        """
+        manifest = self.manifest()
+        counts = np.zeros(self._count_ids(manifest["users"]), dtype=np.int64)
+        spans = []  # (min, max) user code per chunk, to skip chunks outside a block
+        for chunk in self.iter_chunks(manifest):
+            users = chunk["user"]
+            counts += np.bincount(users, minlength=len(counts))
+            spans.append((users.min(), users.max()) if len(users) else (len(counts), -1))
+        if not counts.any():
+            return
+        cum = np.cumsum(counts)
+        starts = np.r_[0, np.flatnonzero(np.diff((cum - 1) // block_rows)) + 1, len(counts)]
+        for lo, hi in zip(starts[:-1], starts[1:]):
+            parts = [(chunk["user"], chunk["item"]) for chunk, (first, last) in zip(self.iter_chunks(manifest), spans)
+                     if first < hi and last >= lo]
+            users = np.concatenate([u[(u >= lo) & (u < hi)] for u, _ in parts])
+            items = np.concatenate([i[(u >= lo) & (u < hi)] for u, i in parts])
+            if len(users) == 0:
+                continue
+            order = np.lexsort((items, users))
+            users, items = users[order], items[order]
+            keep = np.r_[True, (users[1:] != users[:-1]) | (items[1:] != items[:-1])]
+            users, items = users[keep], items[keep]
+            bounds = np.r_[np.flatnonzero(np.r_[True, users[1:] != users[:-1]]), len(users)]
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                yield users[start], items[start:stop]
+
+    def load(self) -> pd.DataFrame:
+        """user_id / video_id / rating frame with categorical ids (small logs, inspection)."""
+        manifest = self.manifest()
+        chunks = list(self.iter_chunks(manifest))
+        cols = {c: np.concatenate([ch[c] for ch in chunks]) if chunks else np.empty(0, np.int32)
+                for c in ("user", "item", "rating")}
+        return pd.DataFrame({
+            "user_id": pd.Categorical.from_codes(cols["user"], categories=pd.Index(self.user_ids(manifest))),
+            "video_id": pd.Categorical.from_codes(cols["item"], categories=pd.Index(self.item_ids(manifest))),
+            "rating": cols["rating"],
+        })
+
+    def write_chunks(self, chunks, user_ids, item_ids) -> int:
+        """
+        Replace the store with already-coded chunks ({"user", "item", "rating"} arrays, codes
+        into user_ids / item_ids), one segment per chunk, e.g. straight from the synthetic
+        generator. Returns rows written. Nothing changes for readers until every chunk is
+        written; if `chunks` raises, the new files are removed and the store is left as it was.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        seq = self._next_seq()
+        written = [self._write_ids(f"users-{seq:06d}.arrow", user_ids),
+                   self._write_ids(f"items-{seq:06d}.arrow", item_ids)]
+        rows = 0
+        try:
+            for chunk in chunks:
+                written.append(self._write_part(chunk["user"], chunk["item"], chunk["rating"], seq))
+                rows += len(chunk["user"])
+                seq += 1
+        except BaseException:
+            self._drop(os.path.basename(path) for path in written)
+            raise
+        names = [os.path.basename(path) for path in written]
+        self._publish({"parts": names[2:], "users": names[0], "items": names[1]})
+        return rows
+
+    def write(self, df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS) -> int:
+        """Replace the store with a user_id / video_id (or track_id) / rating frame."""
+        item_col = "track_id" if "track_id" in df.columns else "video_id"
+        user_codes, user_ids = pd.factorize(df["user_id"])
+        item_codes, item_ids = pd.factorize(df[item_col])
+        ratings = df["rating"].to_numpy()
+        chunks = ({"user": user_codes[s:s + chunk_rows], "item": item_codes[s:s + chunk_rows],
+                   "rating": ratings[s:s + chunk_rows]} for s in range(0, len(df), chunk_rows))
+        return self.write_chunks(chunks, np.asarray(user_ids).astype(str), np.asarray(item_ids).astype(str))
+
+    def import_pickle(self, path: str, chunk_rows: int = CHUNK_ROWS) -> int:
+        """Convert a legacy pickled interactions DataFrame (user_item_matrix.pkl)."""
+        return self.write(pd.read_pickle(path), chunk_rows)
+
+    def append(self, user_ids, item_ids, ratings) -> str:
+        """Add interactions as a new segment; unseen ids get the next codes. O(rows + new ids)."""
+        manifest = self.manifest()
+        os.makedirs(self.root, exist_ok=True)
+        seq = self._next_seq()
+        update = {"parts": manifest["parts"] + [f"part-{seq:06d}.arrow"]}
+        coded = []
+        for key, ids in (("users", user_ids), ("items", item_ids)):
+            known = self._read_ids(manifest[key])
+            codes, ids = self._encode(known, ids)
+            update[key] = manifest[key]
+            if len(ids) > len(known):  # new ids: a longer dictionary, under a new name
+                update[key] = os.path.basename(self._write_ids(f"{key}-{seq:06d}.arrow", ids))
+            coded.append(codes)
+        path = self._write_part(coded[0], coded[1], ratings, seq)
+        self._publish(update, manifest)
+        return path
+
+    @staticmethod
+    def _encode(known: np.ndarray, ids):
+        ids = pd.Index(np.asarray(ids).astype(str))
+        codes = pd.Index(known).get_indexer(ids)
+        new = ids[codes < 0].unique()
+        if len(new):
+            codes[codes < 0] = pd.Index(new).get_indexer(ids[codes < 0]) + len(known)
+            known = np.concatenate([known, new.to_numpy().astype(str)])
+        return codes.astype(np.int32), known
+
+    def _publish(self, manifest: dict, current: dict = None):
+        """
+        Make `manifest` the live version. Files only the replaced version used are retired:
+        they stay for readers that opened it and are removed by the next publish.
+        """
+        current = current or self.manifest()
+        files = lambda m: set(m["parts"]) | {m["users"], m["items"]}
+        live = files(manifest)
+        manifest = dict(manifest, retired=sorted(files(current) - live))
+        path = os.path.join(self.root, MANIFEST)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, path)
+        self._drop(name for name in current["retired"] if name not in live)
+
+    def _drop(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def _next_seq(self) -> int:
+        """Past every part / dictionary file on disk, retired ones included."""
+        if not os.path.isdir(self.root):
+            return 0
+        seqs = [int(m.group(1)) for m in map(FILE_RE.match, os.listdir(self.root)) if m]
+        return max(seqs) + 1 if seqs else 0
+
+    def _read_ids(self, name: str) -> np.ndarray:
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=str)
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all().column("id").to_numpy(zero_copy_only=False).astype(str)
+
+    def _count_ids(self, name: str) -> int:
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return 0
+        with pa.memory_map(path, "r") as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    def _write_ids(self, name: str, ids) -> str:
+        return self._write_table(pa.table({"id": pa.array(np.asarray(ids).astype(str).tolist(), pa.string())}), name)
+
+    def _write_part(self, users, items, ratings, seq: int) -> str:
+        table = pa.table({"user": pa.array(np.asarray(users, dtype=np.int32), pa.int32()),
+                          "item": pa.array(np.asarray(items, dtype=np.int32), pa.int32()),
+                          "rating": _ratings(ratings)})
+        return self._write_table(table, f"part-{seq:06d}.arrow")
+
+    def _write_table(self, table: pa.Table, name: str) -> str:
+        path = os.path.join(self.root, name)
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)  # readers never see a half-written segment
+        return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a pickled interactions DataFrame to an InteractionStore.")
+    parser.add_argument("pickle_path")
+    parser.add_argument("--store", default="data/processed/interactions")
+    args = parser.parse_args()
+    rows = InteractionStore(args.store).import_pickle(args.pickle_path)
+    print(f"Imported {rows:,} interactions from {args.pickle_path} into {args.store}")
@@ -0,0 +1,143 @@
+# src/model_registry.py
+import time
+import threading
+from collections import deque
+
+REFRESH_SECONDS = 2.0  # how often the watcher polls the source version
+
+
+class Snapshot:
+    """
+    One consistent set of serving state (catalog frame, indexes, models), replaced as a whole.
+    Requests take one snapshot and read everything from it.
+    """
+
+    def __init__(self, version, built_at: float = None, build_ms: float = None, **state):
+        self.version = version
+        self.built_at = built_at
+        self.build_ms = build_ms
+        self.__dict__.update(state)
+
+
+class ModelRegistry:
+    """
+    Serves the active Snapshot and replaces it off the request path. A daemon watcher polls
+    version_fn() every `interval` seconds; when the version moves it calls
+    build(version, previous_snapshot) -> dict on a background thread and then swaps the
+    reference, so requests keep reading the old snapshot until the new one is complete.
+    Only a cold start (nothing to serve yet) makes the caller wait for a build.
+    A version whose build failed is not retried until the version changes again (or force=True).
+    on_swap(previous, snapshot), if given, runs on the build thread right after a swap, e.g. to
+    carry over writes the previous snapshot took while the new one was being built.
+    """
+
+    def __init__(self, version_fn, build, interval: float = REFRESH_SECONDS, log_size: int = 20, on_swap=None):
+        self.version_fn = version_fn
+        self.build = build
+        self.on_swap = on_swap
+        self.interval = interval
+        self._active = None
+        self._lock = threading.Lock()
+        self._builder = None
+        self._building_version = None
+        self._failed = {}  # version -> error
+        self._swaps = 0
+        self._stop = threading.Event()
+        self._watcher = None
+        self.log = deque(maxlen=log_size)  # swaps and failures, oldest first
+
+    def current(self) -> Snapshot:
+        snapshot = self._active  # a single reference read: never a half-built snapshot
+        if snapshot is None:
+            self.check(wait=True, force=True)
+            snapshot = self._active
+            if snapshot is None:
+                raise RuntimeError(f"no snapshot could be built: {self.log[-1].get('error') if self.log else 'unknown'}")
+        return snapshot
+
+    @property
+    def active(self):
+        """The snapshot being served, or None before the first build (never waits)."""
+        return self._active
+
+    def check(self, wait: bool = False, force: bool = False) -> bool:
+        """Start a background build if the source version moved; True while a build is running."""
+        try:
+            version = self.version_fn()
+        except Exception as e:
+            self.log.append({"version": None, "error": f"version check failed: {e!r}", "at": time.time()})
+            return False
+        with self._lock:
+            active = self._active
+            stale = active is None or active.version != version
+            idle = self._builder is None or not self._builder.is_alive()
+            if stale and idle and (force or version not in self._failed):
+                self._failed.pop(version, None)
+                self._building_version = version
+                self._builder = threading.Thread(target=self._build, args=(version, active),
+                                                 name="model-registry-build", daemon=True)
+                self._builder.start()
+            builder = self._builder
+        if wait and builder is not None:
+            builder.join()
+        return builder is not None and builder.is_alive()
+
+    def _build(self, version, previous):
+        start = time.perf_counter()
+        try:
+            state = self.build(version, previous)
+        except Exception as e:
+            with self._lock:
+                self._failed[version] = repr(e)
+                self._building_version = None
+            self.log.append({"version": version, "error": repr(e), "build_ms": (time.perf_counter() - start) * 1000,
+                             "at": time.time()})
+            return
+        build_ms = (time.perf_counter() - start) * 1000
+        snapshot = Snapshot(version, built_at=time.time(), build_ms=build_ms, **state)
+        with self._lock:
+            self._active = snapshot
+            self._building_version = None
+            self._swaps += 1
+        self.log.append({"version": version, "previous": previous.version if previous is not None else None,
+                         "build_ms": build_ms, "at": snapshot.built_at})
+        if self.on_swap is not None:
+            try:
+                self.on_swap(previous, snapshot)
+            except Exception as e:
+                self.log.append({"version": version, "error": f"on_swap failed: {e!r}", "at": time.time()})
+
+    def start(self) -> "ModelRegistry":
+        """Start the watcher thread (idempotent)."""
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stop.clear()
+                self._watcher = threading.Thread(target=self._watch, name="model-registry-watch", daemon=True)
+                self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def status(self) -> dict:
+        """Active version, when/how fast it was built, any build in flight and the swap log."""
+        snapshot = self._active
+        with self._lock:
+            building = self._building_version if self._builder is not None and self._builder.is_alive() else None
+            failed = dict(self._failed)
+            swaps = self._swaps
+        return {
+            "version": snapshot.version if snapshot is not None else None,
+            "built_at": snapshot.built_at if snapshot is not None else None,
+            "build_ms": snapshot.build_ms if snapshot is not None else None,
+            "building": building,
+            "swaps": swaps,
+            "failed": failed,
+            "log": list(self.log),
+        }
@@ -1,80 +1,385 @@
-import pandas as pd
+# src/models.py
+"""
+Recommendation models with fit / recommend / save / load, and the training CLI
+(`python src/models.py`) that fits them and publishes an artifact bundle.
+Importing this module is cheap: FAISS, scikit-learn and implicit are only
+imported when a model is fitted or loaded.
+"""
+import os
+import sys
+import argparse
+
 import numpy as np
+import pandas as pd
 import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from scipy.sparse import coo_matrix
-import os
-from implicit.als import AlternatingLeastSquares
-import faiss  # FAISS
-
-print("=== TRAINING MODELS (YouTube metadata) ===")
-print("Current directory:", os.getcwd())
-
-# Load data
-print("Loading data...")
-features_df = pd.read_csv('data/processed/youtube_features.csv')
-interactions = pd.read_pickle('data/processed/user_item_matrix.pkl')
-print(f"Loaded {len(features_df)} videos, {len(interactions)} interactions")
-
-# 1. POPULARITY (use YouTube view/like/comment normalized scores)
-print("Training Popularity...")
-features_df['popularity_score'] = (
-    features_df.get('viewCount_norm', 0) * 0.7 +
-    features_df.get('likeCount_norm', 0) * 0.2 +
-    features_df.get('commentCount_norm', 0) * 0.1
-)
-popularity_scores = features_df[['video_id', 'popularity_score']].sort_values('popularity_score', ascending=False)
-joblib.dump(popularity_scores, 'models/popularity.pkl')
-print("Popularity saved.")
-
-# 2. CONTENT-BASED WITH FAISS (text only)
-print("Training Content-Based with FAISS...")
-text_series = features_df.get('text')
-if text_series is None or text_series.isna().all():
-    raise RuntimeError("Missing 'text' column; run src/data_loader.py first.")
-
-tfidf = TfidfVectorizer(max_features=10000, stop_words='english')
-tfidf_matrix = tfidf.fit_transform(text_series.fillna(''))
-content_matrix = tfidf_matrix.astype('float32').toarray()
-
-# Build FAISS index
-d = content_matrix.shape[1]
-faiss.normalize_L2(content_matrix)
-index = faiss.IndexFlatIP(d)  # Inner Product = Cosine after L2 norm
-index.add(content_matrix)
-
-# Save FAISS index + ids
-joblib.dump((index, features_df['video_id'].values), 'models/content.pkl')
-print("FAISS Content model saved.")
-
-# 3. ALS (on synthetic interactions)
-print("Training ALS...")
-user_item = coo_matrix((
-    interactions['rating'],
-    (interactions['user_id'].astype('category').cat.codes,
-     interactions['track_id'].astype('category').cat.codes)
-))
-als = AlternatingLeastSquares(factors=64, regularization=0.1, iterations=50)
-als.fit(user_item.T)
-
-track_codes = dict(enumerate(interactions['track_id'].astype('category').cat.categories))
-user_codes = dict(enumerate(interactions['user_id'].astype('category').cat.categories))
-joblib.dump((als, track_codes, user_codes), 'models/collab_als.pkl')
-print("ALS saved.")
-
-# 4. HYBRID DATA
-hybrid_data = {
-    'popularity_scores': popularity_scores,
-    'content_index': index,
-    'content_ids': features_df['video_id'].values,
-    'interactions': interactions,
-    'features_df': features_df,
-    'track_codes': track_codes,
-    'user_codes': user_codes,
-    'tfidf_vocabulary': tfidf.vocabulary_,
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.ranking import POPULARITY_WEIGHTS, popularity_scores, take_ranked
+
+CONTENT_DIM = int(os.getenv("CONTENT_DIM", 256))
+CONTENT_PROJECTION = os.getenv("CONTENT_PROJECTION", "svd")  # "svd" or "random"
+CONTENT_INDEX = os.getenv("CONTENT_INDEX", "flat")  # flat | ivf_flat | ivf_pq | hnsw
+CONTENT_INDEX_PARAMS = {
+    'nlist': int(os.getenv("CONTENT_NLIST", 0)) or None,  # 0 -> 4 * sqrt(n)
+    'train_size': int(os.getenv("CONTENT_TRAIN_SIZE", 100_000)),
+    'nprobe': int(os.getenv("CONTENT_NPROBE", 16)),
+    'ef_search': int(os.getenv("CONTENT_EF_SEARCH", 64)),
 }
-joblib.dump(hybrid_data, 'models/hybrid_data.pkl')
-print("Hybrid data saved.")
+ALS_PARAMS = {'factors': 64, 'regularization': 0.1, 'iterations': 50}
+
+CATALOG_DIR = 'data/processed/catalog'
+FEATURES_CSV = 'data/processed/youtube_features.csv'
+INTERACTIONS = 'data/processed/interactions'  # InteractionStore
+LEGACY_INTERACTIONS = 'data/processed/user_item_matrix.pkl'
+MODELS_DIR = 'models'
+
+
+def id_column(df: pd.DataFrame) -> str:
+    """Item id column: video_id (YouTube catalog) or track_id (legacy Spotify features)."""
+    for column in ("video_id", "track_id"):
+        if column in df.columns:
+            return column
+    raise KeyError("expected a video_id or track_id column")
+
+
+def item_texts(df: pd.DataFrame) -> pd.Series:
+    """The `text` column written by src/data_loader.py, else the row's string columns joined."""
+    if "text" in df.columns and not df["text"].isna().all():
+        return df["text"].fillna("").astype(str)
+    columns = [c for c in df.columns if c != id_column(df)
+               and (df[c].dtype == object or pd.api.types.is_string_dtype(df[c]))]
+    if not columns:
+        raise RuntimeError("Missing 'text' column; run src/data_loader.py first.")
+    return df[columns].fillna("").astype(str).agg(" ".join, axis=1)
+
+
+class PopularityBased:
+    """Weighted normalised engagement (views/likes/comments), or a plain `popularity` column."""
+
+    def __init__(self, df: pd.DataFrame = None, weights: dict = None):
+        self.weights = weights
+        self.scores = None  # DataFrame [id, popularity_score], best first
+        if df is not None:
+            self.fit(df)
+
+    def fit(self, df: pd.DataFrame) -> "PopularityBased":
+        weights = self.weights or POPULARITY_WEIGHTS
+        if not any(c in df.columns for c in weights) and "popularity" in df.columns:
+            weights = {"popularity": 1.0}
+        column = id_column(df)
+        scores = pd.DataFrame({column: df[column].to_numpy(), "popularity_score": popularity_scores(df, weights)})
+        self.scores = scores.sort_values("popularity_score", ascending=False, kind="stable")
+        return self
+
+    def recommend(self, n: int = 10, exclude=()) -> list:
+        ids = self.scores.iloc[:, 0].to_numpy()
+        exclude_pos = np.flatnonzero(pd.Index(ids).astype(str).isin([str(v) for v in exclude])) if len(exclude) else None
+        return ids[take_ranked(np.arange(len(ids)), n, exclude_pos)].tolist()
+
+    def save(self, path: str):
+        joblib.dump(self.scores, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PopularityBased":
+        model = cls()
+        model.scores = joblib.load(path)
+        return model
+
+
+class ContentBased:
+    """TF-IDF -> compact projection -> FAISS index over item text (src.content_index.ContentModel)."""
+
+    def __init__(self, df: pd.DataFrame = None, dim: int = CONTENT_DIM, projection: str = CONTENT_PROJECTION,
+                 index_type: str = CONTENT_INDEX, index_params: dict = None):
+        self.dim = dim
+        self.projection = projection
+        self.index_type = index_type
+        self.index_params = CONTENT_INDEX_PARAMS if index_params is None else index_params
+        self.model = None  # ContentModel
+        if df is not None:
+            self.fit(df)
+
+    def fit(self, df: pd.DataFrame) -> "ContentBased":
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from src.content_index import fit_projection, embed, build_index, fit_stats, ContentModel
+
+        texts = item_texts(df)
+        tfidf = TfidfVectorizer(max_features=10000, stop_words='english')
+        tfidf_matrix = tfidf.fit_transform(texts)
+        # compact embeddings straight from the sparse matrix (never densify rows x vocabulary)
+        projector = fit_projection(tfidf_matrix, dim=self.dim, method=self.projection)
+        index = build_index(embed(projector, tfidf_matrix), index_type=self.index_type, **self.index_params)
+        self.model = ContentModel(index, df[id_column(df)].values, tfidf, projector,
+                                  self.index_type, self.index_params, fit_stats(tfidf, texts))
+        return self
+
+    def recommend(self, seed, n: int = 10) -> list:
+        """Ids of the n items closest to a seed id or history of ids (the seeds excluded)."""
+        history = [seed] if isinstance(seed, (str, int, np.integer)) else list(seed)
+        ids, _ = self.model.recommend(history, k=n)
+        return ids
+
+    def save(self, path: str):
+        joblib.dump(self.model.to_dict(), path)
+
+    @classmethod
+    def load(cls, path: str) -> "ContentBased":
+        from src.content_index import ContentModel
+        return cls.from_model(ContentModel.load(path))
+
+    @classmethod
+    def from_model(cls, content_model) -> "ContentBased":
+        model = cls(projection=content_model.projection, index_type=content_model.index_type,
+                    index_params=content_model.index_params)
+        model.dim = content_model.dim
+        model.model = content_model
+        return model
+
+
+class ALSModel:
+    """
+    Implicit ALS on (user_id, video_id/track_id, rating) interactions (src.collab_model.CollabModel),
+    from a DataFrame or an integer-coded InteractionStore.
+    """
+
+    def __init__(self, interactions: pd.DataFrame = None, **params):
+        self.params = dict(ALS_PARAMS, **params)
+        self.model = None  # CollabModel
+        if interactions is not None:
+            self.fit(interactions)
+
+    def fit(self, interactions) -> "ALSModel":
+        """Fit on an interactions DataFrame or an src.interaction_store.InteractionStore."""
+        from src.collab_model import interaction_matrix
+
+        if hasattr(interactions, "csr"):  # InteractionStore: codes and dictionaries are stored
+            user_item = interactions.csr()
+            # dictionaries may hold ids without interactions (e.g. the whole catalog); factors only for the rest
+            users = np.flatnonzero(np.diff(user_item.indptr))
+            items = np.flatnonzero(np.bincount(user_item.indices, minlength=user_item.shape[1]))
+            if len(users) < user_item.shape[0] or len(items) < user_item.shape[1]:
+                user_item = user_item[users][:, items]
+            return self.fit_matrix(user_item, interactions.user_ids()[users], interactions.item_ids()[items])
+        user_codes, user_ids = pd.factorize(interactions['user_id'])
+        item_codes, item_ids = pd.factorize(interactions[id_column(interactions)])
+        user_item = interaction_matrix(user_codes, item_codes, interactions['rating'], (len(user_ids), len(item_ids)))
+        return self.fit_matrix(user_item, np.asarray(user_ids).astype(str), np.asarray(item_ids).astype(str))
+
+    def fit_matrix(self, user_item, user_ids, item_ids) -> "ALSModel":
+        """Fit on a users x items CSR matrix whose rows / columns are user_ids / item_ids."""
+        from implicit.als import AlternatingLeastSquares
+        from src.collab_model import CollabModel
+
+        als = AlternatingLeastSquares(**self.params)
+        als.fit(user_item)  # implicit >= 0.5 takes users x items
+        self.model = CollabModel.from_als(als, user_ids, item_ids, user_item)
+        return self
+
+    def recommend(self, user_id, n: int = 10) -> list:
+        """Top-n unseen items for a trained user ([] for unknown users; see recommend_history)."""
+        users, pos, _ = self.model.recommend_all(n, user_ids=[str(user_id)])
+        if not len(users):
+            return []
+        return self.model.item_ids[pos[0][pos[0] >= 0]].tolist()
+
+    def recommend_history(self, history_ids, n: int = 10) -> list:
+        """Top-n items for a history of item ids, folded into the trained factors."""
+        ids, _ = self.model.recommend(history_ids, k=n)
+        return ids
+
+    def save(self, path: str):
+        joblib.dump(self.model.to_dict(), path)
+
+    @classmethod
+    def load(cls, path: str) -> "ALSModel":
+        from src.collab_model import CollabModel
+        return cls.from_model(CollabModel.load(path))
+
+    @classmethod
+    def from_model(cls, collab_model) -> "ALSModel":
+        model = cls()
+        model.model = collab_model
+        return model
+
+
+class HybridModel:
+    """
+    Content + ALS + popularity blended by src.hybrid.HybridRanker over one catalog.
+    save() publishes the content and ALS models as an artifact bundle (src.artifacts);
+    popularity is recomputed from the catalog on load.
+    """
+
+    def __init__(self, catalog: pd.DataFrame, content: ContentBased = None, als: ALSModel = None,
+                 popularity: PopularityBased = None, weights: dict = None, budgets: dict = None):
+        self.catalog = catalog
+        self.content = content
+        self.als = als
+        self.popularity = popularity or PopularityBased(catalog)
+        self.weights = weights
+        self.budgets = budgets
+        self._ranker = None
+
+    @classmethod
+    def fit(cls, catalog: pd.DataFrame, interactions: pd.DataFrame = None, **kwargs) -> "HybridModel":
+        als = ALSModel(interactions) if interactions is not None and len(interactions) else None
+        return cls(catalog, ContentBased(catalog), als, **kwargs)
+
+    @property
+    def ranker(self):
+        if self._ranker is None:
+            from src.catalog_store import CatalogIndex
+            from src.hybrid import HybridRanker
+
+            index = CatalogIndex(self.catalog[id_column(self.catalog)])
+            # popularity aligned to catalog rows, as the engine's snapshot builds it
+            scores = self.popularity.scores
+            pos = index.positions(scores.iloc[:, 0].to_numpy())
+            values = np.zeros(len(self.catalog), dtype="float64")
+            values[pos[pos >= 0]] = scores["popularity_score"].to_numpy()[pos >= 0]
+            self._ranker = HybridRanker(index, values, np.argsort(-values, kind="stable"),
+                                        self.content.model if self.content else None,
+                                        self.als.model if self.als else None, self.weights, self.budgets)
+        return self._ranker
+
+    def recommend(self, history_ids, n: int = 10) -> list:
+        """Top-n catalog ids for a history of item ids, the history excluded."""
+        ranker = self.ranker
+        history_ids = [str(v) for v in history_ids]
+        exclude = ranker.catalog_index.positions(history_ids)
+        positions, _, _ = ranker.rank(history_ids, n, exclude=exclude[exclude >= 0])
+        return self.catalog[id_column(self.catalog)].to_numpy()[positions].tolist()
+
+    def save(self, root: str, meta: dict = None, publish: bool = True) -> str:
+        from src.artifacts import write_bundle
+        return write_bundle(root, self.content.model if self.content else None,
+                            self.als.model if self.als else None, meta=meta, publish=publish)
+
+    @classmethod
+    def load(cls, root: str, catalog: pd.DataFrame, version: str = None, **kwargs) -> "HybridModel":
+        from src.artifacts import ArtifactBundle
+        bundle = ArtifactBundle.open(root, version)
+        if bundle is None:
+            raise FileNotFoundError(f"no artifact bundle under {root}")
+        content, collab = bundle.load_content(), bundle.load_collab()
+        return cls(catalog, ContentBased.from_model(content) if content is not None else None,
+                   ALSModel.from_model(collab) if collab is not None else None, **kwargs)
+
+
+def _load_catalog(catalog_dir: str) -> pd.DataFrame:
+    from src.catalog_store import CatalogStore
+    return CatalogStore(catalog_dir).load()
+
+
+def fit_popularity(catalog_dir: str) -> PopularityBased:
+    return PopularityBased(_load_catalog(catalog_dir))
+
+
+def fit_content(catalog_dir: str, **params) -> ContentBased:
+    return ContentBased(_load_catalog(catalog_dir), **params)
+
+
+def load_interactions(path: str):
+    """An InteractionStore directory, or a legacy pickled DataFrame."""
+    from src.interaction_store import InteractionStore
+    return InteractionStore(path) if os.path.isdir(path) else pd.read_pickle(path)
+
+
+def fit_als(interactions_path: str, **params) -> ALSModel:
+    return ALSModel(load_interactions(interactions_path), **params)
+
+
+def publish(popularity: PopularityBased, content: ContentBased, als: ALSModel,
+            models_dir: str, artifact_root: str, meta: dict) -> str:
+    """
+    Write popularity.pkl and publish the bundle, unless the live bundle was built from the
+    same stage outputs (meta["stages"]), in which case its version is returned as is.
+    """
+    from src.artifacts import ArtifactBundle
+
+    os.makedirs(models_dir, exist_ok=True)
+    popularity.save(os.path.join(models_dir, 'popularity.pkl'))
+    live = ArtifactBundle.open(artifact_root)
+    if live is not None and live.manifest.get("meta", {}).get("stages") == meta["stages"]:
+        print(f"Artifact bundle {live.version} is up to date.")
+        return live.version
+    version = HybridModel(None, content, als, popularity).save(artifact_root, meta=meta)
+    print(f"Artifact bundle {version} published to {artifact_root}.")
+    return version
+
+
+def training_stages(catalog_dir: str = CATALOG_DIR, interactions_path: str = INTERACTIONS) -> list:
+    """Popularity, content and ALS fits; the first two read the catalog, ALS only the interactions."""
+    from src.pipeline import Stage
+
+    content_params = {'dim': CONTENT_DIM, 'projection': CONTENT_PROJECTION,
+                      'index_type': CONTENT_INDEX, 'index_params': CONTENT_INDEX_PARAMS}
+    return [
+        Stage('popularity', fit_popularity, params={'catalog_dir': catalog_dir}, files=[catalog_dir],
+              save=PopularityBased.save, load=PopularityBased.load),
+        Stage('content', fit_content, params=dict(content_params, catalog_dir=catalog_dir), files=[catalog_dir],
+              save=ContentBased.save, load=ContentBased.load),
+        Stage('als', fit_als, params=dict(ALS_PARAMS, interactions_path=interactions_path),
+              files=[interactions_path], save=ALSModel.save, load=ALSModel.load),
+    ]
+
+
+def train(catalog_dir: str = CATALOG_DIR, features_csv: str = FEATURES_CSV, interactions_path: str = INTERACTIONS,
+          models_dir: str = MODELS_DIR, artifact_root: str = None, cache_dir: str = None,
+          workers: int = None) -> str:
+    """
+    Fit every model on the processed data and publish an artifact bundle; returns its version.
+    Runs as a src.pipeline.Pipeline: the three fits train in parallel worker processes and
+    a fit whose inputs and parameters are unchanged is loaded from cache_dir instead.
+    """
+    from src.catalog_store import CatalogStore
+    from src.artifacts import ARTIFACT_ROOT
+    from src.pipeline import Pipeline, Stage
+
+    print("=== TRAINING MODELS (YouTube metadata) ===")
+    print("Current directory:", os.getcwd())
+
+    store = CatalogStore(catalog_dir)
+    if not store.exists():
+        store.import_csv(features_csv)
+    if interactions_path == INTERACTIONS and not os.path.exists(interactions_path) and os.path.exists(LEGACY_INTERACTIONS):
+        from src.interaction_store import InteractionStore
+        rows = InteractionStore(interactions_path).import_pickle(LEGACY_INTERACTIONS)
+        print(f"Converted {LEGACY_INTERACTIONS} to {interactions_path} ({rows:,} interactions).")
+    artifact_root = artifact_root or ARTIFACT_ROOT
+    cache_dir = cache_dir or os.path.join(models_dir, '.cache')
+
+    stages = training_stages(catalog_dir, interactions_path)
+    keys = Pipeline(stages, cache_dir).keys()
+    # the catalog and interactions stay in their own stores; the manifest only records their provenance
+    meta = {
+        'catalog_version': store.version(),
+        'content_projection': CONTENT_PROJECTION,
+        'content_dim': CONTENT_DIM,
+        'stages': {stage.name: keys[stage.name] for stage in stages},
+    }
+    stages.append(Stage('publish', publish, deps=['popularity', 'content', 'als'], cache=False,
+                        params={'models_dir': models_dir, 'artifact_root': artifact_root, 'meta': meta}))
+    pipeline = Pipeline(stages, cache_dir, workers)
+    report = pipeline.run()
+    version = pipeline.output(report, 'publish')
+
+    print("\nALL MODELS SAVED SUCCESSFULLY!")
+    print("Next: Run `streamlit run src/app.py`")
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the recommendation models and publish an artifact bundle.")
+    parser.add_argument("--catalog", default=CATALOG_DIR, help="catalog store directory")
+    parser.add_argument("--features", default=FEATURES_CSV, help="CSV imported when the catalog store is empty")
+    parser.add_argument("--interactions", default=INTERACTIONS, help="InteractionStore directory (or a legacy pickled DataFrame)")
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="where popularity.pkl is written")
+    parser.add_argument("--artifacts", default=None, help="artifact root (default models/artifacts)")
+    parser.add_argument("--cache", default=None, help="stage output cache (default <models-dir>/.cache)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per stage, up to the CPU count)")
+    args = parser.parse_args(argv)
+    train(args.catalog, args.features, args.interactions, args.models_dir, args.artifacts, args.cache, args.workers)
+
 
-print("\nALL MODELS SAVED SUCCESSFULLY!")
-print("Next: Run `streamlit run src/app.py`")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
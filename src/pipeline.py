@@ -0,0 +1,172 @@
+# src/pipeline.py
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Sequence
+
+import joblib
+
+CACHE_DIR = "models/.cache"
+KEEP_ENTRIES = 2  # cached outputs kept per stage
+HASH_CHUNK = 1 << 20
+
+_digests = {}  # (path, size, mtime_ns) -> sha256, so a process hashes an unchanged file once
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file's bytes, or of every file under a directory (relative names included)."""
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode("utf-8") + b"\0")
+                h.update(file_digest(full).encode("ascii"))
+        return h.hexdigest()
+    if not os.path.exists(path):
+        return "missing"
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _digests:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                h.update(block)
+        _digests[memo] = h.hexdigest()
+    return _digests[memo]
+
+
+class Stage:
+    """
+    One step of a Pipeline: fn(*dependency outputs, **params) -> output.
+    The output is written with save(output, path) and read back with load(path), so it
+    can cross process boundaries and be reused by a later run. Its cache key hashes the
+    stage name and version, params, the contents of `files` and the keys of `deps`, so
+    a change anywhere upstream re-runs everything below it. cache=False always runs
+    (e.g. publishing), but still feeds its output to later stages.
+    """
+
+    def __init__(self, name: str, fn: Callable, deps: Sequence[str] = (), params: dict = None,
+                 files: Sequence[str] = (), save: Callable = joblib.dump, load: Callable = joblib.load,
+                 version: str = "1", cache: bool = True):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.params = params or {}
+        self.files = list(files)
+        self.save = save
+        self.load = load
+        self.version = version
+        self.cache = cache
+
+    def key(self, dep_keys: List[str]) -> str:
+        spec = {
+            "stage": self.name,
+            "fn": f"{self.fn.__module__}.{self.fn.__qualname__}",
+            "version": self.version,
+            "params": self.params,
+            "files": {path: file_digest(path) for path in self.files},
+            "deps": dep_keys,
+        }
+        return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _run_stage(stage: Stage, path: str, dep_stages: List[Stage], dep_paths: List[str]) -> float:
+    """Run one stage (in a worker process or inline) and write its output to `path`; returns seconds."""
+    start = time.perf_counter()
+    inputs = [dep.load(p) for dep, p in zip(dep_stages, dep_paths)]
+    output = stage.fn(*inputs, **stage.params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        stage.save(output, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    A DAG of Stages run on a process pool: every stage whose dependencies are done is
+    submitted at once, so independent stages train in parallel. Stages whose cache key
+    already has an output under cache_dir are skipped. run() logs one line per stage
+    and returns {stage: {"key", "cached", "seconds", "path"}}.
+    """
+
+    def __init__(self, stages: Sequence[Stage], cache_dir: str = CACHE_DIR, workers: int = None,
+                 keep: int = KEEP_ENTRIES, log=print):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            unknown = [d for d in stage.deps if d not in self.stages]
+            if unknown:
+                raise ValueError(f"stage {stage.name} depends on {unknown}, which must be listed before it")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.workers = workers if workers is not None else min(len(self.stages), os.cpu_count() or 1)
+        self.keep = keep
+        self.log = log
+
+    def _path(self, name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, name, f"{key}.out")
+
+    def keys(self) -> Dict[str, str]:
+        keys = {}
+        for name, stage in self.stages.items():
+            keys[name] = stage.key([keys[d] for d in stage.deps])
+        return keys
+
+    def run(self) -> Dict[str, dict]:
+        start = time.perf_counter()
+        keys = self.keys()
+        report = {name: {"key": key, "path": self._path(name, key), "cached": False, "seconds": 0.0}
+                  for name, key in keys.items()}
+        todo = []
+        for name, stage in self.stages.items():
+            if stage.cache and os.path.exists(report[name]["path"]):
+                report[name]["cached"] = True
+                self.log(f"[pipeline] {name:<12} cached  ({keys[name]})")
+            else:
+                todo.append(name)
+
+        def submit(run, name):
+            stage = self.stages[name]
+            deps = [self.stages[d] for d in stage.deps]
+            return run(_run_stage, stage, report[name]["path"], deps, [report[d]["path"] for d in stage.deps])
+
+        def finished(name, seconds):
+            report[name]["seconds"] = seconds
+            self.log(f"[pipeline] {name:<12} {seconds:7.2f}s ({keys[name]})")
+            self._prune(name)
+
+        if self.workers <= 1:
+            for name in todo:
+                finished(name, submit(lambda fn, *args: fn(*args), name))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                pending, running = list(todo), {}
+                while pending or running:
+                    for name in [n for n in pending if not any(d in pending or d in running.values()
+                                                               for d in self.stages[n].deps)]:
+                        pending.remove(name)
+                        running[submit(pool.submit, name)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(running.pop(future), future.result())
+        skipped = sum(r["cached"] for r in report.values())
+        self.log(f"[pipeline] {len(todo)} run, {skipped} cached in {time.perf_counter() - start:.2f}s")
+        return report
+
+    def output(self, report: Dict[str, dict], name: str):
+        """Load a stage's output from a run() report."""
+        return self.stages[name].load(report[name]["path"])
+
+    def _prune(self, name: str):
+        """Drop all but the newest `keep` cached outputs of a stage."""
+        folder = os.path.join(self.cache_dir, name)
+        entries = sorted((e for e in os.scandir(folder) if e.name.endswith(".out")), key=lambda e: e.stat().st_mtime)
+        for entry in entries[:-self.keep] if self.keep else entries:
+            os.remove(entry.path)
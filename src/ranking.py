@@ -0,0 +1,123 @@
+# src/ranking.py
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+def _exclusion_mask(n: int, exclude) -> np.ndarray:
+    if exclude is None:
+        return np.zeros(n, dtype=bool)
+    exclude = np.asarray(exclude)
+    if exclude.dtype == bool:
+        return exclude
+    exclude = exclude.astype(np.int64)
+    mask = np.zeros(n, dtype=bool)
+    mask[exclude[(exclude >= 0) & (exclude < n)]] = True
+    return mask
+
+
+def top_k_indices(scores, k: int, exclude=None) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first, in O(n + k log k) via argpartition.
+    exclude: boolean mask or array of positions that must not be returned (e.g. history).
+    NaN scores rank last, like DataFrame.sort_values.
+    """
+    scores = np.asarray(scores, dtype="float64")
+    cand = np.flatnonzero(~_exclusion_mask(len(scores), exclude)) if exclude is not None else np.arange(len(scores))
+    k = min(int(k), len(cand))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    s = np.nan_to_num(scores[cand], nan=-np.inf)
+    if k < len(cand):
+        part = np.argpartition(-s, k - 1)[:k]
+    else:
+        part = np.arange(len(cand))
+    return cand[part[np.argsort(-s[part], kind="stable")]]
+
+
+def popularity_order(df: pd.DataFrame, column: str = "viewCount_norm"):
+    """
+    Full popularity ranking of catalog positions. O(n log n), so compute it once per
+    catalog version and serve requests from it with take_ranked(). None if the column is unusable.
+    """
+    if df is None or column not in df.columns:
+        return None
+    values = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+    if not np.isfinite(values).any():
+        return None
+    return np.argsort(-np.nan_to_num(values, nan=-np.inf), kind="stable")
+
+
+POPULARITY_WEIGHTS = {"viewCount_norm": 0.7, "likeCount_norm": 0.2, "commentCount_norm": 0.1}  # as in src/models.py
+
+
+def popularity_scores(df: pd.DataFrame, weights: dict = None) -> np.ndarray:
+    """Weighted normalised engagement per catalog position (missing columns / NaN count as 0)."""
+    scores = np.zeros(len(df) if df is not None else 0, dtype="float64")
+    for column, weight in (weights or POPULARITY_WEIGHTS).items():
+        if df is not None and column in df.columns:
+            scores += weight * np.nan_to_num(pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64"))
+    return scores
+
+
+def take_ranked(order: np.ndarray, k: int, exclude=None) -> np.ndarray:
+    """First k positions of a precomputed ranking, skipping excluded positions, in O(k + len(exclude))."""
+    if order is None or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if exclude is None or len(exclude) == 0:
+        return order[:k]
+    exclude = np.asarray(exclude)
+    if exclude.dtype == bool:
+        exclude = np.flatnonzero(exclude)
+    # at most len(exclude) of the first k + len(exclude) ranked items can be skipped
+    head = order[:k + len(exclude)]
+    return head[~np.isin(head, exclude)][:k]
+
+
+def _positions(values) -> np.ndarray:
+    values = np.asarray(values if values is not None else [])
+    if values.dtype == bool:
+        return np.flatnonzero(values)
+    return values.astype(np.int64)
+
+
+def ranked_candidates(n: int, k: int, primary=None, order=None, exclude=None, random_state: int = 42) -> np.ndarray:
+    """
+    Up to k distinct catalog positions in priority order: `primary` (e.g. model
+    recommendations, best first; -1 entries are skipped), then the precomputed popularity
+    `order`, then a seeded random fill when there is no ranking to fall back on.
+    Excluded positions (mask or positions) are never returned.
+    """
+    k = min(int(k), n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    used = _positions(exclude)
+    picked = _positions(primary)
+    picked = picked[(picked >= 0) & (picked < n) & ~np.isin(picked, used)]
+    _, first = np.unique(picked, return_index=True)
+    picked = picked[np.sort(first)][:k]
+    if len(picked) < k and order is not None:
+        fill = take_ranked(order, k - len(picked), exclude=np.concatenate([used, picked]))
+        picked = np.concatenate([picked, fill])
+    if len(picked) < k:
+        perm = np.random.default_rng(random_state).permutation(n)
+        fill = perm[~np.isin(perm, np.concatenate([used, picked]))][:k - len(picked)]
+        picked = np.concatenate([picked, fill])
+    return picked.astype(np.int64)
+
+
+def snippet_items(df: pd.DataFrame, positions) -> List[dict]:
+    """
+    YouTube search-result style payloads ({"id": {"videoId"}, "snippet": {"title", "channelTitle"}})
+    for catalog rows, gathered column-wise with array.take instead of per-row iloc/iterrows.
+    """
+    positions = _positions(positions)
+
+    def column(name):
+        if name not in df.columns:
+            return [""] * len(positions)
+        return ["" if pd.isna(v) else str(v) for v in df[name].array.take(positions).tolist()]
+
+    return [{"id": {"videoId": vid}, "snippet": {"title": title, "channelTitle": channel}}
+            for vid, title, channel in zip(column("video_id"), column("title"), column("channel"))]
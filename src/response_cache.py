@@ -0,0 +1,169 @@
+# src/response_cache.py
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Seconds a cached API response stays fresh, per endpoint
+DEFAULT_TTLS = {
+    "search.list": 6 * 3600,   # search rankings drift slowly; each call costs 100 quota units
+    "videos.list": 24 * 3600,  # snippet/statistics for a known id
+}
+DEFAULT_TTL = 3600
+PRUNE_EVERY = 100  # puts between disk size checks (run on a background thread)
+
+
+class ResponseCache:
+    """
+    Two-tier cache for YouTube Data API responses keyed by endpoint + request parameters:
+    an in-process LRU (max_entries) in front of a JSON-file tier on disk (max_disk_entries).
+    Entries expire after the endpoint's TTL. Hit/miss counters are available via stats().
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 1024, max_disk_entries: int = 20000,
+                 ttls: dict = None, default_ttl: int = DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self._memory = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._prune_thread = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(endpoint: str, params: dict) -> str:
+        raw = json.dumps([endpoint, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, params: dict):
+        k = self.key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(k)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(k)
+                    self.counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[k]
+                self.counters["expired"] += 1
+        entry = self._read_disk(k)
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                self._remember(k, entry)
+                self.counters["disk_hits"] += 1
+                return entry[1]
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, endpoint: str, params: dict, response):
+        k = self.key(endpoint, params)
+        entry = (time.time() + self.ttls.get(endpoint, self.default_ttl), response)
+        with self._lock:
+            self._remember(k, entry)
+            self._puts += 1
+            prune = self._puts % PRUNE_EVERY == 0
+        self._write_disk(k, entry)
+        if prune:
+            self.prune_in_background()
+
+    def fetch(self, endpoint: str, params: dict, call):
+        """Cached response for (endpoint, params), or call() once and cache its result."""
+        response = self.get(endpoint, params)
+        if response is None:
+            response = call()
+            self.put(endpoint, params, response)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.counters, memory_entries=len(self._memory))
+        hits = out["memory_hits"] + out["disk_hits"]
+        out["hit_rate"] = hits / (hits + out["misses"]) if hits + out["misses"] else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_files():
+            self._remove(path)
+
+    def prune_disk(self):
+        """Drop expired files, then the oldest ones beyond max_disk_entries."""
+        files = []
+        now = time.time()
+        for path in self._disk_files():
+            entry = self._load_file(path)
+            if entry is None or entry[0] <= now:
+                self._remove(path)
+            else:
+                files.append((os.path.getmtime(path), path))
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+            self._remove(path)
+
+    def prune_in_background(self) -> bool:
+        """Run prune_disk() on a daemon thread so the put() that triggered it returns at once."""
+        if not self.cache_dir:
+            return False
+        with self._lock:
+            if self._prune_thread is not None and self._prune_thread.is_alive():
+                return False
+            self._prune_thread = threading.Thread(target=self.prune_disk, daemon=True)
+            self._prune_thread.start()
+        return True
+
+    def _remember(self, k, entry):
+        self._memory[k] = entry
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, k: str) -> str:
+        return os.path.join(self.cache_dir, k[:2], f"{k}.json")
+
+    def _disk_files(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(root, f) for root, _, names in os.walk(self.cache_dir) for f in names if f.endswith(".json")]
+
+    def _read_disk(self, k: str):
+        if not self.cache_dir:
+            return None
+        return self._load_file(self._path(k))
+
+    @staticmethod
+    def _load_file(path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["expires_at"], data["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, k: str, entry):
+        if not self.cache_dir:
+            return
+        path = self._path(k)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": entry[0], "response": entry[1]}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the disk tier is best effort
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,67 @@
+# src/search_executor.py
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import httplib2
+
+MAX_WORKERS = 8
+HTTP_TIMEOUT = 10
+
+_local = threading.local()
+
+
+def thread_http() -> httplib2.Http:
+    """One httplib2.Http per thread: googleapiclient transports must not be shared across threads."""
+    if not hasattr(_local, "http"):
+        _local.http = httplib2.Http(timeout=HTTP_TIMEOUT)
+    return _local.http
+
+
+def execute(request):
+    """Execute a googleapiclient request on this thread's own HTTP connection."""
+    return request.execute(http=thread_http())
+
+
+def video_id(item) -> str:
+    return (item.get("id") or {}).get("videoId")
+
+
+class SearchExecutor:
+    """
+    Bounded thread pool that fans search calls out concurrently, short-circuits once
+    enough unique items have arrived and gives up when the latency budget is spent.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yt-search")
+
+    def gather(self, calls, want: int, budget: float, key=video_id):
+        """
+        Run `calls` (callables returning lists of items) concurrently and merge their items,
+        deduplicated by `key`, in completion order. Returns (items, timed_out); calls that fail
+        are skipped, and calls still queued when we stop are cancelled.
+        """
+        futures = [self._pool.submit(call) for call in calls]
+        items, seen, timed_out = [], set(), False
+        try:
+            for fut in as_completed(futures, timeout=budget):
+                try:
+                    batch = fut.result()
+                except Exception:
+                    continue
+                for item in batch or []:
+                    k = key(item)
+                    if k and k not in seen:
+                        items.append(item)
+                        seen.add(k)
+                if len(items) >= want:
+                    break
+        except FuturesTimeout:
+            timed_out = True
+        finally:
+            for fut in futures:
+                fut.cancel()
+        return items, timed_out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
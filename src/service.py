@@ -0,0 +1,202 @@
+# src/service.py
+import os
+import sys
+import json
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.api_client import RecommenderAPI
+from src.engine import RecommendationEngine, USER_MODELS
+
+HOST = os.getenv("RECOMMENDER_HOST", "127.0.0.1")
+PORT = int(os.getenv("RECOMMENDER_PORT", 8600))
+MAX_BODY = 1 << 20  # bytes accepted in a POST body
+MAX_K = 100
+
+
+def _int(params: dict, name: str, default: int, lo: int = 1, hi: int = MAX_K) -> int:
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if not lo <= value <= hi:
+        raise ValueError(f"{name} must be between {lo} and {hi}")
+    return value
+
+
+def _required(params: dict, name: str) -> str:
+    value = str(params.get(name) or "").strip()
+    if not value:
+        raise ValueError(f"missing {name}")
+    return value
+
+
+def _model(params: dict, choices) -> str:
+    model = params.get("model") or choices[0]
+    if model not in choices:
+        raise ValueError(f"model must be one of {', '.join(choices)}")
+    return model
+
+
+def recommend_user(engine, params):
+    items, timings = engine.recommend_for_user(_required(params, "user_id"), _int(params, "k", 10),
+                                               _model(params, USER_MODELS))
+    return {"items": items, "timings": timings}
+
+
+def recommend_artist(engine, params):
+    items, timings = engine.recommend_for_artist(_required(params, "artist"),
+                                                 _model(params, ["Hybrid", "Popularity", "Content-Based"]),
+                                                 _int(params, "k", 10))
+    return {"items": items, "timings": timings}
+
+
+def discover(engine, params):
+    """An artist's top videos (?artist=), or a mix across the default artists."""
+    artist = str(params.get("artist") or "").strip()
+    return {"items": engine.get_exactly_10(artist) if artist else engine.get_any_10()}
+
+
+def history(engine, params):
+    user_id = _required(params, "user_id")
+    return {"items": engine.recent_history(user_id, _int(params, "n", 10, hi=1000)),
+            "total": engine.history_count(user_id)}
+
+
+def save(engine, params):
+    ok, error = engine.save(_required(params, "user_id"), _required(params, "video_id"))
+    return {"ok": ok, "error": error}
+
+
+def status(engine, params):
+    return engine.status()
+
+
+def health(engine, params):
+    return {"ok": True}
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/status"): status,
+    ("GET", "/recommend/user"): recommend_user,
+    ("GET", "/recommend/artist"): recommend_artist,
+    ("GET", "/discover"): discover,
+    ("GET", "/history"): history,
+    ("POST", "/library"): save,
+}
+
+
+def dispatch(engine, method: str, path: str, params: dict):
+    """(HTTP status, JSON-ready payload) for one API call; shared by the server and the in-process client."""
+    handler = ROUTES.get((method, path))
+    if handler is None:
+        known = any(p == path for _, p in ROUTES)
+        return (405 if known else 404), {"error": f"{'method not allowed' if known else 'not found'}: {method} {path}"}
+    try:
+        return 200, handler(engine, params)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": f"{type(e).__name__}: {e}"}
+
+
+class LocalClient(RecommenderAPI):
+    """The same API against an in-process engine (no server), e.g. for a single-process app."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _call(self, method: str, path: str, params: dict) -> dict:
+        code, payload = dispatch(self.engine, method, path, params)
+        if code >= 400:
+            raise RuntimeError(f"{method} {path} failed ({code}): {payload.get('error')}")
+        # round-trip through JSON so callers see exactly what the service would send
+        return json.loads(json.dumps(payload, default=str))
+
+
+class RecommendationHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP/1.1: every response carries Content-Length, so clients keep the connection open."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; with Nagle on, each keep-alive response waits ~40 ms for an ACK
+    disable_nagle_algorithm = True
+    server_version = "MusicRecommender/1.0"
+
+    def _handle(self, method: str):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if method == "POST":
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY:
+                self.close_connection = True
+                return self._send(413, {"error": "request body too large"}, start)
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    return self._send(400, {"error": "body is not valid JSON"}, start)
+                if not isinstance(body, dict):
+                    return self._send(400, {"error": "body must be a JSON object"}, start)
+                params.update(body)
+        code, payload = dispatch(self.server.engine, method, url.path, params)
+        self._send(code, payload, start)
+
+    def _send(self, code: int, payload, start: float):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Response-Time-Ms", f"{(time.perf_counter() - start) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RecommendationServer(ThreadingHTTPServer):
+    """One thread per connection, all sharing the process's engine (models load once)."""
+
+    daemon_threads = True
+
+    def __init__(self, address, engine: RecommendationEngine, verbose: bool = False):
+        super().__init__(address, RecommendationHandler)
+        self.engine = engine
+        self.verbose = verbose
+
+
+def serve(host: str = HOST, port: int = PORT, engine: RecommendationEngine = None, verbose: bool = False):
+    engine = (engine or RecommendationEngine()).start()
+    server = RecommendationServer((host, port), engine, verbose)
+    print(f"Serving recommendations on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        engine.close()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Recommendation engine as an HTTP/JSON service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+    serve(args.host, args.port, verbose=args.verbose)
@@ -0,0 +1,48 @@
+import os
+import numpy as np
+from scipy.sparse import csr_matrix
+from src.artifacts import write_bundle, publish_version, current_version, list_versions, ArtifactBundle
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+
+IDS = [f"v{i}" for i in range(200)]
+TEXT = [f"song {i % 17} artist{i % 11} genre{i % 5}" for i in range(200)]
+
+def _models(seed=0):
+    rng = np.random.default_rng(seed)
+    content = ContentModel.from_catalog(IDS, TEXT, dim=8, index_type="hnsw")
+    user_items = csr_matrix((np.ones(60, dtype="float32"), (rng.integers(0, 20, 60), rng.integers(0, 200, 60))), shape=(20, 200))
+    user_items.sum_duplicates()
+    collab = CollabModel(rng.normal(size=(20, 4)), rng.normal(size=(200, 4)), [f"u{i}" for i in range(20)], IDS, user_items)
+    return content, collab
+
+def test_bundle_round_trip_is_memory_mapped(tmp_path):
+    content, collab = _models()
+    root = str(tmp_path / "artifacts")
+    version = write_bundle(root, content, collab, meta={"catalog_version": "abc"})
+    bundle = ArtifactBundle.open(root)
+    assert bundle.version == version == current_version(root) and bundle.manifest["meta"]["catalog_version"] == "abc"
+    assert bundle.verify()
+    content2, collab2 = bundle.load_content(), bundle.load_collab()
+    assert isinstance(collab2.item_factors.base, np.memmap) and not hasattr(content2.tfidf, "stop_words_")
+    q = content.query_vector(IDS[:3])
+    assert np.array_equal(content.search(q[None], 10)[1], content2.search(q[None], 10)[1])
+    assert np.allclose(collab.recommend(IDS[:4])[1], collab2.recommend(IDS[:4])[1])
+    assert np.array_equal(collab.recommend_all(5)[1], collab2.recommend_all(5)[1])
+    # a mapped index is read-only: add() switches to an in-memory copy, even once the bundle is pruned
+    os.remove(os.path.join(bundle.path, "content.faiss"))
+    assert content2.add(["new"], ["brand new song"]) == 1 and content2.positions(["new"])[0] == 200
+
+def test_versions_publish_and_prune(tmp_path):
+    content, collab = _models()
+    root = str(tmp_path / "artifacts")
+    first = write_bundle(root, collab=collab)
+    second = write_bundle(root, content, publish=False)
+    assert current_version(root) == first and ArtifactBundle.open(root).load_content() is None
+    publish_version(root, second)
+    assert ArtifactBundle.open(root).load_collab() is None and ArtifactBundle.open(root, first) is not None
+    for _ in range(3):
+        write_bundle(root, collab=collab, keep=2)
+    assert len(list_versions(root)) == 2 and current_version(root) == list_versions(root)[-1]
+    assert not [f for f in os.listdir(root) if f.endswith(".tmp")]
+    assert ArtifactBundle.open(str(tmp_path / "missing")) is None
@@ -0,0 +1,67 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from src.artifacts import write_bundle
+from src.batch_recommend import run, iter_users, indexed_path, PrecomputedRecommendations
+from src.catalog_store import CatalogStore
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.history_store import HistoryStore
+
+IDS = [f"v{i}" for i in range(120)]
+
+def _artifacts(tmp_path):
+    rng = np.random.default_rng(0)
+    CatalogStore(str(tmp_path / "catalog")).write(pd.DataFrame({
+        "video_id": IDS, "title": IDS, "text": [f"song {i} artist{i % 7} genre{i % 3}" for i in range(120)],
+        "viewCount_norm": rng.random(120)}))
+    content = ContentModel.from_catalog(IDS, [f"song {i} artist{i % 7} genre{i % 3}" for i in range(120)], dim=8)
+    joblib.dump(content.to_dict(), tmp_path / "content.pkl")
+    users = [f"user_{i}" for i in range(25)]
+    joblib.dump(CollabModel(rng.normal(size=(25, 4)), rng.normal(size=(120, 4)), users, IDS).to_dict(), tmp_path / "als.pkl")
+    pd.DataFrame({"user_id": np.repeat(users, 4), "track_id": rng.choice(IDS, 100), "rating": 1}).to_pickle(tmp_path / "inter.pkl")
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.add("me", "v1")
+    store.add("user_3", "v2")
+    return dict(catalog=str(tmp_path / "catalog"), interactions=str(tmp_path / "inter.pkl"),
+                history_db=str(tmp_path / "history.db"), history_dir=None, artifacts=str(tmp_path / "artifacts"),
+                content_model=str(tmp_path / "content.pkl"), collab_model=str(tmp_path / "als.pkl"))
+
+def test_iter_users_merges_sources(tmp_path):
+    paths = _artifacts(tmp_path)
+    users = dict(iter_users(paths["interactions"], paths["history_db"]))
+    assert len(users) == 26 and users["me"] == ["v1"] and users["user_3"][-1] == "v2"
+
+def test_run_streams_grouped_rows_and_app_reads_them(tmp_path):
+    paths = _artifacts(tmp_path)
+    out = str(tmp_path / "recs.csv")
+    stats = run(out, top_n=5, chunk_size=7, **paths)
+    df = pd.read_csv(out)
+    assert stats == dict(stats, users=26, rows=130) and list(df.columns) == ["user_id", "rank", "video_id", "score", "model"]
+    assert (df.groupby("user_id", sort=False)["rank"].agg(tuple) == (1, 2, 3, 4, 5)).all()
+    recs = PrecomputedRecommendations.load(out)
+    assert len(recs) == 26 and "v1" not in recs.get("me") and len(recs.get("me")) == 5
+    assert recs.get("nobody") == [] and recs.get("me", "als") == []
+    assert PrecomputedRecommendations.load(str(tmp_path / "missing.csv")) is None
+    (tmp_path / "old.csv").write_text("track_id\n")
+    assert PrecomputedRecommendations.load(str(tmp_path / "old.csv")) is None
+
+def test_run_from_bundle_matches_pickles(tmp_path):
+    paths = _artifacts(tmp_path)
+    run(str(tmp_path / "pkl.csv"), top_n=5, **paths)
+    write_bundle(paths["artifacts"], ContentModel.load(paths["content_model"]), CollabModel.load(paths["collab_model"]))
+    run(str(tmp_path / "bundle.csv"), top_n=5, **dict(paths, content_model=None, collab_model=None))
+    assert (tmp_path / "pkl.csv").read_text() == (tmp_path / "bundle.csv").read_text()
+
+def test_indexed_output_matches_csv_and_replaces_old_runs(tmp_path):
+    paths = _artifacts(tmp_path)
+    out = str(tmp_path / "recs.csv")
+    for _ in range(3):
+        run(out, top_n=5, chunk_size=7, **paths)
+    mapped, parsed = PrecomputedRecommendations.load(out), PrecomputedRecommendations.from_csv(out)
+    assert isinstance(mapped.video_ids, pa.ChunkedArray) and len(mapped) == len(parsed) == 26
+    for user in ["me", "user_3", "user_24", "nobody"]:
+        assert mapped.get(user) == parsed.get(user)
+    assert len(list(tmp_path.glob("recs.rows-*.arrow"))) == 2  # the live run and the one it replaced
+    assert PrecomputedRecommendations.load(indexed_path(out)).get("me") == mapped.get("me")
@@ -0,0 +1,70 @@
+import pandas as pd
+from src.catalog_store import CatalogStore, CatalogIngestor, CatalogIndex, DISPLAY_COLUMNS
+
+def test_append_project_and_export(tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog"))
+    assert not store.exists() and store.version() is None
+    store.write(pd.DataFrame({"video_id": ["a", "b"], "title": ["One", "Two"], "channel": ["x", "y"], "viewCount": [1, 2]}))
+    v1 = store.version()
+    store.append([{"video_id": "c", "title": "Three", "channel": "z", "viewCount": 3.5}])
+    assert store.version() != v1 and len(store.parts()) == 2
+
+    df = store.load()
+    assert df["video_id"].tolist() == ["a", "b", "c"]
+    assert df["text"].str.contains("Three").iloc[2]
+    assert store.load(DISPLAY_COLUMNS).columns.tolist() == DISPLAY_COLUMNS
+
+    csv_path = tmp_path / "export.csv"
+    store.export_csv(str(csv_path))
+    assert pd.read_csv(csv_path)["video_id"].tolist() == ["a", "b", "c"]
+
+def test_write_replaces_segments(tmp_path):
+    store = CatalogStore(str(tmp_path))
+    store.write(pd.DataFrame({"video_id": ["a"]}))
+    store.append([{"video_id": "b"}])
+    store.write(pd.DataFrame({"video_id": ["z"]}))
+    assert len(store.parts()) == 1
+    assert store.load()["video_id"].tolist() == ["z"]
+
+def test_ingestor_batches_and_merges(tmp_path):
+    store = CatalogStore(str(tmp_path))
+    store.write(pd.DataFrame({"video_id": ["a"], "title": ["A"]}))
+    ingestor = CatalogIngestor(store, batch_size=2, max_delay=None, merge_after=2)
+    assert ingestor.submit({"video_id": "b", "title": "B"})
+    assert not ingestor.submit({"video_id": "b", "title": "B"})
+    assert ingestor.contains("b") and len(store.parts()) == 1  # buffered, nothing written yet
+    ingestor.submit({"video_id": "c", "title": "C"})
+    assert not ingestor.pending() and len(store.parts()) == 2
+    ingestor.submit({"video_id": "d", "title": "D"})
+    ingestor.flush()
+    assert len(store.parts()) == 1  # merged once there were more than merge_after segments
+    assert store.load()["video_id"].tolist() == ["a", "b", "c", "d"]
+
+def test_catalog_index_lookups():
+    df = pd.DataFrame({"video_id": ["a", "b", 7, "a"], "title": ["A", "B", "Seven", "dup"]})
+    index = CatalogIndex(df["video_id"])
+    assert "b" in index and 7 in index and "zz" not in index and len(index) == 3
+    assert index.positions(["a", "zz", "7"]).tolist() == [0, -1, 2]
+    assert index.positions([]).tolist() == []
+    assert index.rows(df, ["zz", "b", "a"], ["title"]) == [None, {"title": "B"}, {"title": "A"}]
+
+def test_empty_catalog_index_misses():
+    index = CatalogIndex([])
+    assert len(index) == 0 and "a" not in index
+    assert index.positions(["a", "b"]).tolist() == [-1, -1]
+    assert index.rows(pd.DataFrame({"video_id": []}), ["a"]) == [None]
+
+def test_compaction_swaps_segments_atomically(tmp_path):
+    store = CatalogStore(str(tmp_path / "catalog"))
+    for i in range(3):
+        store.append([{"video_id": f"v{i}", "title": str(i)}])
+    write_table = store._write_table
+    seen = []
+    def write_then_read(table, name):
+        path = write_table(table, name)
+        seen.append(len(store.load(["video_id"])))  # a reader between the merged write and the swap
+        return path
+    store._write_table = write_then_read
+    store.compact()
+    assert seen == [3] and len(store.parts()) == 1 and len(store._files()) == 1
+    assert store.load()["video_id"].tolist() == ["v0", "v1", "v2"]
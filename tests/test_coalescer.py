@@ -0,0 +1,29 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.coalescer import Coalescer
+
+def test_concurrent_calls_share_a_batch_and_get_their_own_result():
+    sizes = []
+    def run(items):
+        sizes.append(len(items))
+        return [x * 10 for x in items]
+    co = Coalescer(run, window=0.2, max_batch=8)
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(co, range(8))) == [x * 10 for x in range(8)]
+    assert sizes == [8]  # a full batch runs without waiting out the window
+    assert co.stats() == {"calls": 8, "batches": 1, "max_batch": 8, "mean_batch": 8.0}
+    assert Coalescer(run, window=0)(3) == 30 and sizes[-1] == 1
+
+def test_batch_error_reaches_every_caller():
+    barrier = threading.Barrier(3)
+    def run(items):
+        raise ValueError("index closed")
+    co = Coalescer(run, window=0.2, max_batch=3)
+    def call(x):
+        barrier.wait()
+        with pytest.raises(ValueError, match="index closed"):
+            co(x)
+        return True
+    with ThreadPoolExecutor(3) as pool:
+        assert all(pool.map(call, range(3)))
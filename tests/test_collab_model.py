@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import joblib
+import numpy as np
+from src.collab_model import CollabModel, interaction_matrix
+
+def _model(alpha=1.0):
+    rng = np.random.default_rng(0)
+    users, items = 30, 40
+    user_items = interaction_matrix(rng.integers(0, users, 200), rng.integers(0, items, 200), np.ones(200), (users, items))
+    return CollabModel(rng.normal(size=(users, 8)), rng.normal(size=(items, 8)),
+                       [f"u{i}" for i in range(users)], [f"v{i}" for i in range(items)], user_items, 0.1, alpha)
+
+def test_fold_in_solves_als_user_update():
+    for alpha in (1.0, 4.0):
+        model = _model(alpha)
+        hist = np.array([1, 5, 9])
+        Y = model.item_factors.astype("float64")
+        A = Y.T @ Y + 0.1 * np.eye(8) + (alpha - 1) * Y[hist].T @ Y[hist]
+        expected = np.linalg.solve(A, alpha * Y[hist].sum(axis=0))
+        assert np.allclose(model.fold_in([hist, [2]])[0], expected, atol=1e-4)
+
+def test_recommend_excludes_history_and_unknown_ids():
+    model = _model()
+    ids, scores = model.recommend(["v1", "v5", "not-trained"], k=5)
+    assert len(ids) == 5 and not {"v1", "v5"} & set(ids)
+    assert list(scores) == sorted(scores, reverse=True)
+    assert model.recommend(["not-trained"])[0] == []
+
+def test_recommend_all_matches_per_user_scoring():
+    model = _model()
+    users, pos, scores = model.recommend_all(k=3, batch_size=7)
+    assert len(users) == 30 and pos.shape == (30, 3)
+    full = model.user_factors[4] @ model.item_factors.T
+    full[model.user_items[4].indices] = -np.inf
+    assert list(pos[4]) == list(np.argsort(-full)[:3])
+
+def test_batched_recommend_matches_direct():
+    model = _model()
+    users = model.user_factors[:12]
+    hists = [[i, i + 1] for i in range(12)]
+    direct = [model.recommend_batch(users[i:i + 1], 5 + i % 3, exclude=[hists[i]]) for i in range(12)]
+    model.enable_batching(window=0.05, max_batch=12)
+    with ThreadPoolExecutor(12) as pool:
+        batched = list(pool.map(lambda i: model.recommend_batch(users[i:i + 1], 5 + i % 3, exclude=[hists[i]]), range(12)))
+    assert model.batcher.stats()["max_batch"] > 1
+    for (p1, s1), (p2, s2) in zip(direct, batched):
+        assert p1.shape == p2.shape and (p1 == p2).all() and np.allclose(s1, s2)
+
+def test_load_legacy_tuple_pickle_with_transposed_factors(tmp_path):
+    rng = np.random.default_rng(1)
+    # the old trainer fit items x users, so implicit's "user" factors were per item
+    als = SimpleNamespace(user_factors=rng.normal(size=(40, 8)).astype("float32"),
+                          item_factors=rng.normal(size=(30, 8)).astype("float32"), regularization=0.1)
+    path = str(tmp_path / "collab_als.pkl")
+    joblib.dump((als, {i: f"v{i}" for i in range(40)}, {i: f"u{i}" for i in range(30)}), path)
+    model = CollabModel.load(path)
+    assert model.item_factors.shape == (40, 8) and model.user_factors.shape == (30, 8)
+    assert np.allclose(model.item_factors, als.user_factors)
+    ids, _ = model.recommend(["v7"], k=5)
+    assert len(ids) == 5 and "v7" not in ids
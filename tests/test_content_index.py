@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from src.content_index import fit_projection, embed, build_index, ContentModel
+
+TEXT = [f"song {i} artist{i % 7} genre{i % 3} mood{i % 5}" for i in range(200)]
+
+def test_embed_is_compact_and_normalised():
+    X = TfidfVectorizer().fit_transform(TEXT)
+    projector = fit_projection(X, dim=16)
+    emb = embed(projector, X, chunk_size=64)
+    assert emb.shape == (len(TEXT), 16)
+    assert emb.dtype == np.float32
+    assert np.allclose(np.linalg.norm(emb, axis=1), 1.0, atol=1e-4)
+
+def test_dim_is_clamped_for_small_vocabularies():
+    X = TfidfVectorizer().fit_transform(TEXT[:5])
+    assert embed(fit_projection(X, dim=256), X).shape[1] < X.shape[1]
+
+def test_flat_index_finds_self():
+    X = TfidfVectorizer().fit_transform(TEXT)
+    emb = embed(fit_projection(X, dim=32), X)
+    index = build_index(emb)
+    _, I = index.search(emb[:10], 1)
+    sims = emb[:10] @ emb[I[:, 0]].T
+    assert np.allclose(np.diag(sims), 1.0, atol=1e-4)
+
+def test_approximate_index_types_search():
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((2000, 32)).astype("float32")
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    for index_type in ("ivf_flat", "ivf_pq", "hnsw"):
+        index = build_index(emb, index_type, nlist=16, train_size=1000, nprobe=16, ef_search=64)
+        D, I = index.search(emb[:5], 3)
+        assert I.shape == (5, 3) and (I >= 0).all()
+        assert np.allclose(index.reconstruct(7), emb[7], atol=0.5)
+
+def test_content_model_recommend_excludes_history():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16)
+    recs, scores = model.recommend(["v0", "v7"], k=5)
+    assert len(recs) == 5 and not {"v0", "v7"} & set(recs)
+    assert all(isinstance(v, str) for v in recs)
+    assert list(scores) == sorted(scores, reverse=True)
+    # ids that are not indexed yet are embedded from their text
+    vecs = model.vectors(["v1", "new"], texts=[TEXT[1], TEXT[1]])
+    assert np.allclose(vecs[0], vecs[1], atol=1e-3)
+
+def test_content_model_add_is_incremental():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16)
+    n = len(model)
+    assert model.add(["new", "v3"], ["song 3 artist3 genre0 mood3", TEXT[3]]) == 1
+    assert len(model) == n + 1 and model.positions(["new"])[0] == n
+    recs, _ = model.recommend(["new"], k=3)
+    assert "v3" in recs
+    assert list(model.to_dict()["content_ids"][-1:]) == ["new"]
+
+def test_drift_triggers_refit():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16)
+    assert not model.needs_refit()
+    model.add(["n1"], ["zebra quokka axolotl narwhal"])
+    assert model.drift()["oov_drift"] > 0.5
+    assert model.needs_refit(max_oov_drift=0.2, max_growth=1.0)
+    assert not model.needs_refit(max_oov_drift=1.0, max_growth=1.0)
+    model.refit(ids + ["n1"], TEXT + ["zebra quokka axolotl narwhal"])
+    assert model.drift()["added"] == 0 and "zebra" in model.tfidf.vocabulary_
+    assert model.positions(["n1"])[0] >= 0 and not model.needs_refit()
+
+def test_state_snapshot_survives_refit_and_add():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16)
+    state = model.snapshot()
+    model.refit(ids[:50], TEXT[:50])  # smaller index: old positions would not map through the new ids
+    model.add(["late"], [TEXT[150]])
+    query = model.query_vector(["v150"], state=state)
+    _, pos = model.search(query[None], 10, state)
+    assert (pos < state.ntotal).all() and model.ids_at(pos[0], state)[0] == "v150"
+    assert len(model) == 51 and model.positions(["v150"])[0] < 0
+
+def test_refit_carries_over_videos_added_meanwhile():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16)
+    model.add(["n1"], ["zebra quokka"])
+    model.refit(ids, TEXT)
+    assert model.positions(["n1"])[0] >= 0 and model.drift()["added"] == 1
+
+def test_refit_keeps_projection_method():
+    ids = [f"v{i}" for i in range(len(TEXT))]
+    model = ContentModel.from_catalog(ids, TEXT, dim=16, projection="random")
+    assert model.projection == "random"
+    model.refit(ids, TEXT)
+    assert model.projection == "random" and model.dim == 16
+    assert ContentModel.from_catalog(ids, TEXT, dim=16).projection == "svd"
+
+def test_batched_search_matches_direct():
+    model = ContentModel.from_catalog([f"v{i}" for i in range(len(TEXT))], TEXT, dim=16)
+    queries = model.vectors([f"v{i}" for i in range(16)])
+    direct = [model.search(queries[i:i + 1], 4 + i % 4) for i in range(16)]
+    model.enable_batching(window=0.05, max_batch=16)
+    with ThreadPoolExecutor(16) as pool:
+        batched = list(pool.map(lambda i: model.search(queries[i:i + 1], 4 + i % 4), range(16)))
+    assert model.batcher.stats()["max_batch"] > 1
+    for (d1, p1), (d2, p2) in zip(direct, batched):
+        assert p1.shape == p2.shape and (p1 == p2).all() and np.allclose(d1, d2)
+
+def test_concurrent_adds_of_one_video_index_it_once():
+    model = ContentModel.from_catalog([f"v{i}" for i in range(len(TEXT))], TEXT, dim=16)
+    with ThreadPoolExecutor(8) as pool:
+        added = list(pool.map(lambda _: model.add(["new", "new"], ["zebra quokka", "zebra quokka"]), range(8)))
+    assert sum(added) == 1 and len(model) == len(TEXT) + 1
@@ -0,0 +1,95 @@
+import threading
+import httplib2
+from googleapiclient.errors import HttpError
+import numpy as np
+import pandas as pd
+import joblib
+from scipy.sparse import csr_matrix
+from src.data_loader import fetch_youtube_videos, execute_with_backoff, iter_interactions, generate_interactions, write_interactions
+from src.data_loader import save_content_matrix, load_content_matrix
+
+class FakeRequest:
+    def __init__(self, client, response):
+        self.client, self.response = client, response
+
+    def execute(self):
+        with self.client.lock:
+            self.client.calls += 1
+            if self.client.fail_next:
+                self.client.fail_next -= 1
+                raise HttpError(httplib2.Response({"status": 429}), b"rateLimitExceeded")
+        return self.response
+
+class FakeYouTube:
+    """Local stand-in for googleapiclient's youtube resource."""
+    def __init__(self, per_artist=50, fail_next=0):
+        self.per_artist, self.fail_next, self.calls, self.lock = per_artist, fail_next, 0, threading.Lock()
+        self.stats_ids = []
+
+    def search(self):
+        return self
+
+    def videos(self):
+        return self
+
+    def list(self, part, **params):
+        if part == "snippet":
+            a = params["q"].split()[0]
+            items = [{"id": {"videoId": f"{a}{i}"}, "snippet": {"title": f"{a} song {i}"}} for i in range(self.per_artist)]
+            return FakeRequest(self, {"items": items})
+        ids = params["id"].split(",")
+        self.stats_ids.append(len(ids))
+        return FakeRequest(self, {"items": [{"id": v, "statistics": {"viewCount": str(len(v))}} for v in ids]})
+
+def test_fetch_batches_statistics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yt = FakeYouTube(per_artist=50)
+    df = fetch_youtube_videos(["a", "b", "c"], youtube=yt, max_workers=3)
+    assert len(df) == 150
+    assert yt.calls == 6  # one search + one statistics call per artist, not 1 + 50
+    assert yt.stats_ids == [50, 50, 50]
+    assert df.loc[df.video_id == "a12", "views"].item() == 3
+    assert df["artist"].tolist()[:1] == ["a"]
+
+def test_backoff_retries_rate_limits():
+    yt = FakeYouTube(fail_next=2)
+    sleeps = []
+    res = execute_with_backoff(yt.videos().list(part="statistics", id="x"), sleep=sleeps.append)
+    assert res["items"][0]["id"] == "x"
+    assert len(sleeps) == 2 and sleeps[1] > sleeps[0] / 2
+
+def test_generate_interactions_distinct_and_seeded():
+    videos = [f"v{i}" for i in range(300)]
+    df = generate_interactions(videos, 200, skew=1.2, seed=7)
+    sizes = df.groupby("user_id", observed=True).size()
+    assert len(sizes) == 200 and sizes.between(10, 29).all()
+    assert not df.duplicated(["user_id", "video_id"]).any()
+    assert df["rating"].between(1, 5).all()
+    assert df.equals(generate_interactions(videos, 200, skew=1.2, seed=7))
+    # with view counts as popularity, the most viewed video is the most sampled
+    views = np.arange(300)
+    top = generate_interactions(videos, 500, skew=1.2, popularity=views)["video_id"].value_counts().index[0]
+    assert top == "v299"
+
+def test_iter_interactions_chunks_and_parquet(tmp_path):
+    chunks = list(iter_interactions(50, 25, items_per_user=(5, 40), distribution="lognormal", chunk_users=10))
+    assert [len(np.unique(c["user"])) for c in chunks] == [10, 10, 5]
+    assert chunks[2]["user"].min() == 20 and chunks[0]["item"].dtype == np.int32
+    path = str(tmp_path / "interactions.parquet")
+    rows = write_interactions(path, [f"v{i}" for i in range(50)], 25, chunk_users=10)
+    df = pd.read_parquet(path)
+    assert len(df) == rows and df["user_id"].nunique() == 25
+    assert set(df["user_id"].astype(str)) == {f"user_{u}" for u in range(25)}
+
+def test_content_matrix_round_trip_and_legacy_pickle(tmp_path):
+    dense = np.zeros((4, 6), dtype="float32")
+    dense[0, 1], dense[3, 5] = 0.5, 1.0
+    path = str(tmp_path / "content_matrix.npz")
+    save_content_matrix(path, csr_matrix(dense))
+    loaded = load_content_matrix(path)
+    assert isinstance(loaded, csr_matrix) and loaded.dtype == np.float32 and loaded.nnz == 2
+    assert np.array_equal(loaded.toarray(), dense)
+    legacy = tmp_path / "old"
+    legacy.mkdir()
+    joblib.dump(dense, str(legacy / "content_matrix.pkl"))
+    assert np.array_equal(load_content_matrix(str(legacy / "content_matrix.npz")).toarray(), dense)
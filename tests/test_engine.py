@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from src.artifacts import write_bundle
+from src.catalog_store import CatalogStore
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.engine import RecommendationEngine
+
+IDS = [f"v{i}" for i in range(120)]
+TEXT = [f"song {i} artist{i % 7} genre{i % 3}" for i in range(120)]
+
+def make_engine(tmp_path, **kwargs):
+    rng = np.random.default_rng(0)
+    CatalogStore(str(tmp_path / "catalog")).write(pd.DataFrame({
+        "video_id": IDS, "title": [f"Song {i}" for i in range(120)], "channel": [f"artist{i % 7}" for i in range(120)],
+        "text": TEXT, "viewCount_norm": rng.random(120)}))
+    users = [f"user_{i}" for i in range(25)]
+    write_bundle(str(tmp_path / "artifacts"), ContentModel.from_catalog(IDS, TEXT, dim=8),
+                 CollabModel(rng.normal(size=(25, 4)), rng.normal(size=(120, 4)), users, IDS))
+    return RecommendationEngine(catalog_dir=str(tmp_path / "catalog"), artifact_dir=str(tmp_path / "artifacts"),
+                                history_db=str(tmp_path / "history.db"), history_dir=None,
+                                youtube_cache_dir=str(tmp_path / "yt"), recommendations_csv=str(tmp_path / "recs.csv"),
+                                content_model_path=None, collab_model_path=None, legacy_csv=None,
+                                youtube_api_key="", **kwargs)
+
+def ids(items):
+    return [it["id"]["videoId"] for it in items]
+
+def test_engine_recommends_without_streamlit(tmp_path):
+    engine = make_engine(tmp_path).start()
+    for v in ("v1", "v8", "v15"):
+        assert engine.save("me", v) == (True, None)
+    for model in ("Hybrid", "Content-Based", "Collaborative"):
+        items, timings = engine.recommend_for_user("me", 10, model)
+        assert len(items) == 10 and not {"v1", "v8", "v15"} & set(ids(items))
+        assert (timings is not None) == (model == "Hybrid")
+    items, timings = engine.recommend_for_artist("artist3", "Content-Based")
+    assert len(items) == 10 and timings["total"] >= 0
+    assert len(engine.get_any_10()) == 10
+    assert all(engine.snapshot().df.set_index("video_id").loc[v, "channel"] == "artist3"
+               for v in ids(engine.get_exactly_10("artist3")))
+    assert [h["title"] for h in engine.recent_history("me", 2)] == ["Song 15", "Song 8"]
+    status = engine.status()
+    assert status["videos"] == 120 and status["collab"] and status["swaps"] == 1
+    engine.close()
+
+def test_engine_picks_up_new_bundle(tmp_path):
+    engine = make_engine(tmp_path, refresh_seconds=60).start()
+    old = engine.status()["bundle_version"]
+    new = write_bundle(str(tmp_path / "artifacts"), ContentModel.from_catalog(IDS, TEXT, dim=4))
+    engine.registry.check(wait=True)
+    snap = engine.snapshot()
+    assert new != old and snap.bundle_version == new and snap.content.dim == 4 and snap.collab is None
+    assert snap.df is not None and len(engine.recommend_for_user("me", 5)[0]) == 5
+    engine.close()
+
+def test_engine_serves_precomputed_batch_output(tmp_path):
+    engine = make_engine(tmp_path, refresh_seconds=60).start()
+    assert engine.precomputed_recommendations() is None  # no batch run yet
+    pd.DataFrame({"user_id": "me", "rank": [1, 2], "video_id": ["v40", "v41"], "score": 1.0,
+                  "model": "hybrid"}).to_csv(tmp_path / "recs.csv", index=False)  # an older, CSV-only run
+    engine.precomputed.check(wait=True)
+    items, timings = engine.recommend_for_user("me", 5)
+    assert ids(items)[:2] == ["v40", "v41"] and timings is None
+    engine.close()
+
+def test_videos_added_during_a_rebuild_survive_the_swap(tmp_path):
+    engine = make_engine(tmp_path, refresh_seconds=60).start()
+    old = engine.snapshot().content
+    build = engine.build_snapshot
+
+    def build_then_save(version, previous):
+        state = build(version, previous)
+        old.add(["late"], ["a video saved while the new model was built"])  # after the carry-over in build
+        return state
+    engine.registry.build = build_then_save
+    write_bundle(str(tmp_path / "artifacts"), ContentModel.from_catalog(IDS, TEXT, dim=8))
+    engine.registry.check(wait=True)
+    content = engine.snapshot().content
+    assert content is not old and content.positions(["late"])[0] >= 0
+    engine.close()
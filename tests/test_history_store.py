@@ -0,0 +1,42 @@
+import json
+import threading
+import pytest
+from src.history_store import HistoryStore
+
+def test_add_dedupes_and_reads_recent(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    assert store.add("u", "a") and store.add("u", "b") and store.add("u", "c")
+    assert not store.add("u", "a")
+    assert store.all("u") == ["a", "b", "c"]
+    assert store.recent("u", 2) == ["c", "b"]
+    assert store.count("u") == 3 and store.contains("u", "b") and not store.contains("v", "b")
+
+def test_imports_legacy_json(tmp_path):
+    (tmp_path / "me.json").write_text(json.dumps(["x", "y"]))
+    store = HistoryStore(str(tmp_path / "history.db"), legacy_dir=str(tmp_path))
+    assert store.users() == ["me"]
+    store.add("me", "z")
+    assert store.all("me") == ["x", "y", "z"]
+    again = HistoryStore(str(tmp_path / "history.db"), legacy_dir=str(tmp_path))
+    assert again.all("me") == ["x", "y", "z"]  # imported once
+
+def test_failed_import_is_retried(tmp_path):
+    (tmp_path / "me.json").mkdir()  # unreadable for now
+    store = HistoryStore(str(tmp_path / "history.db"), legacy_dir=str(tmp_path))
+    with pytest.raises(OSError):
+        store.add("me", "z")
+    (tmp_path / "me.json").rmdir()
+    (tmp_path / "me.json").write_text(json.dumps(["x", "y"]))
+    store.add("me", "z")
+    assert store.all("me") == ["x", "y", "z"]
+
+def test_concurrent_writers(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    def writer(t):
+        for i in range(50):
+            store.add(f"user{i % 5}", f"v{t}-{i}")
+            store.add(f"user{i % 5}", f"shared{i}")
+    threads = [threading.Thread(target=writer, args=(t,)) for t in range(4)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    assert sum(store.count(f"user{u}") for u in range(5)) == 4 * 50 + 50
@@ -0,0 +1,72 @@
+import time
+import threading
+import numpy as np
+from src.catalog_store import CatalogIndex
+from src.collab_model import CollabModel
+from src.content_index import ContentModel
+from src.hybrid import HybridRanker, parse_weights, minmax, format_timings
+
+IDS = [f"v{i}" for i in range(200)]
+TEXT = [f"song {i} artist{i % 7} genre{i % 3} mood{i % 5}" for i in range(200)]
+
+def _ranker(**kwargs):
+    rng = np.random.default_rng(0)
+    content = ContentModel.from_catalog(IDS, TEXT, dim=16)
+    collab = CollabModel(rng.normal(size=(5, 8)), rng.normal(size=(150, 8)), list("abcde"), IDS[:150])
+    popularity = rng.random(200)
+    return HybridRanker(CatalogIndex(IDS), popularity, np.argsort(-popularity), content, collab, **kwargs)
+
+def test_blend_excludes_history_and_reports_stages():
+    ranker = _ranker()
+    pos, scores, timings = ranker.rank(["v0", "v7"], k=10, exclude=[0, 7])
+    assert len(pos) == 10 and not {0, 7} & set(pos.tolist())
+    assert list(scores) == sorted(scores, reverse=True)
+    assert {"content", "als", "popularity", "score", "blend", "total"} <= set(timings)
+
+def test_weights_select_sources():
+    ranker = _ranker()
+    pos, _, timings = ranker.rank(["v0"], k=5, weights={"content": 0, "als": 0, "popularity": 1})
+    assert list(pos) == list(ranker.order[:5]) and "content" not in timings
+    pos, _, _ = ranker.rank(["v0"], k=3, weights={"content": 1, "als": 0, "popularity": 0})
+    assert 0 in pos  # the seed itself is the closest item when it isn't excluded
+
+def test_stage_over_budget_is_dropped():
+    ranker = _ranker(budgets={"content": 0.05, "als": 0.05})
+    slow = ranker.content.query_vector
+    ranker.content.query_vector = lambda *a: (time.sleep(0.3), slow(*a))[1]
+    pos, _, timings = ranker.rank(["v0"], k=5)
+    assert timings["content"] is None and timings["als"] is not None and len(pos) == 5
+    assert ranker.stats.stats()["timeouts"] == {"content": 1} and ranker.stats.stats()["degraded"] == 1
+
+def test_failed_stage_is_reported_as_error():
+    ranker = _ranker()
+    ranker.collab.user_vector = lambda *a: 1 / 0
+    pos, _, timings = ranker.rank(["v0"], k=5)
+    assert timings["als"] is None and "ZeroDivisionError" in timings["errors"]["als"] and len(pos) == 5
+    assert "als failed (ZeroDivisionError" in format_timings(timings) and "content over budget" not in format_timings(timings)
+    assert ranker.stats.stats()["errors"] == {"als": 1} and ranker.stats.stats()["timeouts"] == {}
+
+def test_saturated_pool_runs_stages_inline():
+    ranker = _ranker(slots=threading.BoundedSemaphore(1), budgets={"content": 0.05, "als": 0.05})
+    gate = threading.Event()
+    slow = ranker.content.query_vector
+    ranker.content.query_vector = lambda *a: (gate.wait(), slow(*a))[1]
+    try:
+        _, _, timings = ranker.rank(["v0"], k=5)  # content holds the only slot past its budget
+        assert timings["content"] is None and timings["als"] is not None
+        _, _, timings = ranker.rank(["v1"], k=5, weights={"content": 0})
+        assert timings["als"] is not None and ranker.stats.stats()["inline"] == 2  # not queued behind it
+    finally:
+        gate.set()
+
+def test_helpers():
+    assert parse_weights("content=1, als=0,bogus=3")["als"] == 0
+    assert list(minmax(np.array([2.0, np.nan, 4.0]))) == [0.0, 0.0, 1.0]
+
+def test_rank_batch_matches_rank():
+    ranker = _ranker()
+    histories = [["v0", "v7"], ["v3"], ["not-in-catalog"]]
+    batch = ranker.rank_batch(histories, k=5)
+    for history, (pos, scores) in zip(histories, batch):
+        expected, expected_scores, _ = ranker.rank(history, 5, exclude=ranker.catalog_index.positions(history))
+        assert list(pos) == list(expected) and np.allclose(scores, expected_scores)
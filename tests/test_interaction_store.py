@@ -0,0 +1,96 @@
+import os
+import numpy as np
+import pandas as pd
+from src.batch_recommend import iter_users
+from src.collab_model import interaction_matrix
+from src.data_loader import iter_interactions
+from src.interaction_store import InteractionStore
+from src.models import ALSModel
+
+def frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"user_id": [f"u{i}" for i in rng.integers(0, 40, n)],
+                         "video_id": [f"v{i}" for i in rng.integers(0, 90, n)],
+                         "rating": rng.integers(1, 6, n)})
+
+def test_streamed_csr_matches_in_memory_build(tmp_path):
+    df = frame()
+    store = InteractionStore(str(tmp_path / "inter"))
+    assert store.write(df, chunk_rows=64) == len(df)
+    assert len(store.parts()) == 8 and len(store) == len(df)
+    users, items = store.user_ids(), store.item_ids()
+    u, i = pd.Index(users).get_indexer(df["user_id"]), pd.Index(items).get_indexer(df["video_id"])
+    expected = interaction_matrix(u, i, df["rating"], (len(users), len(items)))
+    got = store.csr()
+    assert got.shape == expected.shape and (got != expected).nnz == 0
+    assert got.has_sorted_indices and got.indices.dtype == np.int32
+    # codes are int32, ratings int8, and the frame round-trips
+    chunk = next(store.iter_chunks())
+    assert chunk["user"].dtype == np.int32 and chunk["rating"].dtype == np.int8
+    back = store.load()
+    assert back["user_id"].astype(str).tolist() == df["user_id"].tolist()
+    assert back["video_id"].astype(str).tolist() == df["video_id"].tolist()
+
+def test_append_extends_dictionaries(tmp_path):
+    store = InteractionStore(str(tmp_path / "inter"))
+    store.write(frame(100))
+    n_users = len(store.user_ids())
+    store.append(["u1", "new_user", "new_user"], ["v2", "v2", "new_video"], [2.5, 1, 1])
+    assert len(store.user_ids()) == n_users + 1 and store.item_ids()[-1] == "new_video"
+    m = store.csr()
+    assert m[n_users, len(store.item_ids()) - 1] == 1 and m.sum() == frame(100)["rating"].sum() + 4.5
+    assert len(store.parts()) == 2 and store.version() is not None
+
+def test_als_fits_from_generated_chunks(tmp_path):
+    store = InteractionStore(str(tmp_path / "inter"))
+    videos = [f"v{i}" for i in range(80)]
+    rows = store.write_chunks(iter_interactions(80, 30, items_per_user=(3, 8), chunk_users=10),
+                              [f"user_{u}" for u in range(30)], videos)
+    assert rows == len(store) and len(store.parts()) == 3
+    als = ALSModel(store, factors=4, iterations=3)
+    # videos nobody interacted with get no factors, as with the DataFrame path
+    used = np.unique(np.concatenate([c["item"] for c in store.iter_chunks()]))
+    assert len(als.model.item_ids) == len(used)
+    assert len(als.recommend("user_0", n=3)) == 3
+
+def test_batch_users_read_from_store_or_pickle(tmp_path):
+    df = frame(200)
+    df.to_pickle(tmp_path / "inter.pkl")
+    InteractionStore(str(tmp_path / "inter")).write(df)
+    from_pickle = {u: sorted(set(h)) for u, h in iter_users(str(tmp_path / "inter.pkl"))}
+    from_store = {u: sorted(h) for u, h in iter_users(str(tmp_path / "inter"))}
+    assert from_store == from_pickle
+
+def test_user_items_read_in_blocks_match_csr_rows(tmp_path):
+    store = InteractionStore(str(tmp_path / "inter"))
+    store.write(frame(), chunk_rows=64)
+    store.append(["u3", "u3", "brand_new"], ["v1", "v1", "v2"], [1, 1, 1])  # a later segment, with a duplicate
+    m = store.csr()
+    got = list(store.iter_user_items(block_rows=50))
+    assert [u for u, _ in got] == np.flatnonzero(np.diff(m.indptr)).tolist()
+    for user, items in got:
+        assert items.tolist() == m.indices[m.indptr[user]:m.indptr[user + 1]].tolist()
+
+def test_rewrite_is_atomic_and_failed_rewrite_leaves_store(tmp_path):
+    store = InteractionStore(str(tmp_path / "inter"))
+    store.write(frame(), chunk_rows=64)
+    before = store.manifest()
+    expected = store.csr()
+
+    def broken():
+        yield {"user": np.array([0, 1]), "item": np.array([0, 0]), "rating": np.array([1, 1])}
+        raise RuntimeError("generator failed")
+    try:
+        store.write_chunks(broken(), ["a", "b"], ["x"])
+    except RuntimeError:
+        pass
+    assert store.manifest() == before and (store.csr() != expected).nnz == 0
+    # a reader still on the replaced version keeps a consistent view of its segments + dictionaries
+    store.write(frame(200, seed=1))
+    assert store.user_ids(before).tolist() == pd.unique(frame()["user_id"]).tolist()
+    assert sum(len(c["user"]) for c in store.iter_chunks(before)) == len(frame())
+    store.append(["u1"], ["v1"], [1])
+    on_disk = {f for f in os.listdir(tmp_path / "inter") if f.endswith(".arrow")}
+    live = store.manifest()
+    assert on_disk == set(live["parts"]) | {live["users"], live["items"]} | set(live["retired"])
+    assert len(store) == 201
@@ -0,0 +1,48 @@
+import time
+import threading
+from src.model_registry import ModelRegistry
+
+def test_swap_happens_off_the_request_path():
+    source = {"version": 1}
+    release = threading.Event()
+    def build(version, previous):
+        if previous is not None:
+            release.wait(5)
+        return {"value": version * 10, "previous": previous.version if previous else None}
+    reg = ModelRegistry(lambda: source["version"], build, interval=0.01)
+    assert reg.current().value == 10  # cold start waits for the first build
+    reg.start()
+    source["version"] = 2
+    time.sleep(0.1)
+    t0 = time.perf_counter()
+    assert reg.current().value == 10 and time.perf_counter() - t0 < 0.05  # old snapshot while v2 builds
+    assert reg.status()["building"] == 2
+    release.set()
+    for _ in range(200):
+        if reg.current().version == 2:
+            break
+        time.sleep(0.01)
+    reg.stop()
+    snap = reg.current()
+    assert snap.value == 20 and snap.previous == 1 and snap.build_ms >= 0
+    status = reg.status()
+    assert status["version"] == 2 and status["swaps"] == 2 and status["building"] is None
+
+def test_failed_build_keeps_serving_old_snapshot():
+    source = {"version": "a"}
+    calls = []
+    def build(version, previous):
+        calls.append(version)
+        if version == "bad":
+            raise ValueError("corrupt bundle")
+        return {}
+    reg = ModelRegistry(lambda: source["version"], build)
+    reg.current()
+    source["version"] = "bad"
+    reg.check(wait=True)
+    reg.check(wait=True)  # not retried until the version moves
+    assert reg.current().version == "a" and calls == ["a", "bad"]
+    assert "corrupt bundle" in reg.status()["failed"]["bad"]
+    source["version"] = "b"
+    reg.check(wait=True)
+    assert reg.current().version == "b"
@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+from src.models import PopularityBased, ContentBased, ALSModel, HybridModel, main, train
+
+def catalog(n=60):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"video_id": [f"v{i}" for i in range(n)],
+                         "text": [f"song {i} artist{i % 5} genre{i % 3} mood{i % 4}" for i in range(n)],
+                         "viewCount_norm": rng.random(n), "likeCount_norm": rng.random(n)})
+
+def interactions(n_users=30, n_items=60):
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({"user_id": [f"u{i % n_users}" for i in range(400)],
+                         "video_id": [f"v{j}" for j in rng.integers(0, n_items, 400)],
+                         "rating": rng.integers(1, 5, 400)})
+
+def test_import_does_not_load_heavy_dependencies():
+    code = "import sys, src.models; print([m for m in ('faiss', 'implicit', 'sklearn') if m in sys.modules])"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_models_fit_recommend_save_load(tmp_path):
+    df = catalog()
+    pop = PopularityBased(df)
+    top = pop.recommend(5)
+    assert top[0] == df["video_id"][np.argmax(0.7 * df["viewCount_norm"] + 0.2 * df["likeCount_norm"])]
+    assert pop.recommend(5, exclude=top[:2]) == pop.recommend(7)[2:]
+    pop.save(tmp_path / "pop.pkl")
+    assert PopularityBased.load(tmp_path / "pop.pkl").recommend(5) == top
+    # legacy Spotify features: track_id and a plain popularity column
+    spotify = pd.DataFrame({"track_id": ["a", "b", "c"], "track_name": ["x", "y", "z"], "popularity": [5, 9, 1]})
+    assert PopularityBased(spotify).recommend(2) == ["b", "a"]
+
+    content = ContentBased(df, dim=8)
+    recs = content.recommend("v0", n=5)
+    assert len(recs) == 5 and "v0" not in recs
+    content.save(tmp_path / "content.pkl")
+    assert ContentBased.load(tmp_path / "content.pkl").recommend("v0", n=5) == recs
+
+    als = ALSModel(interactions(), factors=8, iterations=5)
+    recs = als.recommend("u0", n=5)
+    assert len(recs) == 5 and als.recommend("nobody") == []
+    als.save(tmp_path / "als.pkl")
+    assert ALSModel.load(tmp_path / "als.pkl").recommend("u0", n=5) == recs
+    assert len(als.recommend_history(["v1", "v2"], n=5)) == 5
+
+def test_hybrid_round_trips_through_an_artifact_bundle(tmp_path):
+    df = catalog()
+    hybrid = HybridModel(df, ContentBased(df, dim=8), ALSModel(interactions(), factors=8, iterations=5),
+                         budgets={"content": 10_000, "als": 10_000})
+    recs = hybrid.recommend(["v0", "v1"], n=10)
+    assert len(recs) == 10 and not {"v0", "v1"} & set(recs)
+    hybrid.save(str(tmp_path / "artifacts"))
+    loaded = HybridModel.load(str(tmp_path / "artifacts"), df, budgets={"content": 10_000, "als": 10_000})
+    assert loaded.recommend(["v0", "v1"], n=10) == recs
+
+def test_cli_trains_and_publishes(tmp_path):
+    df = catalog()
+    df.to_csv(tmp_path / "features.csv", index=False)
+    interactions().to_pickle(tmp_path / "interactions.pkl")
+    main(["--catalog", str(tmp_path / "catalog"), "--features", str(tmp_path / "features.csv"),
+          "--interactions", str(tmp_path / "interactions.pkl"), "--models-dir", str(tmp_path / "models"),
+          "--artifacts", str(tmp_path / "artifacts")])
+    assert (tmp_path / "models" / "popularity.pkl").exists()
+    version = (tmp_path / "artifacts" / "CURRENT").read_text().strip()
+    # nothing changed: every fit is loaded from the stage cache and the live bundle is kept
+    assert train(str(tmp_path / "catalog"), None, str(tmp_path / "interactions.pkl"), str(tmp_path / "models"),
+                 str(tmp_path / "artifacts"), workers=1) == version
@@ -0,0 +1,63 @@
+import os
+import pytest
+from src.pipeline import Pipeline, Stage, file_digest
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+def upper(path):
+    return read(path).upper()
+
+def with_pid(text, suffix):
+    return f"{text}{suffix}:{os.getpid()}"
+
+def join(a, b):
+    return a.split(":")[0] + "|" + b.split(":")[0]
+
+def fail(text):
+    raise RuntimeError("stage failed")
+
+def stages(src, suffix="!"):
+    return [Stage("upper", upper, params={"path": src}, files=[src]),
+            Stage("left", with_pid, deps=["upper"], params={"suffix": suffix}),
+            Stage("right", with_pid, deps=["upper"], params={"suffix": "?"}),
+            Stage("join", join, deps=["left", "right"])]
+
+def test_pipeline_skips_unchanged_stages(tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("abc")
+    logs = []
+    pipe = Pipeline(stages(str(src)), str(tmp_path / "cache"), workers=1, log=logs.append)
+    report = pipe.run()
+    assert pipe.output(report, "join") == "ABC!|ABC?"
+    assert not any(r["cached"] for r in report.values())
+    assert any("join" in line for line in logs)
+
+    report = Pipeline(stages(str(src)), str(tmp_path / "cache"), workers=1, log=logs.append).run()
+    assert all(r["cached"] for r in report.values())
+    # a parameter change re-runs that stage and everything below it
+    report = Pipeline(stages(str(src), suffix="#"), str(tmp_path / "cache"), workers=1, log=logs.append).run()
+    assert {n for n, r in report.items() if not r["cached"]} == {"left", "join"}
+    # so does a change to an input file's contents
+    digest = file_digest(str(src))
+    src.write_text("abd")
+    assert file_digest(str(src)) != digest
+    pipe = Pipeline(stages(str(src)), str(tmp_path / "cache"), workers=1, log=logs.append)
+    report = pipe.run()
+    assert not any(r["cached"] for r in report.values()) and pipe.output(report, "join") == "ABD!|ABD?"
+    assert len(os.listdir(tmp_path / "cache" / "join")) == 2  # keep=2
+
+def test_independent_stages_run_in_worker_processes(tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("x")
+    pipe = Pipeline(stages(str(src)), str(tmp_path / "cache"), workers=2, log=lambda line: None)
+    report = pipe.run()
+    assert pipe.output(report, "join") == "X!|X?"
+    assert int(pipe.output(report, "left").split(":")[1]) != os.getpid()
+
+    broken = stages(str(src)) + [Stage("broken", fail, deps=["join"])]
+    with pytest.raises(RuntimeError, match="stage failed"):
+        Pipeline(broken, str(tmp_path / "cache"), workers=2, log=lambda line: None).run()
+    with pytest.raises(ValueError, match="must be listed before"):
+        Pipeline([Stage("a", join, deps=["b"])], str(tmp_path / "cache"))
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from src.ranking import top_k_indices, popularity_order, take_ranked, ranked_candidates, snippet_items
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(0).random(1000)
+    assert list(top_k_indices(scores, 10)) == list(np.argsort(-scores)[:10])
+
+def test_top_k_exclusion_and_nan():
+    scores = np.array([0.9, np.nan, 0.5, 0.8, 0.1])
+    assert list(top_k_indices(scores, 3, exclude=[0])) == [3, 2, 4]
+    assert list(top_k_indices(scores, 10, exclude=np.array([True, False, False, False, False]))) == [3, 2, 4, 1]
+    assert len(top_k_indices(scores, 0)) == 0
+
+def test_popularity_order_and_take_ranked():
+    df = pd.DataFrame({"video_id": list("abcde"), "viewCount_norm": [0.1, 0.9, np.nan, 0.5, 0.7]})
+    order = popularity_order(df)
+    assert list(order) == [1, 4, 3, 0, 2]
+    assert list(take_ranked(order, 2)) == [1, 4]
+    assert list(take_ranked(order, 2, exclude=[1, 3])) == [4, 0]
+    assert popularity_order(df.drop(columns="viewCount_norm")) is None
+
+def test_ranked_candidates_priority_and_exclusion():
+    order = np.array([1, 4, 3, 0, 2])
+    assert list(ranked_candidates(5, 4, primary=[3, -1, 3, 2], order=order, exclude=[2])) == [3, 1, 4, 0]
+    assert list(ranked_candidates(5, 10, order=order)) == [1, 4, 3, 0, 2]
+    fill = ranked_candidates(5, 3, primary=[0], exclude=np.array([False, True, False, False, False]))
+    assert fill[0] == 0 and len(set(fill)) == 3 and 1 not in fill
+    assert len(ranked_candidates(0, 5)) == 0
+
+def test_snippet_items():
+    df = pd.DataFrame({"video_id": ["a", "b", "c"], "title": ["A", None, "C"]})
+    assert snippet_items(df, [2, 1]) == [
+        {"id": {"videoId": "c"}, "snippet": {"title": "C", "channelTitle": ""}},
+        {"id": {"videoId": "b"}, "snippet": {"title": "", "channelTitle": ""}},
+    ]
+    assert snippet_items(df, []) == []
@@ -0,0 +1,47 @@
+import time
+import threading
+from src.response_cache import ResponseCache
+
+PARAMS = {"part": "snippet", "q": "Arijit Singh official audio", "maxResults": 50}
+
+def test_fetch_hits_memory_then_disk(tmp_path):
+    calls = []
+    cache = ResponseCache(str(tmp_path))
+    fetch = lambda: calls.append(1) or {"items": [1, 2]}
+    assert cache.fetch("search.list", PARAMS, fetch) == {"items": [1, 2]}
+    assert cache.fetch("search.list", dict(reversed(list(PARAMS.items()))), fetch) == {"items": [1, 2]}
+    assert len(calls) == 1 and cache.stats()["memory_hits"] == 1
+
+    fresh = ResponseCache(str(tmp_path))  # new process: served from the disk tier
+    assert fresh.fetch("search.list", PARAMS, fetch) == {"items": [1, 2]}
+    assert len(calls) == 1 and fresh.stats()["disk_hits"] == 1
+
+def test_ttl_and_lru_bound(tmp_path):
+    cache = ResponseCache(None, max_entries=2, ttls={"search.list": 0.05})
+    cache.put("search.list", {"q": "a"}, 1)
+    time.sleep(0.1)
+    assert cache.get("search.list", {"q": "a"}) is None
+    for q in "bcd":
+        cache.put("videos.list", {"id": q}, q)
+    assert cache.get("videos.list", {"id": "b"}) is None  # evicted
+    assert cache.get("videos.list", {"id": "d"}) == "d"
+    assert cache.stats()["memory_entries"] == 2
+
+def test_prune_disk_bound(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_disk_entries=3)
+    for i in range(6):
+        cache.put("videos.list", {"id": i}, i)
+    cache.prune_disk()
+    assert len(cache._disk_files()) == 3
+
+def test_put_prunes_disk_off_the_calling_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.response_cache.PRUNE_EVERY", 4)
+    cache = ResponseCache(str(tmp_path), max_disk_entries=2)
+    callers = []
+    prune = cache.prune_disk
+    monkeypatch.setattr(cache, "prune_disk", lambda: callers.append(threading.get_ident()) or prune())
+    for i in range(4):
+        cache.put("videos.list", {"id": i}, i)
+    cache._prune_thread.join()
+    assert callers and threading.get_ident() not in callers
+    assert len(cache._disk_files()) == 2
@@ -0,0 +1,24 @@
+import time
+from src.search_executor import SearchExecutor
+
+def items(prefix, n):
+    return [{"id": {"videoId": f"{prefix}{i}"}} for i in range(n)]
+
+def test_gather_dedupes_and_short_circuits():
+    ex = SearchExecutor(max_workers=2)
+    calls = [lambda: items("a", 6), lambda: items("a", 6) + items("b", 6)] + [lambda: time.sleep(1) or items("c", 5)] * 4
+    t0 = time.perf_counter()
+    found, timed_out = ex.gather(calls, want=10, budget=5)
+    assert not timed_out and time.perf_counter() - t0 < 0.5
+    ids = [it["id"]["videoId"] for it in found]
+    assert len(ids) == len(set(ids)) == 12
+
+def test_gather_respects_budget_and_skips_failures():
+    ex = SearchExecutor(max_workers=4)
+    def boom():
+        raise RuntimeError("quota")
+    calls = [boom, lambda: items("a", 3), lambda: time.sleep(2) or items("b", 10)]
+    t0 = time.perf_counter()
+    found, timed_out = ex.gather(calls, want=10, budget=0.3)
+    assert timed_out and time.perf_counter() - t0 < 1
+    assert len(found) == 3
@@ -0,0 +1,47 @@
+import sys
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.api_client import RecommenderClient
+from src.service import RecommendationServer, LocalClient
+from tests.test_engine import make_engine
+
+@pytest.fixture
+def server(tmp_path):
+    engine = make_engine(tmp_path).start()
+    srv = RecommendationServer(("127.0.0.1", 0), engine)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    engine.close()
+
+def test_http_api_keeps_connection_alive(server):
+    client = RecommenderClient(f"http://127.0.0.1:{server.server_address[1]}")
+    assert client.save("me", "v3") == {"ok": True, "error": None}
+    sock = client._conn().sock
+    res = client.recommend_user("me", 5)
+    assert len(res["items"]) == 5 and "v3" not in [it["id"]["videoId"] for it in res["items"]]
+    assert client.history("me") == {"items": [{"video_id": "v3", "title": "Song 3", "channel": "artist3"}], "total": 1}
+    assert client._conn().sock is sock  # every call went over one connection
+    with pytest.raises(RuntimeError, match="400"):
+        client.recommend_user("me", 0)
+    with pytest.raises(RuntimeError, match="404"):
+        client._call("GET", "/nope", {})
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda i: client.recommend_artist(f"artist{i % 7}", "Content-Based")["items"], range(32)))
+    assert all(len(r) == 10 for r in results)
+
+def test_local_client_matches_http(server):
+    http = RecommenderClient(f"http://127.0.0.1:{server.server_address[1]}")
+    local = LocalClient(server.engine)
+    http.save("u", "v7")
+    assert local.recommend_user("u", 10, "Content-Based") == http.recommend_user("u", 10, "Content-Based")
+    assert local.status()["videos"] == http.status()["videos"] == 120
+
+def test_http_client_does_not_load_the_engine():
+    code = "import sys, src.api_client; print(sorted(m for m in ('faiss', 'sklearn', 'src.engine', 'src.service') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"